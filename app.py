@@ -3,19 +3,34 @@ from ultralytics import YOLO
 import cv2
 import tempfile
 import os
-import json
 import pandas as pd
 import time
+from pathlib import Path
 from datetime import datetime, timezone
-from optimizer import rank_vendors
-
-# Scraper is optional — gracefully skip if dependencies aren't installed
+from optimizer import RankingCache, WinnerMapCache, NUMPY_AVAILABLE, optimize_basket, DEFAULT_SHIPMENT_COST
+from catalog import build_product_index
+from vendor_store import VendorStore
+from recommend import Recommender, HISTORY_COLUMNS
+from vision import sample_frames, sampling_step, postprocess, SUBTYPES, SUBTYPE_COLORS, PreviewRenderer, IoUTracker, SceneGate
+from pipeline import StreamPipeline
+from batch_analyze import write_timeline
+
+from price_refresh import BackgroundRefresher, inventory_stamp
+from inventory_store import read_inventory
+
+# Scraper is optional — gracefully skip if dependencies aren't installed.
+# Refreshes run it in a separate process (price_refresh.py).
 try:
-    from scraper import run as _scrape_inventory
+    import scraper  # noqa: F401
     SCRAPER_AVAILABLE = True
 except ImportError:
     SCRAPER_AVAILABLE = False
 
+@st.cache_resource
+def get_refresher():
+    # One background scraper per server process, shared by every session
+    return BackgroundRefresher()
+
 # --- PAGE CONFIGURATION ---
 st.set_page_config(
     page_title="ShopVision Pro",
@@ -125,7 +140,39 @@ with st.sidebar:
     conf_threshold = st.slider("AI Sensitivity", 0.3, 1.0, 0.50, 0.05)
 
     st.subheader("🚀 Performance Mode")
-    frame_skip = st.slider("Frame Skip (Higher = Smoother)", 2, 10, 3)
+    sampling = st.radio("Frame Sampling", ["Frame Skip", "Frames per Second"], horizontal=True,
+                        help="Skipped frames are grabbed without BGR conversion, never fully processed.")
+    if sampling == "Frame Skip":
+        frame_skip = st.slider("Frame Skip (Higher = Smoother)", 2, 10, 3)
+        sample_fps = None
+    else:
+        sample_fps = st.slider("Analysed Frames per Second of Video", 1, 15, 5)
+        frame_skip = None
+    batch_size = st.slider("Inference Batch Size", 1, 16, 4,
+                           help="Sampled frames sent to the model in one predict call. "
+                                "Higher = more frames analysed per second on CPU.")
+    drop_frames = st.checkbox("Real-time Mode (drop frames when behind)", value=False,
+                              help="Discard the oldest waiting frame instead of pausing decode "
+                                   "when inference falls behind. Faster, but skips frames.")
+
+    with st.expander("🎬 Scene Gating", expanded=False):
+        gate_static = st.checkbox("Skip Static Scenes", value=False,
+                                  help="Reuse the previous detections when the frame has not "
+                                       "changed meaningfully, instead of running the model.")
+        gate_threshold = st.slider("Scene Change Threshold", 1.0, 30.0, 4.0, 0.5,
+                                   help="Mean pixel difference (0–255) on a 64×36 thumbnail "
+                                        "above which the frame is re-analysed.")
+        gate_refresh = st.slider("Forced Refresh (frames)", 5, 120, 30,
+                                 help="Re-analyse after this many reused frames regardless.")
+    track_objects = st.checkbox("Track Objects Across Frames", value=True,
+                                help="Keep a stable id per object so its subtype and product "
+                                     "are resolved once instead of on every frame.")
+
+    st.subheader("🖥️ Preview")
+    preview_fps = st.slider("Preview Refresh (FPS)", 1, 30, 10,
+                            help="Maximum UI updates per second, independent of the analysis rate.")
+    preview_width = st.select_slider("Preview Width (px)", options=[480, 640, 960, 1280], value=960,
+                                     help="Frames are downscaled to this width before drawing and upload.")
 
     st.subheader("⏱️ Alert Settings")
     cooldown = st.slider("Cooldown Timer (Sec)", 1, 10, 5,
@@ -135,7 +182,7 @@ with st.sidebar:
 
     # —— Price Freshness Panel ———————————————————————————
     st.subheader("💰 Price Data")
-    _db_for_date = json.load(open("inventory.json")) if os.path.exists("inventory.json") else {}
+    _db_for_date = read_inventory("inventory.json").db
     if _db_for_date:
         _sample = next(iter(_db_for_date.values()))
         _scraped_at_str = _sample.get("scraped_at", "")
@@ -151,14 +198,31 @@ with st.sidebar:
                 st.caption(f"📅 Last refreshed: {_scraped_at_str[:10]}")
 
     if SCRAPER_AVAILABLE:
-        if st.button("🔄 Refresh Prices", help="Re-scrape Amazon & Bing and update inventory.json"):
-            with st.spinner("🔄 Fetching latest prices from Amazon & Bing... (this takes ~30s)"):
-                _scrape_inventory()
-            st.cache_resource.clear()   # force model + DB reload
-            st.success("✅ Prices updated!")
-            st.rerun()
+        # The scrape runs out of process and journals each updated product
+        # (inventory_store.py); the next rerun swaps in the new product data only
+        # (load_inventory below) — the model is never reloaded.
+        refresher = get_refresher()
+        refresh = refresher.status()
+        if st.button("🔄 Refresh Prices", disabled=refresh.running,
+                     help="Re-scrape Amazon & Bing in the background and update inventory.json"):
+            refresher.start()
+            refresh = refresher.status()
+        if refresh.running:
+            st.info(f"⏳ Fetching latest prices in the background "
+                    f"({time.time() - refresh.started_at:.0f}s)... Analysis keeps running; "
+                    f"new prices apply on the next interaction.")
+            if refresh.message:
+                st.caption(refresh.message)
+        elif refresh.state == "done":
+            st.success(f"✅ Prices updated at {datetime.fromtimestamp(refresh.finished_at):%H:%M:%S}")
+        elif refresh.state == "failed":
+            st.error(f"❌ Price refresh failed: {refresh.message or 'see server log'}")
     else:
         st.caption("⚠️ Scraper unavailable (`pip install requests beautifulsoup4`)")
+    save_timelines = st.checkbox("Save Detection Timelines", value=False,
+                                 help="Write each analysed video's recommendations to timelines/ "
+                                      "so the scrape scheduler (scheduler.py) refreshes frequently "
+                                      "detected products first.")
 
     st.divider()
     with st.expander("⚙️ NDU Weight Tuner", expanded=False):
@@ -178,7 +242,7 @@ with st.sidebar:
 
 # --- RESOURCE LOADING ---
 @st.cache_resource
-def load_resources():
+def load_model():
 
     local_windows_path = r"C:\Users\Naveen Prasad\Documents\Project_data\RTPD_v3_2.pt"
     cloud_filename = "RTPD_v3_2.pt"
@@ -197,17 +261,61 @@ def load_resources():
         st.error(f"❌ Critical Error: Could not find '{cloud_filename}' in {os.getcwd()}")
         st.stop()
 
-    model = YOLO(model_path)
-    
-    db = {}
-    db_file = "inventory.json"
-    if os.path.exists(db_file):
-        with open(db_file, 'r') as f:
-            db = json.load(f)
-            
-    return model, db
+    return YOLO(model_path)
+
+@st.cache_resource(max_entries=1)
+def load_inventory(stamp):
+    # Keyed on the file's (mtime, size) stamp: a published snapshot is loaded
+    # on the next rerun, independently of the model. Analyses already running
+    # keep the index they started with.
+    snapshot = read_inventory("inventory.json")
+    db = snapshot.db
+    # Content hash of snapshot + journal — any scraper write produces a new
+    # version, which invalidates every memoised ranking computed from the
+    # old prices.
+    db_version = snapshot.digest
+
+    # (label, subtype) → record, with label aliases folded in. Vendor offers
+    # live in a compact columnar store the ranker reads in place; the parsed
+    # vendor dicts are dropped with `db`. Rebuilt only when the inventory
+    # changes.
+    store = VendorStore.from_inventory(db)
+    index = build_product_index(db, store)
 
-model, PRODUCT_DB = load_resources()
+    return index, db_version
+
+model = load_model()
+PRODUCT_INDEX, INVENTORY_VERSION = load_inventory(inventory_stamp("inventory.json"))
+
+@st.cache_resource
+def get_ranking_cache():
+    # Shared by every session; entries are tagged with INVENTORY_VERSION
+    return RankingCache(maxsize=512)
+
+RANKING_CACHE = get_ranking_cache()
+
+@st.cache_resource
+def get_winner_maps():
+    # Weight-simplex partitions, built per product on first use and rebuilt
+    # only when that product's record changes (a scraper run in progress
+    # touches a few products, not the catalogue). Slider moves are pure
+    # point lookups.
+    return WinnerMapCache()
+
+if NUMPY_AVAILABLE:
+    WINNER_MAPS = get_winner_maps()
+    # The index maps every alias to its record; one entry per product
+    _records = {r['name']: r for r in PRODUCT_INDEX.values() if r.get('vendors')}
+    with st.sidebar:
+        with st.expander("🔮 What-if Winners", expanded=False):
+            st.caption("Best vendor per product at the current weights (runner-up in brackets).")
+            for _name, _record in sorted(_records.items()):
+                # Journal records carry a "version"; scraped_at covers records without one
+                _wmap = WINNER_MAPS.get(_name, _record['vendors'],
+                                        (_record.get('version'), _record.get('scraped_at')))
+                _best, _alt = _wmap.winners(ndu_wp, ndu_wt, ndu_wr)
+                _alt_label = f" ({_alt['vendor_name']})" if _alt else ""
+                st.markdown(f"**{_name}** → {_best['vendor_name']}{_alt_label}")
 
 if model is None:
     st.error("⚠️ System Error: Model file not found.")
@@ -262,98 +370,75 @@ if uploaded_file:
         fps = int(cap.get(cv2.CAP_PROP_FPS))
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         if fps == 0: fps = 30
+        if sample_fps:
+            frame_skip = sampling_step(fps, sample_fps)
         
-        frame_count = 0
         detections_found = False 
+        history_start = len(st.session_state.history)
         progress_bar = st.progress(0)
-        
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret: break
-            
-            frame_count += 1
-            if total_frames > 0:
-                progress_bar.progress(min(frame_count / total_frames, 1.0))
 
-            if frame_count % frame_skip != 0: 
-                continue 
-
-            # --- AI INFERENCE ---
-            # We pass the raw 'frame' (BGR).
-            results = model.predict(frame, conf=conf_threshold, verbose=False)
-            
-            annotated_frame = frame.copy()
+        # --- AI INFERENCE ---
+        # Decode and inference run on background threads joined by bounded
+        # queues (pipeline.py); this loop is the render stage. We pass the raw
+        # 'frame' (BGR). Results arrive in frame order so cooldown/history
+        # behave as before.
+        pipe = StreamPipeline(
+            model, sample_frames(cap, frame_skip, mode="grab"),
+            batch_size=batch_size, drop_frames=drop_frames,
+            gate=SceneGate(gate_threshold, max_reuse=gate_refresh) if gate_static else None,
+            conf=conf_threshold, verbose=False,
+        )
+        preview = PreviewRenderer(max_width=preview_width, max_fps=preview_fps)
+        recommender = Recommender(
+            PRODUCT_INDEX, cooldown=cooldown, last_seen=st.session_state.last_seen,
+            ranking_cache=RANKING_CACHE, inventory_version=INVENTORY_VERSION,
+            wp=ndu_wp, wt=ndu_wt, wr=ndu_wr,
+        )
+        tracker = IoUTracker() if track_objects else None
+        with pipe:
+            for frame_count, frame, result, backlog in pipe.results():
+                if total_frames > 0:
+                    progress_bar.progress(min(frame_count / total_frames, 1.0))
+
+                # Overlays are drawn only on frames the preview will actually show
+                drawing = backlog == 0 and preview.begin(frame)
             
-            if results[0].boxes:
-                detections_found = True
-                for box in results[0].boxes:
-                    # 1. Geometry Extraction
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    w = x2 - x1
-                    h = y2 - y1
-                    aspect_ratio = h / w
-
-                    # 2. Get Class Name First
-                    cls_id = int(box.cls[0])
-                    label = model.names[cls_id] 
-
-                    # 3. Dynamic Subtype Logic (Geometric Logic)
-                    # ... inside the loop ...
-                    if label == "dove":
-                        # Dove Logic: Soap is wide/square, Shampoo is tall
-                        if aspect_ratio > 1.5:
-                            subtype = "Shampoo"   
-                            box_color = (203, 192, 255) 
-                        else:
-                            subtype = "Soap"      
-                            box_color = (255, 255, 255)
-                    
-                    elif label in ["pepsi", "cocacola", "coca-cola"]:
-                        # Soda Logic: Bottles are tall, Cans are short
-                        if aspect_ratio > 2.7:
-                            subtype = "Bottle"
-                            box_color = (255, 0, 0) # Blue (BGR)
-                        else:
-                            subtype = "Can"
-                            box_color = (0, 255, 0) # Green (BGR)
-                    
-                    else:
-                        # Fallback for anything else
-                        subtype = "Product"
-                        box_color = (0, 165, 255) # Orange
-
-                    # 4. Draw Box
-                    cv2.rectangle(annotated_frame, (int(x1), int(y1)), (int(x2), int(y2)), box_color, 3)
-                    
-                    # 5. Database Lookup
-                    # Fix #2: Normalise label so "coca-cola" and "cocacola" both
-                    # resolve to "coca_cola" matching the inventory.json keys.
-                    label_norm = label.replace("-", "_").replace(" ", "_")
-                    lookup_key = f"{label_norm}_{subtype}"
-
-                    # Case-insensitive match against DB keys
-                    matched_product = None
-                    for db_key in PRODUCT_DB:
-                        if lookup_key.lower() == db_key.lower():
-                            matched_product = PRODUCT_DB[db_key]
-                            break
+                # Single host transfer + vectorised aspect ratio / subtype (vision.py)
+                detections = postprocess(result, model.names)
+                # Stable track ids; subtype = per-track majority vote (no Can/Bottle flicker)
+                if tracker is not None:
+                    track_ids, subtypes = tracker.update(detections)
+                    track_ids = track_ids.tolist()
+                else:
+                    track_ids, subtypes = [None] * len(detections), detections.subtype
+                if len(detections):
+                    detections_found = True
+                    for (x1, y1, x2, y2), cls_id, subtype_idx, track_id in zip(
+                        detections.xyxy.tolist(), detections.cls.tolist(), subtypes.tolist(), track_ids
+                    ):
+                        # 1. Class name + geometric subtype (computed per frame in postprocess)
+                        label     = model.names[cls_id]
+                        subtype   = SUBTYPES[subtype_idx]
+                        box_color = SUBTYPE_COLORS[subtype]
+                        memo      = tracker.tracks[track_id].memo if track_id else None
+
+                        # 4. Draw Box
+                        if drawing:
+                            preview.rectangle((x1, y1), (x2, y2), box_color, 3)
                     
-                    if matched_product:
-                        product_name = matched_product.get('name', f"Unknown {label}")
-                        vendors      = matched_product.get('vendors', [])
-
-                        current_time_sec = frame_count / fps
-                        last_time = st.session_state.last_seen.get(product_name, -100)
-
-                        if vendors and (current_time_sec - last_time) > cooldown:
-                            # ── NDU Ranking ───────────────────────────────
-                            ranked    = rank_vendors(vendors, wp=ndu_wp, wt=ndu_wt, wr=ndu_wr)
-                            winner    = ranked[0]
-                            runner_up = ranked[1] if len(ranked) > 1 else None
-
-                            price         = f"\u20b9{winner['price']:.0f}"
+                        # 5. Database Lookup → cooldown → NDU ranking (recommend.py)
+                        # O(1) lookup in the precompiled index; "coca-cola",
+                        # "cocacola" etc. all resolve to the "coca_cola" keys.
+                        event = recommender.observe(label, subtype, frame_count / fps, memo=memo)
+
+                        if event:
+                            product_name  = event["product_name"]
+                            winner        = event["winner"]
+                            runner_up     = event["runner_up"]
+                            row           = event["row"]
+                            price         = row["Price"]
                             utility_score = winner['utility_score']
-                            why_string    = winner.get('why', 'Best weighted balance')
+                            why_string    = row["Why"]
 
                             # 2nd-place alt block
                             alt_html = ""
@@ -367,8 +452,6 @@ if uploaded_file:
                                     f'</div>'
                                 )
 
-                            st.session_state.last_seen[product_name] = current_time_sec
-
                             # ── Smart Recommendation Card ─────────────────
                             with live_alert.container():
                                 st.markdown(f"""
@@ -390,29 +473,27 @@ if uploaded_file:
 
                             st.toast(f"\u2705 Found {product_name}!", icon="\U0001f6d2")
 
-                            st.session_state.history.append({
-                                "Time":        f"{current_time_sec:.1f}s",
-                                "Product":     product_name,
-                                "Vendor":      winner['vendor_name'],
-                                "Price":       price,
-                                "U_Score":     f"{utility_score:.4f}",
-                                "Why":         why_string,
-                                "Alt. Vendor": runner_up['vendor_name'] if runner_up else "—",
-                                "Alt. Price":  f"\u20b9{runner_up['price']:.0f}" if runner_up else "—",
-                                "Link":        winner.get('url', '#'),
-                            })
-
-            # 6. DISPLAY (Convert to RGB for Human Eyes only)
-            # Fix: use_container_width deprecated post-2025 → width='stretch'
-            video_window.image(
-                cv2.cvtColor(annotated_frame, cv2.COLOR_BGR2RGB),
-                width="stretch"
-            )
+                            st.session_state.history.append(row)
+
+                # 6. DISPLAY (Convert to RGB for Human Eyes only)
+                # Downscaled canvas, capped at preview_fps; skipped entirely when a
+                # newer result is already queued or the last push is still in flight.
+                # Fix: use_container_width deprecated post-2025 → width='stretch'
+                preview.publish(lambda rgb: video_window.image(rgb, width="stretch"))
 
         cap.release()
         os.unlink(video_path)  # Fix #1: delete temp file after processing
         progress_bar.empty()
 
+        # Optionally save this run's recommendations as a timeline so the scrape
+        # scheduler (scheduler.py) refreshes frequently detected products first
+        if save_timelines and len(st.session_state.history) > history_start:
+            timeline_path = Path("timelines") / f"app_{datetime.now():%Y%m%d_%H%M%S}.json"
+            try:
+                write_timeline(st.session_state.history[history_start:], timeline_path, "json")
+            except OSError as exc:
+                st.warning(f"⚠️ Could not save the detection timeline to '{timeline_path}': {exc}")
+
         with live_alert.container():
             if detections_found:
                  st.success("✅ Analysis Complete.")
@@ -431,9 +512,7 @@ if uploaded_file:
             # same item adds no new information to the shopping list.
             df = df.drop_duplicates(subset=["Product"], keep="last")
 
-            desired_cols = ["Time", "Product", "Vendor", "Price", "U_Score",
-                            "Why", "Alt. Vendor", "Alt. Price", "Link"]
-            cols_to_show = [c for c in desired_cols if c in df.columns]
+            cols_to_show = [c for c in HISTORY_COLUMNS if c in df.columns]
             st.dataframe(
                 df[cols_to_show],
                 column_config={
@@ -450,3 +529,23 @@ if uploaded_file:
                 hide_index=True,
                 width="stretch",
             )
+
+            # Whole-basket plan: one vendor per item, fewer separate deliveries
+            _records = {rec['name']: rec['vendors'] for rec in PRODUCT_INDEX.values()}
+            _basket = {name: _records[name] for name in df["Product"] if name in _records}
+            if len(_basket) > 1:
+                with st.expander("🧺 Consolidated Basket Plan", expanded=False):
+                    plan = optimize_basket(_basket, wp=ndu_wp, wt=ndu_wt, wr=ndu_wr)
+                    st.caption(f"Total basket utility {plan.total_utility:.4f} across "
+                               f"{len(plan.shipments)} deliveries (each delivery costs "
+                               f"{DEFAULT_SHIPMENT_COST} utility).")
+                    st.dataframe(
+                        pd.DataFrame([
+                            {"Vendor": vendor, "Items": ", ".join(ship["items"]),
+                             "Delivery": f"{ship['delivery_time']} min",
+                             "Total": f"₹{ship['total_price']:.0f}"}
+                            for vendor, ship in plan.shipments.items()
+                        ]),
+                        hide_index=True,
+                        width="stretch",
+                    )
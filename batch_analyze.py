@@ -0,0 +1,301 @@
+"""
+batch_analyze.py — Headless Batch Video Analysis
+ShopVision Pro v4.0
+
+Runs the same pipeline as the Streamlit dashboard, without a browser:
+
+    frame sampling → YOLO → geometric subtype → inventory lookup →
+    cooldown → NDU ranking → timeline rows
+
+and writes one timeline per video, with rows in the same schema as
+`st.session_state.history` (see recommend.HISTORY_COLUMNS). A timeline is
+named after the video's path below the input directory
+(clips/a/x.mp4 → a__x.json); names that would still clash get a short
+hash of the full path.
+
+Videos are spread across a process pool (one model instance per worker,
+default: one worker per CPU core). Each worker limits PyTorch to its share
+of the cores so N workers do not oversubscribe the machine.
+
+USAGE:
+    python batch_analyze.py clips/                        # every video in a directory
+    python batch_analyze.py a.mp4 b.mov --out-dir timelines --format parquet
+    python batch_analyze.py archive/ --workers 8 --sample-fps 3 --batch-size 8
+    python batch_analyze.py clips/ --inventory inventory.db      # SQLite inventory (inventory_db.py)
+    python batch_analyze.py clips/ --inventory inventory.bin     # mmap snapshot (inventory_mmap.py)
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+VIDEO_EXTENSIONS = {".mp4", ".mov", ".avi", ".mkv", ".webm"}
+DEFAULT_MODEL    = "RTPD_v3_2.pt"
+
+# ── Per-worker state (populated by _init_worker in each pool process) ────────
+_WORKER: Dict[str, Any] = {}
+
+
+def collect_videos(inputs: List[str]) -> List[Tuple[Path, Path]]:
+    """
+    Expand files and directories (recursively) into a sorted list of
+    (video, path relative to the input it was found under).
+    """
+    videos: Dict[Path, Path] = {}
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            for p in path.rglob("*"):
+                if p.suffix.lower() in VIDEO_EXTENSIONS:
+                    videos.setdefault(p, p.relative_to(path))
+        elif path.is_file():
+            videos.setdefault(path, Path(path.name))
+        else:
+            print(f"  ⚠  Skipping '{item}': not a file or directory")
+    return sorted(videos.items())
+
+
+def timeline_names(videos: List[Tuple[Path, Path]]) -> Dict[Path, str]:
+    """
+    Output file stem per video: its relative path with "__" for the
+    directory separators. Stems shared by several videos (same relative
+    path under different inputs, or x.mp4 next to x.mov) get the first 8
+    hex digits of the sha1 of the resolved video path appended.
+    """
+    stems = {video: "__".join(rel.with_suffix("").parts) for video, rel in videos}
+    counts: Dict[str, int] = {}
+    for stem in stems.values():
+        counts[stem] = counts.get(stem, 0) + 1
+    for video, stem in stems.items():
+        if counts[stem] > 1:
+            digest = hashlib.sha1(str(video.resolve()).encode("utf-8")).hexdigest()[:8]
+            stems[video] = f"{stem}-{digest}"
+    return stems
+
+
+def _load_inventory(inventory_path: str):
+    from inventory_store import read_inventory
+
+    snapshot = read_inventory(inventory_path)
+    return snapshot.db, snapshot.digest
+
+
+def _is_sqlite(inventory_path: str) -> bool:
+    return Path(inventory_path).suffix in (".db", ".sqlite", ".sqlite3")
+
+
+def _init_worker(model_path: str, inventory_path: str, torch_threads: int) -> None:
+    """Pool initializer — load the model and inventory once per process."""
+    try:
+        import torch
+        torch.set_num_threads(max(1, torch_threads))
+    except ImportError:
+        pass
+    from ultralytics import YOLO
+    from catalog import build_product_index
+    from optimizer import RankingCache
+    from vendor_store import VendorStore
+
+    _WORKER["model"] = YOLO(model_path)
+    if inventory_path.endswith(".bin"):
+        # Memory-mapped snapshot: every worker shares one page-cache copy
+        from inventory_mmap import MappedInventory
+        inventory = MappedInventory(inventory_path)
+        _WORKER["index"]   = inventory.product_index()
+        _WORKER["version"] = inventory.digest
+    elif _is_sqlite(inventory_path):
+        # Products are looked up on demand; nothing is loaded up front. A
+        # concurrent scraper may update records meanwhile: the Recommender
+        # keys cached rankings on each record's version as well.
+        from inventory_db import InventoryDB
+        inventory = InventoryDB(inventory_path)
+        _WORKER["index"]   = inventory.product_index()
+        _WORKER["version"] = f"sqlite:{inventory.version}"
+    else:
+        db, version = _load_inventory(inventory_path)
+        _WORKER["index"]   = build_product_index(db, VendorStore.from_inventory(db))
+        _WORKER["version"] = version
+    _WORKER["cache"]   = RankingCache(maxsize=512)
+
+
+def analyze_video(video_path: str, settings: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Run the detection → recommendation pipeline over one video; return its timeline rows."""
+    import cv2
+    from recommend import Recommender
+    from vision import SUBTYPES, IoUTracker, SceneGate, postprocess, predict_batched, sample_frames, sampling_step
+
+    model = _WORKER["model"]
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video '{video_path}'")
+    fps = int(cap.get(cv2.CAP_PROP_FPS)) or 30
+
+    step = settings["frame_skip"]
+    if settings.get("sample_fps"):
+        step = sampling_step(fps, settings["sample_fps"])
+
+    recommender = Recommender(
+        _WORKER["index"], cooldown=settings["cooldown"],
+        ranking_cache=_WORKER["cache"], inventory_version=_WORKER["version"],
+        wp=settings["wp"], wt=settings["wt"], wr=settings["wr"],
+    )
+
+    tracker = IoUTracker() if settings.get("track", True) else None
+    gate = None
+    if settings.get("gate_threshold"):
+        gate = SceneGate(settings["gate_threshold"], max_reuse=settings.get("gate_refresh", 30))
+
+    rows: List[Dict[str, str]] = []
+    try:
+        for frame_idx, _frame, result in predict_batched(
+            model, sample_frames(cap, step, mode="grab"), settings["batch_size"], gate=gate,
+            conf=settings["conf"], verbose=False,
+        ):
+            detections = postprocess(result, model.names)
+            if tracker is not None:
+                track_ids, subtypes = tracker.update(detections)
+                memos = [tracker.tracks[t].memo for t in track_ids.tolist()]
+            else:
+                subtypes, memos = detections.subtype, [None] * len(detections)
+            for cls_id, subtype_idx, memo in zip(detections.cls.tolist(), subtypes.tolist(), memos):
+                event = recommender.observe(model.names[cls_id], SUBTYPES[subtype_idx],
+                                            frame_idx / fps, memo=memo)
+                if event:
+                    rows.append(event["row"])
+    finally:
+        cap.release()
+    return rows
+
+
+def write_timeline(rows: List[Dict[str, str]], out_path: Path, fmt: str) -> None:
+    """Write *rows* as JSON (list of row objects) or Parquet."""
+    from recommend import HISTORY_COLUMNS
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    if fmt == "parquet":
+        import pandas as pd
+        pd.DataFrame(rows, columns=HISTORY_COLUMNS).to_parquet(out_path, index=False)
+    else:
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=4, ensure_ascii=False)
+
+
+def _process_one(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Pool task: analyse one video and write its timeline. Never raises."""
+    start = time.perf_counter()
+    try:
+        rows = analyze_video(job["video"], job["settings"])
+        write_timeline(rows, Path(job["out"]), job["format"])
+        return {"video": job["video"], "out": job["out"], "rows": len(rows),
+                "seconds": time.perf_counter() - start, "error": None}
+    except Exception as exc:
+        return {"video": job["video"], "out": job["out"], "rows": 0,
+                "seconds": time.perf_counter() - start, "error": f"{type(exc).__name__}: {exc}"}
+
+
+def run(
+    inputs:    List[str],
+    out_dir:   str = "timelines",
+    fmt:       str = "json",
+    model:     str = DEFAULT_MODEL,
+    inventory: str = "inventory.json",
+    workers:   Optional[int] = None,
+    overwrite: bool = False,
+    **settings,
+) -> List[Dict[str, Any]]:
+    videos = collect_videos(inputs)
+    names  = timeline_names(videos)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(videos) or 1))
+    suffix = ".parquet" if fmt == "parquet" else ".json"
+
+    print("=" * 65)
+    print("  ShopVision Pro v4.0 — Headless Batch Analysis")
+    print(f"  Videos  : {len(videos)}")
+    print(f"  Workers : {workers}")
+    print(f"  Output  : {out_dir}/*{suffix}")
+    print(f"  Time    : {datetime.now().strftime('%Y-%m-%d  %H:%M:%S')}")
+    print("=" * 65)
+
+    jobs = []
+    for video, _ in videos:
+        out = Path(out_dir) / (names[video] + suffix)
+        if out.exists() and not overwrite:
+            print(f"  ↩  {video}: timeline exists ({out.name}), skipping (use --overwrite)")
+            continue
+        jobs.append({"video": str(video), "out": str(out), "format": fmt, "settings": settings})
+
+    if not jobs:
+        print("  Nothing to do.")
+        return []
+
+    if not os.path.exists(model):
+        raise FileNotFoundError(f"Model file not found: {model}")
+
+    # Split cores evenly between workers for PyTorch's intra-op pool
+    torch_threads = max(1, (os.cpu_count() or 1) // workers)
+    summary: List[Dict[str, Any]] = []
+    ctx = mp.get_context("spawn")   # CUDA / PyTorch are not fork-safe
+    with ctx.Pool(workers, initializer=_init_worker,
+                  initargs=(model, inventory, torch_threads)) as pool:
+        for res in pool.imap_unordered(_process_one, jobs):
+            summary.append(res)
+            name = res["video"]          # full path: names repeat across directories
+            if res["error"]:
+                print(f"  ✗  {name}: {res['error']}")
+            else:
+                print(f"  ✅ {name}: {res['rows']} recommendations  ({res['seconds']:.1f}s)")
+
+    failed = sum(1 for r in summary if r["error"])
+    print(f"\n{'=' * 65}")
+    print(f"  Batch summary: {len(summary) - failed}/{len(summary)} videos analysed")
+    print("=" * 65)
+    return summary
+
+
+if __name__ == "__main__":
+    from optimizer import DEFAULT_WP, DEFAULT_WT, DEFAULT_WR
+
+    parser = argparse.ArgumentParser(description="ShopVision Pro headless batch video analysis")
+    parser.add_argument("inputs", nargs="+", help="Video files and/or directories")
+    parser.add_argument("--out-dir", default="timelines", help="Directory for per-video timelines")
+    parser.add_argument("--format", choices=["json", "parquet"], default="json")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="YOLO weights file")
+    parser.add_argument("--inventory", default="inventory.json",
+                        help="inventory.json, a SQLite inventory (.db, see inventory_db.py) "
+                             "or a compiled snapshot (.bin, see inventory_mmap.py)")
+    parser.add_argument("--workers", type=int, default=None, help="Process count (default: CPU cores)")
+    parser.add_argument("--overwrite", action="store_true", help="Re-analyse videos with existing timelines")
+    parser.add_argument("--conf", type=float, default=0.50, help="Detection confidence threshold")
+    parser.add_argument("--frame-skip", type=int, default=3)
+    parser.add_argument("--sample-fps", type=float, default=None,
+                        help="Analyse N frames per second of video (overrides --frame-skip)")
+    parser.add_argument("--batch-size", type=int, default=4, help="Frames per predict call")
+    parser.add_argument("--no-track", action="store_true",
+                        help="Disable cross-frame object tracking (per-frame subtypes)")
+    parser.add_argument("--gate-threshold", type=float, default=None,
+                        help="Skip inference on frames whose thumbnail differs from the last "
+                             "analysed one by less than this (mean abs diff, 0-255)")
+    parser.add_argument("--gate-refresh", type=int, default=30,
+                        help="Force inference after this many gated frames")
+    parser.add_argument("--cooldown", type=float, default=5.0,
+                        help="Seconds before the same product is recommended again")
+    parser.add_argument("--wp", type=float, default=DEFAULT_WP)
+    parser.add_argument("--wt", type=float, default=DEFAULT_WT)
+    parser.add_argument("--wr", type=float, default=DEFAULT_WR)
+    args = parser.parse_args()
+
+    total = args.wp + args.wt + args.wr
+    run(
+        args.inputs, out_dir=args.out_dir, fmt=args.format, model=args.model,
+        inventory=args.inventory, workers=args.workers, overwrite=args.overwrite,
+        conf=args.conf, frame_skip=args.frame_skip, sample_fps=args.sample_fps,
+        batch_size=args.batch_size, cooldown=args.cooldown, track=not args.no_track,
+        gate_threshold=args.gate_threshold, gate_refresh=args.gate_refresh,
+        wp=args.wp / total, wt=args.wt / total, wr=args.wr / total,
+    )
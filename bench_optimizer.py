@@ -0,0 +1,383 @@
+"""
+bench_optimizer.py — NDU Optimizer Benchmark Suite
+ShopVision Pro v4.0
+
+Reproducible benchmarks for optimizer.py on synthetic vendor data (fixed
+seed, so every run ranks exactly the same offers):
+
+    rank_vendors         vendor dict lists, 2 → 1,000,000 offers (full + top-2)
+    rank_vendors_store   the same offers as vendor_store.VendorColumns views
+    rank_vendors_loop    one rank_vendors call per product (the scalar baseline)
+    rank_vendors_batch   1 → 100,000 products in one vectorised call
+    incremental          IncrementalRanker upsert / top-2 read
+    ranking_cache        RankingCache hit path
+    winner_map           WinnerMap build and weight lookup
+    basket               optimize_basket, 10 → 200 items over 10 platforms
+
+Every case reports latency percentiles (p50/p90/p99), throughput (calls/s
+and offers/s) and the peak Python heap allocated by one call (tracemalloc,
+which also sees numpy buffers). Results are written as JSON together with
+the git commit, so two runs can be compared with --compare.
+
+USAGE:
+    python bench_optimizer.py                             # full suite → bench_optimizer.json
+    python bench_optimizer.py --quick                     # ≤ 100k offers / 10k products
+    python bench_optimizer.py --only rank_vendors_batch --out before.json
+    python bench_optimizer.py --compare before.json after.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from optimizer import (
+    NUMPY_AVAILABLE, IncrementalRanker, RankingCache, WinnerMap,
+    optimize_basket, rank_vendors, rank_vendors_batch, stack_vendor_lists,
+)
+from vendor_store import VendorStore
+
+SEED           = 20240611
+OFFER_SIZES    = [2, 10, 100, 1_000, 10_000, 100_000, 1_000_000]
+PRODUCT_COUNTS = [1, 100, 1_000, 10_000, 100_000]
+OFFERS_PER_PRODUCT = 10
+QUICK_MAX_OFFERS   = 100_000
+QUICK_MAX_PRODUCTS = 10_000
+LOOP_MAX_PRODUCTS  = 10_000      # scalar baseline gets slow beyond this
+
+DELIVERY_CHOICES = [10, 12, 15, 20, 30, 45, 60, 120, 240, 1440, 2880]
+
+
+# ── Synthetic data ────────────────────────────────────────────────────────────
+
+def synthetic_vendors(n: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """*n* inventory.json-style vendor dicts with realistic spreads."""
+    return [
+        {
+            "vendor_name":   f"Vendor{i:07d}",
+            "price":         round(rng.lognormvariate(4.5, 0.35), 2),
+            "delivery_time": rng.choice(DELIVERY_CHOICES),
+            "rating":        round(rng.uniform(3.0, 5.0), 1),
+            "url":           f"https://example.com/p/{i}",
+        }
+        for i in range(n)
+    ]
+
+
+# ── Measurement ───────────────────────────────────────────────────────────────
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    pos = q * (len(sorted_values) - 1)
+    lo  = int(pos)
+    hi  = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def measure(
+    name:        str,
+    fn:          Callable[[], Any],
+    params:      Dict[str, Any],
+    items:       int   = 1,
+    min_calls:   int   = 5,
+    max_calls:   int   = 10_000,
+    min_seconds: float = 0.5,
+) -> Dict[str, Any]:
+    """
+    Time *fn* (one warm-up call, then at least *min_calls* calls and at
+    least *min_seconds* of work), then run it once more under tracemalloc.
+
+    *items* is the number of offers one call processes, for offers/s.
+    """
+    fn()
+    samples: List[float] = []
+    started = time.perf_counter()
+    while len(samples) < max_calls and (len(samples) < min_calls
+                                        or time.perf_counter() - started < min_seconds):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    samples.sort()
+    mean = statistics.fmean(samples)
+    return {
+        "name":   name,
+        "params": params,
+        "calls":  len(samples),
+        "latency_s": {
+            "min":  samples[0],
+            "p50":  _percentile(samples, 0.50),
+            "p90":  _percentile(samples, 0.90),
+            "p99":  _percentile(samples, 0.99),
+            "max":  samples[-1],
+            "mean": mean,
+        },
+        "throughput": {
+            "calls_per_s":  1.0 / mean if mean else None,
+            "offers_per_s": items / mean if mean else None,
+        },
+        "peak_mem_bytes": peak,
+    }
+
+
+def _report(result: Dict[str, Any]) -> None:
+    lat = result["latency_s"]
+    params = " ".join(f"{k}={v}" for k, v in result["params"].items())
+    print(f"  {result['name']:<20} {params:<34} "
+          f"p50 {lat['p50'] * 1e3:>10.3f} ms  p99 {lat['p99'] * 1e3:>10.3f} ms  "
+          f"{result['throughput']['offers_per_s']:>14,.0f} offers/s  "
+          f"peak {result['peak_mem_bytes'] / 1e6:>8.2f} MB")
+
+
+# ── Cases ─────────────────────────────────────────────────────────────────────
+
+def bench_rank_vendors(sizes: List[int], rng: random.Random) -> List[Dict[str, Any]]:
+    results = []
+    for n in sizes:
+        vendors = synthetic_vendors(n, rng)
+        results.append(measure("rank_vendors", lambda: rank_vendors(vendors),
+                               {"offers": n, "k": None}, items=n))
+        results.append(measure("rank_vendors", lambda: rank_vendors(vendors, k=2),
+                               {"offers": n, "k": 2}, items=n))
+    return results
+
+
+def bench_rank_vendors_store(sizes: List[int], rng: random.Random) -> List[Dict[str, Any]]:
+    results = []
+    for n in sizes:
+        store = VendorStore.from_inventory({"p_Can": {"vendors": synthetic_vendors(n, rng)}})
+        view  = store.view("p_Can")
+        results.append(measure("rank_vendors_store", lambda: rank_vendors(view, k=2),
+                               {"offers": n, "k": 2}, items=n))
+    return results
+
+
+def bench_loop_and_batch(counts: List[int], rng: random.Random) -> List[Dict[str, Any]]:
+    results = []
+    for p in counts:
+        lists = [synthetic_vendors(OFFERS_PER_PRODUCT, rng) for _ in range(p)]
+        n     = p * OFFERS_PER_PRODUCT
+        params = {"products": p, "offers": n}
+        if p <= LOOP_MAX_PRODUCTS:
+            results.append(measure("rank_vendors_loop",
+                                   lambda: [rank_vendors(v, k=2, explain=False) for v in lists],
+                                   params, items=n, min_calls=3))
+        if NUMPY_AVAILABLE:
+            arrays = stack_vendor_lists(lists)
+            results.append(measure("rank_vendors_batch", lambda: rank_vendors_batch(*arrays),
+                                   params, items=n, min_calls=3))
+    return results
+
+
+def bench_incremental(sizes: List[int], rng: random.Random) -> List[Dict[str, Any]]:
+    results = []
+    for n in sizes:
+        vendors = synthetic_vendors(n, rng)
+        ranker  = IncrementalRanker.from_vendors(vendors)
+        # Price moves inside the current range, so most updates stay incremental
+        p_lo = min(v["price"] for v in vendors)
+        p_hi = max(v["price"] for v in vendors)
+        updates = [(v["vendor_name"], {**v, "price": round(rng.uniform(p_lo, p_hi), 2)})
+                   for v in rng.choices(vendors, k=1000)]
+        cursor = [0]
+
+        def upsert_one():
+            offer_id, vendor = updates[cursor[0] % len(updates)]
+            cursor[0] += 1
+            ranker.upsert(offer_id, vendor)
+
+        results.append(measure("incremental_build", lambda: IncrementalRanker.from_vendors(vendors),
+                               {"offers": n}, items=n, min_calls=3))
+        results.append(measure("incremental_upsert", upsert_one, {"offers": n}, items=1))
+        results.append(measure("incremental_top2", lambda: ranker.ranked(k=2),
+                               {"offers": n, "explain": True}, items=n))
+        results.append(measure("incremental_top2", lambda: ranker.ranked(k=2, explain=False),
+                               {"offers": n, "explain": False}, items=2))
+    return results
+
+
+def bench_ranking_cache(rng: random.Random) -> List[Dict[str, Any]]:
+    vendors = synthetic_vendors(10, rng)
+    cache   = RankingCache(maxsize=512)
+    return [measure("ranking_cache_hit",
+                    lambda: cache.rank("p", vendors, inventory_version="v", k=2),
+                    {"offers": 10}, items=10)]
+
+
+def bench_winner_map(rng: random.Random) -> List[Dict[str, Any]]:
+    if not NUMPY_AVAILABLE:
+        return []
+    results = []
+    weights = []
+    for _ in range(1000):
+        a, b = rng.random(), rng.random()
+        if a + b > 1:
+            a, b = 1 - a, 1 - b
+        weights.append((a, b, 1 - a - b))
+    for n in (2, 10, 30):
+        vendors = synthetic_vendors(n, rng)
+        wmap    = WinnerMap(vendors)
+        cursor  = [0]
+
+        def lookup_one():
+            cursor[0] += 1
+            return wmap.lookup(*weights[cursor[0] % len(weights)])
+
+        results.append(measure("winner_map_build", lambda: WinnerMap(vendors),
+                               {"offers": n}, items=n, min_calls=3))
+        results.append(measure("winner_map_lookup", lookup_one, {"offers": n}, items=n))
+    return results
+
+
+def bench_basket(rng: random.Random) -> List[Dict[str, Any]]:
+    # Platform SLA model: each vendor quotes one delivery time for every item
+    platforms = {f"Platform{i}": rng.choice(DELIVERY_CHOICES) for i in range(10)}
+    results = []
+    for m in (10, 50, 200):
+        basket = {}
+        for i in range(m):
+            offers = synthetic_vendors(len(platforms), rng)
+            for offer, (name, minutes) in zip(offers, platforms.items()):
+                offer["vendor_name"], offer["delivery_time"] = name, minutes
+            basket[f"item{i}"] = rng.sample(offers, rng.randint(3, len(offers)))
+        n = sum(len(v) for v in basket.values())
+        results.append(measure("optimize_basket", lambda: optimize_basket(basket),
+                               {"items": m, "offers": n}, items=n, min_calls=3))
+    return results
+
+
+SUITES = {
+    "rank_vendors":       lambda cfg, rng: bench_rank_vendors(cfg["sizes"], rng),
+    "rank_vendors_store": lambda cfg, rng: bench_rank_vendors_store(cfg["sizes"], rng),
+    "rank_vendors_batch": lambda cfg, rng: bench_loop_and_batch(cfg["counts"], rng),
+    "incremental":        lambda cfg, rng: bench_incremental([n for n in (10, 1_000, 100_000)
+                                                              if n <= cfg["sizes"][-1]], rng),
+    "ranking_cache":      lambda cfg, rng: bench_ranking_cache(rng),
+    "winner_map":         lambda cfg, rng: bench_winner_map(rng),
+    "basket":             lambda cfg, rng: bench_basket(rng),
+}
+
+
+# ── Metadata / comparison ─────────────────────────────────────────────────────
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _max_rss_bytes() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:      # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _case_key(result: Dict[str, Any]) -> str:
+    return result["name"] + " " + json.dumps(result["params"], sort_keys=True)
+
+
+def compare(before_path: str, after_path: str, threshold: float = 0.10) -> int:
+    """Print p50 ratios between two result files; returns the number of regressions."""
+    with open(before_path, encoding="utf-8") as f:
+        before = {_case_key(r): r for r in json.load(f)["results"]}
+    with open(after_path, encoding="utf-8") as f:
+        after = {_case_key(r): r for r in json.load(f)["results"]}
+
+    regressions = 0
+    print(f"  {'case':<60} {'before p50':>12} {'after p50':>12} {'ratio':>7}")
+    for key in sorted(before.keys() & after.keys()):
+        old = before[key]["latency_s"]["p50"]
+        new = after[key]["latency_s"]["p50"]
+        ratio = new / old if old else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  ⚠ slower"
+            regressions += 1
+        elif ratio < 1 - threshold:
+            flag = "  ✓ faster"
+        print(f"  {key:<60} {old * 1e3:>10.3f}ms {new * 1e3:>10.3f}ms {ratio:>7.2f}{flag}")
+    print(f"\n  {regressions} case(s) slower by more than {threshold:.0%}")
+    return regressions
+
+
+def run(quick: bool = False, only: Optional[List[str]] = None, out: str = "bench_optimizer.json",
+        seed: int = SEED) -> Dict[str, Any]:
+    cfg = {
+        "sizes":  [n for n in OFFER_SIZES    if not quick or n <= QUICK_MAX_OFFERS],
+        "counts": [p for p in PRODUCT_COUNTS if not quick or p <= QUICK_MAX_PRODUCTS],
+    }
+    suites = only or list(SUITES)
+
+    print("=" * 65)
+    print("  ShopVision Pro v4.0 — NDU Optimizer Benchmarks")
+    print(f"  Suites : {', '.join(suites)}")
+    print(f"  Mode   : {'quick' if quick else 'full'}  (seed {seed})")
+    print(f"  Time   : {datetime.now().strftime('%Y-%m-%d  %H:%M:%S')}")
+    print("=" * 65)
+
+    results: List[Dict[str, Any]] = []
+    for suite in suites:
+        print(f"\n[{suite}]")
+        # Seed per suite so running a subset reproduces the same data
+        for result in SUITES[suite](cfg, random.Random(f"{seed}:{suite}")):
+            _report(result)
+            results.append(result)
+
+    report = {
+        "meta": {
+            "timestamp":     datetime.now().isoformat(timespec="seconds"),
+            "git_commit":    _git_commit(),
+            "python":        platform.python_version(),
+            "platform":      platform.platform(),
+            "cpu_count":     os.cpu_count(),
+            "numpy":         NUMPY_AVAILABLE,
+            "quick":         quick,
+            "seed":          seed,
+            "max_rss_bytes": _max_rss_bytes(),
+        },
+        "results": results,
+    }
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"\n  Results written to {out}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ShopVision Pro NDU optimizer benchmarks")
+    parser.add_argument("--quick", action="store_true",
+                        help=f"Cap sizes at {QUICK_MAX_OFFERS:,} offers / {QUICK_MAX_PRODUCTS:,} products")
+    parser.add_argument("--only", nargs="+", choices=list(SUITES), help="Run only these suites")
+    parser.add_argument("--out", default="bench_optimizer.json", help="JSON results file")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"),
+                        help="Compare two result files instead of running")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative p50 slowdown reported as a regression (--compare)")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, threshold=args.threshold) else 0)
+    run(quick=args.quick, only=args.only, out=args.out, seed=args.seed)
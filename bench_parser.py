@@ -0,0 +1,205 @@
+"""
+bench_parser.py — Search-Page Parser Benchmark
+ShopVision Pro v4.0
+
+Times scraper.parse_amazon / parse_bing per page under each parse
+configuration and checks that every configuration extracts exactly the
+same vendors as the original full-page html.parser build:
+
+    html.parser  full page        (baseline — the pre-optimisation path)
+    html.parser  result containers only (SoupStrainer)
+    lxml         full page        (if lxml is installed)
+    lxml         result containers only — the scraper's default with lxml
+
+Pages come from the HTTP cache written by `scraper.py --cache`
+(http_cache.py), so real recorded search pages can be benchmarked offline,
+or are generated synthetically (--synthetic) with realistic page weight
+around the results.
+
+Reports p50 parse time and peak traced memory per page and configuration,
+and writes everything as JSON. Memory is the Python heap as seen by
+tracemalloc; lxml's own C-level tree is not included.
+
+USAGE:
+    python bench_parser.py                          # pages recorded in .http_cache/
+    python bench_parser.py --synthetic 20           # 20 generated pages per site
+    python bench_parser.py --cache-dir /tmp/pages --out parse_bench.json
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import scraper
+from http_cache import DEFAULT_CACHE_DIR, ResponseCache
+
+BASELINE = ("html.parser", False)
+
+# (page kind, html, query, price_floor, price_ceil)
+Page = Tuple[str, str, str, float, float]
+
+
+# ── Page sources ──────────────────────────────────────────────────────────────
+
+def _bounds_for(query: str) -> Tuple[float, float]:
+    for product in scraper.PRODUCTS.values():
+        if product["query"] == query:
+            return product["price_floor"], product["price_ceil"]
+    return 0.0, float("inf")
+
+
+def recorded_pages(cache_dir: str) -> List[Page]:
+    """Amazon / Bing search pages stored in an http_cache directory."""
+    cache = ResponseCache(cache_dir, replay=True)
+    pages: List[Page] = []
+    for url in sorted(cache._index):
+        parts = urlsplit(url)
+        params = parse_qs(parts.query)
+        if parts.path == "/s" and "k" in params:
+            kind, query = "amazon", params["k"][0]
+        elif parts.path == "/shop" and "q" in params:
+            kind, query = "bing", params["q"][0]
+        else:
+            continue
+        pages.append((kind, cache.cached(url).text, query, *_bounds_for(query)))
+    return pages
+
+
+def _page_chrome(rng: random.Random) -> Tuple[str, str]:
+    """Header/nav/script bulk surrounding the results (search pages are mostly this)."""
+    nav = "".join(f'<li class="nav-item"><a href="/c/{i}">Category {i}</a></li>' for i in range(300))
+    script = "<script>window.__STATE__ = " + json.dumps(
+        {f"k{i}": [rng.random() for _ in range(20)] for i in range(400)}) + ";</script>"
+    head = f'<html><head><title>Search</title>{script}</head><body><header><ul class="nav">{nav}</ul></header>'
+    foot = "<footer>" + "".join(f'<div class="foot-link"><a href="/f/{i}">Link {i}</a></div>'
+                                for i in range(200)) + "</footer></body></html>"
+    return head, foot
+
+
+def synthetic_pages(count: int, seed: int = 7) -> List[Page]:
+    rng = random.Random(seed)
+    head, foot = _page_chrome(rng)
+    pages: List[Page] = []
+    for n in range(count):
+        results = []
+        for i in range(48):
+            price = rng.randint(20, 400)
+            title = ("Fresh " if rng.random() < 0.15 else "") + f"Product {n}-{i} pack of {rng.randint(1, 24)}"
+            results.append(
+                f'<div data-component-type="s-search-result" class="s-result-item">'
+                f'<div class="s-card"><h2><a href="/dp/B{n:03d}{i:03d}?ref=sr_1"><span>{title}</span></a></h2>'
+                f'<div class="a-row"><span class="a-price"><span class="a-price-whole">{price:,}.</span>'
+                f'<span class="a-price-fraction">{rng.randint(0, 99):02d}</span></span></div>'
+                f'<i class="a-icon"><span class="a-icon-alt">{rng.uniform(3, 5):.1f} out of 5 stars</span></i>'
+                f'<div class="a-row">' + "<span>badge</span>" * 20 + '</div></div></div>')
+        pages.append(("amazon", head + "".join(results) + foot, f"query {n}", 20.0, 400.0))
+
+        cards = []
+        for i in range(30):
+            seller = rng.choice(list(scraper.DELIVERY)).title()
+            cards.append(
+                f'<div class="br-item"><a href="https://shop.example/{n}/{i}">'
+                f'<div class="pu-title">Item {i}</div></a>'
+                f'<div class="pu-finalPrice">₹{rng.randint(20, 400)}.00</div>'
+                f'<div class="pu-seller">{seller}</div></div>')
+        pages.append(("bing", head + "".join(cards) + foot, f"query {n}", 20.0, 400.0))
+    return pages
+
+
+# ── Measurement ───────────────────────────────────────────────────────────────
+
+def configurations() -> List[Tuple[str, bool]]:
+    configs = [("html.parser", False), ("html.parser", True)]
+    if scraper.HTML_PARSER == "lxml":
+        configs += [("lxml", False), ("lxml", True)]
+    return configs
+
+
+def _time_parse(fn: Callable[[], Any], repeats: int) -> Tuple[float, int]:
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(samples), peak
+
+
+def run(pages: List[Page], repeats: int = 3, out: str = "bench_parser.json") -> Dict[str, Any]:
+    parsers = {"amazon": scraper.parse_amazon, "bing": scraper.parse_bing}
+    configs = configurations()
+
+    print("=" * 65)
+    print("  ShopVision Pro v4.0 — Search-Page Parser Benchmark")
+    print(f"  Pages   : {len(pages)}")
+    labels = [p + (" (containers)" if r else "") for p, r in configs]
+    print(f"  Configs : {', '.join(labels)}")
+    print("=" * 65)
+
+    rows: List[Dict[str, Any]] = []
+    mismatches = 0
+    for idx, (kind, html, query, lo, hi) in enumerate(pages):
+        parse = parsers[kind]
+        expected = parse(html, query, lo, hi, parser=BASELINE[0], restrict=BASELINE[1])
+        for parser, restrict in configs:
+            fn = lambda: parse(html, query, lo, hi, parser=parser, restrict=restrict)
+            identical = fn() == expected
+            mismatches += not identical
+            seconds, peak = _time_parse(fn, repeats)
+            rows.append({"page": idx, "kind": kind, "bytes": len(html.encode("utf-8")),
+                         "parser": parser, "containers_only": restrict,
+                         "p50_s": seconds, "peak_mem_bytes": peak,
+                         "vendors": len(expected), "identical": identical})
+
+    summary = []
+    print(f"\n  {'config':<32} {'pages':>6} {'ms/page':>10} {'peak MB/page':>13} {'speed-up':>9}")
+    base_ms = None
+    for parser, restrict in configs:
+        sel = [r for r in rows if r["parser"] == parser and r["containers_only"] == restrict]
+        if not sel:
+            continue
+        ms   = statistics.fmean(r["p50_s"] for r in sel) * 1e3
+        peak = statistics.fmean(r["peak_mem_bytes"] for r in sel) / 1e6
+        base_ms = base_ms or ms
+        label = parser + (" (containers only)" if restrict else " (full page)")
+        print(f"  {label:<32} {len(sel):>6} {ms:>10.2f} {peak:>13.2f} {base_ms / ms:>8.1f}x")
+        summary.append({"parser": parser, "containers_only": restrict, "pages": len(sel),
+                        "ms_per_page": ms, "peak_mb_per_page": peak, "speedup": base_ms / ms})
+    print(f"\n  Vendor mismatches vs baseline: {mismatches}")
+
+    report = {
+        "meta":    {"timestamp": datetime.now().isoformat(timespec="seconds"),
+                    "default_parser": scraper.HTML_PARSER, "repeats": repeats},
+        "summary": summary,
+        "pages":   rows,
+    }
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"  Results written to {out}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ShopVision Pro search-page parser benchmark")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="http_cache directory with recorded search pages")
+    parser.add_argument("--synthetic", type=int, default=0, metavar="N",
+                        help="Benchmark N generated pages per site instead of recorded ones")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed parses per page and config")
+    parser.add_argument("--out", default="bench_parser.json")
+    args = parser.parse_args()
+
+    pages = synthetic_pages(args.synthetic) if args.synthetic else recorded_pages(args.cache_dir)
+    if not pages:
+        raise SystemExit(f"No recorded search pages in '{args.cache_dir}'. "
+                         "Run scraper.py --cache first, or pass --synthetic N.")
+    run(pages, repeats=args.repeats, out=args.out)
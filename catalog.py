@@ -0,0 +1,69 @@
+"""
+catalog.py — Inventory Lookup Index
+ShopVision Pro v4.0
+
+Maps detector output (class label, geometric subtype) to inventory.json
+product records in O(1):
+
+    (normalised label, lower-case subtype)  →  product record
+
+Label spellings produced by different model versions ("coca-cola",
+"cocacola", "Coca Cola", ...) are folded onto the inventory key prefix
+("coca_cola") once, when the index is built, instead of on every box.
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+from vendor_store import VendorStore
+
+# Detector label spellings → canonical inventory key prefix
+LABEL_ALIASES = {
+    "cocacola":  "coca_cola",
+    "coca_cola": "coca_cola",
+    "coke":      "coca_cola",
+}
+
+IndexKey = Tuple[str, str]
+
+
+def normalise_label(label: str) -> str:
+    """Lower-case, unify separators to '_', then resolve known aliases."""
+    norm = label.strip().lower().replace("-", "_").replace(" ", "_")
+    return LABEL_ALIASES.get(norm, norm)
+
+
+def _split_key(db_key: str) -> Optional[IndexKey]:
+    """'coca_cola_Bottle' → ('coca_cola', 'bottle'); None if there is no subtype."""
+    label, sep, subtype = db_key.rpartition("_")
+    if not sep or not label or not subtype:
+        return None
+    return normalise_label(label), subtype.lower()
+
+
+def build_product_index(
+    db:    Dict[str, Dict[str, Any]],
+    store: Optional[VendorStore] = None,
+) -> Dict[IndexKey, Dict[str, Any]]:
+    """
+    Build the lookup index for an inventory dict (as loaded from inventory.json).
+    Call once per inventory version; the records are shared, not copied.
+
+    With a *store* (vendor_store.VendorStore built from the same inventory),
+    each indexed record is a shallow copy whose "vendors" is the product's
+    columnar `VendorColumns` view, so callers rank without per-vendor dicts
+    and the original vendor dict lists can be released.
+    """
+    index: Dict[IndexKey, Dict[str, Any]] = {}
+    for db_key, record in db.items():
+        key = _split_key(db_key)
+        if key is None or key in index:     # first entry wins, like the old linear scan
+            continue
+        if store is not None and db_key in store:
+            record = {**record, "vendors": store.view(db_key)}
+        index[key] = record
+    return index
+
+
+def lookup_product(index: Dict[IndexKey, Dict[str, Any]], label: str, subtype: str) -> Optional[Dict[str, Any]]:
+    """Return the product record for a detected (label, subtype), or None."""
+    return index.get((normalise_label(label), subtype.lower()))
@@ -0,0 +1,190 @@
+"""
+check_scraper_parity.py — Sequential / Concurrent Scraper Parity Check
+ShopVision Pro v4.0
+
+Scrapes the same products twice against a local stub server, once with the
+sequential scraper and once with the asyncio engine (async_scraper.py), each
+into its own copy of inventory.json, and checks that both inventories come
+out identical ("scraped_at" timestamps aside).
+
+The stub (http.server, standard library only) answers the Amazon search
+(/s?k=...) and Bing Shopping (/shop?q=...) URLs with deterministic result
+pages: prices are derived from the query, mostly inside the product's
+price_floor..price_ceil with a few outliers the parsers must drop. Queries
+listed in --empty get a page without results, so the "retain curated
+data" path is compared as well.
+
+Exits with status 1 and prints the differing products when the two engines
+disagree. No real site is contacted and the repository's inventory.json is
+never modified.
+
+USAGE:
+    python check_scraper_parity.py
+    python check_scraper_parity.py --delay 0.2 --rate 20 --per-host 4
+    python check_scraper_parity.py --empty "Pepsi can 330ml"
+"""
+
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import scraper
+from async_scraper import HostLimit
+from inventory_store import read_inventory
+
+AMAZON_RESULTS = 8
+BING_RESULTS   = 6
+BING_SELLERS   = ("Flipkart", "BigBasket", "JioMart", "Blinkit", "Snapdeal Store", "Tata 1mg")
+
+
+# ── Stub search pages ─────────────────────────────────────────────────────────
+
+def _prices(query: str, floor: float, ceil: float, count: int) -> List[float]:
+    """Deterministic prices for *query*; every fourth one is outside the bounds."""
+    rng = random.Random(query)
+    prices = []
+    for i in range(count):
+        price = rng.uniform(floor, min(ceil, floor * 4))
+        if i % 4 == 3:
+            price = ceil * 2 + i
+        prices.append(round(price, 2))
+    return prices
+
+
+def amazon_page(query: str, floor: float, ceil: float) -> str:
+    results = []
+    for i, price in enumerate(_prices(query, floor, ceil, AMAZON_RESULTS)):
+        title = ("Fresh " if i == 2 else "") + f"{query} pack {i}"
+        whole, fraction = f"{price:.2f}".split(".")
+        results.append(
+            f'<div data-component-type="s-search-result" class="s-result-item">'
+            f'<h2><a href="/dp/STUB{i:04d}?ref=sr_1"><span>{title}</span></a></h2>'
+            f'<span class="a-price"><span class="a-price-whole">{int(whole):,}.</span>'
+            f'<span class="a-price-fraction">{fraction}</span></span>'
+            f'<i class="a-icon"><span class="a-icon-alt">{3.5 + i * 0.2:.1f} out of 5 stars</span></i></div>')
+    return "<html><body><header>Amazon stub</header>" + "".join(results) + "</body></html>"
+
+
+def bing_page(query: str, floor: float, ceil: float) -> str:
+    cards = []
+    for i, price in enumerate(_prices(query + " bing", floor, ceil, BING_RESULTS)):
+        cards.append(
+            f'<div class="br-item"><a href="https://shop.example/{i}">{query}</a>'
+            f'<div class="pu-finalPrice">₹{price:,.2f}</div>'
+            f'<div class="pu-seller">{BING_SELLERS[i]}</div></div>')
+    return "<html><body>" + "".join(cards) + "</body></html>"
+
+
+class StubShopHandler(BaseHTTPRequestHandler):
+    """Serves amazon_page / bing_page for the queries in `bounds`."""
+
+    bounds: Dict[str, Tuple[float, float]] = {}
+    empty:  frozenset = frozenset()
+    delay:  float = 0.05                 # seconds, simulated server latency
+
+    def do_GET(self) -> None:
+        parts  = urlsplit(self.path)
+        params = parse_qs(parts.query)
+        if parts.path == "/s" and "k" in params:
+            query, page = params["k"][0], amazon_page
+        elif parts.path == "/shop" and "q" in params:
+            query, page = params["q"][0], bing_page
+        else:
+            self.send_error(404)
+            return
+        time.sleep(self.delay)
+        html = "<html><body></body></html>" if query in self.empty else \
+            page(query, *self.bounds.get(query, (1.0, 1000.0)))
+        body = html.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def start_stub(products: Dict[str, Dict[str, Any]], empty: Iterable[str] = (),
+               delay: float = 0.05) -> Tuple[ThreadingHTTPServer, str]:
+    """Serve stub pages for *products* on a free local port; returns (server, base URL)."""
+    handler = type("Handler", (StubShopHandler,), {
+        "bounds": {p["query"]: (p["price_floor"], p["price_ceil"]) for p in products.values()},
+        "empty":  frozenset(empty),
+        "delay":  delay,
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# ── Comparison ────────────────────────────────────────────────────────────────
+
+def _without_timestamps(db: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    return {key: {k: v for k, v in record.items() if k != "scraped_at"} for key, record in db.items()}
+
+
+def check(
+    products:  Optional[Dict[str, Dict[str, Any]]] = None,
+    empty:     Iterable[str] = (),
+    delay:     float = 0.05,
+    limit:     HostLimit = HostLimit(rate=20.0, burst=2, concurrency=4),
+    inventory: str = str(Path(scraper.__file__).parent / "inventory.json"),
+) -> List[str]:
+    """
+    Run both engines against the stub, each on a copy of *inventory*, and
+    return the keys whose records differ (empty list: parity).
+    """
+    products = scraper.PRODUCTS if products is None else products
+    server, base_url = start_stub(products, empty, delay)
+    base_urls = {"amazon": base_url, "bing": base_url}
+    pause, scraper.REQUEST_PAUSE = scraper.REQUEST_PAUSE, 0.0   # the stub needs no politeness
+    try:
+        with tempfile.TemporaryDirectory(prefix="shopvision_parity_") as tmp:
+            results = {}
+            for engine, concurrent in (("sequential", False), ("concurrent", True)):
+                path = Path(tmp) / f"{engine}.json"
+                if Path(inventory).exists():
+                    shutil.copy(inventory, path)
+                kwargs = {"default": limit} if concurrent else {}
+                scraper.run(concurrent=concurrent, base_urls=base_urls, products=products,
+                            inventory=str(path), **kwargs)
+                results[engine] = _without_timestamps(read_inventory(str(path)).db)
+    finally:
+        scraper.REQUEST_PAUSE = pause
+        server.shutdown()
+        server.server_close()
+
+    seq, conc = results["sequential"], results["concurrent"]
+    return sorted(key for key in seq.keys() | conc.keys() if seq.get(key) != conc.get(key))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ShopVision Pro sequential/concurrent scraper parity check")
+    parser.add_argument("--delay", type=float, default=0.05, help="Stub server latency per request (s)")
+    parser.add_argument("--rate", type=float, default=20.0, help="Concurrent engine: requests per second per host")
+    parser.add_argument("--burst", type=int, default=2, help="Concurrent engine: burst per host")
+    parser.add_argument("--per-host", type=int, default=4, help="Concurrent engine: max in-flight requests per host")
+    parser.add_argument("--empty", nargs="*", default=[], metavar="QUERY",
+                        help="Queries the stub answers with no results")
+    args = parser.parse_args()
+
+    differing = check(empty=args.empty, delay=args.delay,
+                      limit=HostLimit(rate=args.rate, burst=args.burst, concurrency=args.per_host))
+
+    print(f"\n{'=' * 65}")
+    if differing:
+        print(f"  ✗  Parity check FAILED — {len(differing)} product(s) differ: {', '.join(differing)}")
+    else:
+        print("  ✅ Parity check passed — sequential and concurrent inventories are identical")
+    print("=" * 65)
+    sys.exit(1 if differing else 0)
@@ -0,0 +1,267 @@
+"""
+http_cache.py — On-Disk HTTP Response Cache
+ShopVision Pro v4.0
+
+Persistent cache for the scraper's search-page GETs:
+
+    <directory>/index.json           URL → {body hash, status, validators,
+                                            fetched_at, last_used, size}
+    <directory>/objects/<sha256>     response bodies, content-addressed
+                                     (identical pages are stored once)
+
+Lookup policy for `ResponseCache.get(session, url)`:
+
+    fresh   (age < ttl)            → served from disk, no request
+    stale, has ETag/Last-Modified  → conditional GET (If-None-Match /
+                                     If-Modified-Since); 304 refreshes the
+                                     entry and serves the cached body
+    stale, no validators / miss    → normal GET, 200 responses are stored
+
+The cache is bounded by `max_bytes` of body data; least-recently-used
+entries are evicted first, and the body files of evicted entries are
+deleted.
+
+One writer per directory: the index is loaded when the cache is opened and
+written back whole, so a second process writing to the same directory would
+lose entries and could delete bodies the other still indexes. Give
+concurrent scrapers (e.g. a scheduler next to the app's refresh) separate
+--cache-dir values; read-only users such as bench_parser.py are fine.
+
+Access times and revalidations are kept in memory and written to
+index.json by `flush()` (new bodies and evictions are written at once).
+
+Replay mode (`replay=True`) never touches the network: every URL is served
+from the recorded responses regardless of age, and a URL that was never
+recorded raises `CacheMiss`. Record once with the cache enabled, then
+replay to refresh instantly, or to test and benchmark the parsers offline.
+
+Thread-safe (the async scraper fetches from worker threads).
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_DIR = ".http_cache"
+DEFAULT_TTL       = 900                 # seconds — a refresh within 15 min is served from disk
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class CacheMiss(LookupError):
+    """Replay mode was asked for a URL that was never recorded."""
+
+
+class CachedResponse:
+    """
+    Minimal `requests.Response` stand-in returned by `ResponseCache.get`.
+    `from_cache` is True when the body came from disk; `revalidated` is
+    additionally True when a conditional request (304) was made for it.
+    """
+
+    def __init__(self, url: str, status_code: int, text: str, from_cache: bool,
+                 revalidated: bool = False):
+        self.url         = url
+        self.status_code = status_code
+        self.text        = text
+        self.from_cache  = from_cache
+        self.revalidated = revalidated
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise IOError(f"{self.status_code} Error for url: {self.url}")
+
+
+class ResponseCache:
+    """
+    Parameters
+    ----------
+    directory : str or Path
+        Cache root (created on demand). One writing process at a time.
+    ttl : float
+        Seconds an entry is served without contacting the server.
+    max_bytes : int
+        Upper bound on stored body bytes; LRU entries are evicted beyond it.
+    replay : bool
+        Serve only recorded responses; never make requests.
+    """
+
+    def __init__(
+        self,
+        directory: str   = DEFAULT_CACHE_DIR,
+        ttl:       float = DEFAULT_TTL,
+        max_bytes: int   = DEFAULT_MAX_BYTES,
+        replay:    bool  = False,
+    ):
+        self.directory = Path(directory)
+        self.objects   = self.directory / "objects"
+        self.ttl       = ttl
+        self.max_bytes = max_bytes
+        self.replay    = replay
+
+        self.hits          = 0
+        self.revalidated   = 0
+        self.misses        = 0
+        self._lock  = threading.Lock()
+        self._dirty = False
+        self._index: Dict[str, Dict[str, Any]] = self._load_index()
+
+    # ── Index persistence ─────────────────────────────────────────────────────
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.directory / "index.json", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.directory / f"index.json.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp, self.directory / "index.json")     # atomic on POSIX and Windows
+        self._dirty = False
+
+    def flush(self) -> None:
+        """Write pending access-time / revalidation updates to index.json."""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    # ── Entries ───────────────────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def size_bytes(self) -> int:
+        """Stored body bytes (a body shared by several URLs counts once)."""
+        return sum({e["body"]: e["size"] for e in self._index.values()}.values())
+
+    def _read_body(self, entry: Dict[str, Any]) -> Optional[str]:
+        try:
+            return (self.objects / entry["body"]).read_bytes().decode("utf-8")
+        except OSError:
+            return None
+
+    def _unlink_unreferenced(self, bodies) -> None:
+        """Delete those of *bodies* that no entry of the index references any more."""
+        live = {e["body"] for e in self._index.values()}
+        for body in set(bodies) - live:
+            (self.objects / body).unlink(missing_ok=True)
+
+    def _store(self, url: str, resp, now: float) -> None:
+        old    = self._index.get(url)
+        data   = resp.text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path   = self.objects / digest
+        if not path.exists():
+            self.objects.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        self._index[url] = {
+            "body":          digest,
+            "status":        resp.status_code,
+            "etag":          resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "fetched_at":    now,
+            "last_used":     now,
+            "size":          len(data),
+        }
+        self._evict()
+        if old is not None:
+            self._unlink_unreferenced([old["body"]])     # the page changed
+        self._save_index()
+
+    def _evict(self) -> None:
+        """Drop least-recently-used entries until the bodies fit in max_bytes."""
+        refs: Dict[str, int] = {}
+        for e in self._index.values():
+            refs[e["body"]] = refs.get(e["body"], 0) + 1
+        total   = self.size_bytes
+        evicted = []
+        for url in sorted(self._index, key=lambda u: self._index[u]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            entry = self._index.pop(url)
+            evicted.append(entry["body"])
+            refs[entry["body"]] -= 1
+            if not refs[entry["body"]]:
+                total -= entry["size"]
+        self._unlink_unreferenced(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            bodies = [e["body"] for e in self._index.values()]
+            self._index.clear()
+            self._unlink_unreferenced(bodies)
+            self._save_index()
+
+    # ── Lookup ────────────────────────────────────────────────────────────────
+
+    def cached(self, url: str) -> Optional[CachedResponse]:
+        """
+        The response for *url* if it can be served without a request (fresh,
+        or any recorded entry in replay mode), else None. Raises CacheMiss in
+        replay mode when the URL was never recorded.
+        """
+        with self._lock:
+            entry = self._index.get(url)
+            now   = time.time()
+            if entry is not None and (self.replay or now - entry["fetched_at"] < self.ttl):
+                text = self._read_body(entry)
+                if text is not None:
+                    entry["last_used"] = now
+                    self.hits += 1
+                    self._dirty = True
+                    return CachedResponse(url, entry["status"], text, from_cache=True)
+            if self.replay:
+                raise CacheMiss(f"No recorded response for {url}")
+            return None
+
+    def get(self, session, url: str, timeout: float = 15) -> CachedResponse:
+        """
+        GET *url* through *session* with caching (see module docstring).
+        Raises for HTTP error statuses, like `raise_for_status()`.
+        """
+        resp = self.cached(url)
+        if resp is not None:
+            resp.raise_for_status()
+            return resp
+
+        with self._lock:
+            entry = self._index.get(url)
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        live = session.get(url, timeout=timeout, headers=headers or None)
+        if live.status_code == 304:
+            with self._lock:
+                text = self._read_body(entry) if entry is not None else None
+                if text is not None:
+                    entry["fetched_at"] = entry["last_used"] = time.time()
+                    self.revalidated += 1
+                    self._dirty = True
+                    return CachedResponse(url, entry["status"], text, from_cache=True,
+                                          revalidated=True)
+            live = session.get(url, timeout=timeout)       # body file lost: fetch it in full
+        now = time.time()
+        with self._lock:
+            self.misses += 1
+            live.raise_for_status()
+            if live.status_code == 200:
+                self._store(url, live, now)
+        return CachedResponse(url, live.status_code, live.text, from_cache=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self), "bytes": self.size_bytes, "hits": self.hits,
+                "revalidated": self.revalidated, "misses": self.misses}
@@ -0,0 +1,333 @@
+"""
+inventory_db.py — SQLite Inventory Backend
+ShopVision Pro v4.0
+
+Embedded, indexed alternative to inventory.json for large catalogues.
+Processes query the rows they need instead of parsing the whole document:
+
+    products     key (unique), normalised detector label + subtype, name,
+                 version, extra record fields (JSON)
+    offers       one row per vendor offer, keyed (product, position)
+    scrape_meta  scraped_at / sources_used per product
+    meta         inventory-wide values (current version)
+
+Indexes: products.key (unique), products(label, subtype) for detector
+lookups, offers.vendor_name, and scrape_meta.scraped_at for freshness
+queries. Records read back are the same dicts inventory.json holds, so the
+database round-trips through `import_json` / `export_json`.
+
+    InventoryDB.get(key)          one product: 1 indexed row + its offers
+    InventoryDB.upsert(key, rec)  replaces one product's rows in a single
+                                  transaction; bumps the version
+    InventoryDB.product_index()   drop-in for catalog.build_product_index
+                                  that looks products up on demand
+
+Opened in WAL mode, so readers in other processes are not blocked while
+the scraper writes.
+
+USAGE:
+    python inventory_db.py import inventory.json inventory.db
+    python inventory_db.py export inventory.db inventory.json
+    python inventory_db.py info inventory.db
+
+Requires only the standard library's sqlite3 module.
+"""
+
+import argparse
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from catalog import IndexKey, _split_key, normalise_label
+from inventory_store import read_inventory, write_snapshot
+
+DEFAULT_DB            = "inventory.db"
+DATA_VERSION_INTERVAL = 0.25      # seconds between checks for other writers (DBProductIndex)
+
+# Record fields with their own columns; anything else goes to products.extra
+_RECORD_FIELDS = ("name", "vendors", "scraped_at", "sources_used", "version")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id       INTEGER PRIMARY KEY,
+    key      TEXT    NOT NULL UNIQUE,
+    label    TEXT,
+    subtype  TEXT,
+    name     TEXT    NOT NULL,
+    version  INTEGER NOT NULL DEFAULT 0,
+    extra    TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_products_label ON products(label, subtype);
+
+CREATE TABLE IF NOT EXISTS offers (
+    product_id    INTEGER NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+    position      INTEGER NOT NULL,
+    vendor_name   TEXT    NOT NULL,
+    price         REAL    NOT NULL,
+    delivery_time INTEGER NOT NULL,
+    rating        REAL    NOT NULL,
+    url           TEXT,
+    source        TEXT,
+    PRIMARY KEY (product_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_offers_vendor ON offers(vendor_name);
+
+CREATE TABLE IF NOT EXISTS scrape_meta (
+    product_id   INTEGER PRIMARY KEY REFERENCES products(id) ON DELETE CASCADE,
+    scraped_at   TEXT,
+    sources_used TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_scrape_meta_time ON scrape_meta(scraped_at);
+
+CREATE TABLE IF NOT EXISTS meta (
+    name  TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class InventoryDB:
+    """
+    Parameters
+    ----------
+    path : str
+        SQLite database file (created with the schema on first open).
+    """
+
+    def __init__(self, path: str = DEFAULT_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        with self.conn:
+            self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "InventoryDB":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ── Version ───────────────────────────────────────────────────────────────
+
+    @property
+    def version(self) -> int:
+        """Highest record version (bumped by every upsert)."""
+        row = self.conn.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+        return int(row[0]) if row else 0
+
+    @property
+    def data_version(self) -> int:
+        """Changes whenever another connection commits (SQLite PRAGMA data_version)."""
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    # ── Writes ────────────────────────────────────────────────────────────────
+
+    def _write(self, key: str, record: Dict[str, Any], version: int) -> None:
+        split = _split_key(key)
+        label, subtype = split if split is not None else (None, None)
+        extra = {k: v for k, v in record.items() if k not in _RECORD_FIELDS}
+        self.conn.execute(
+            "INSERT INTO products (key, label, subtype, name, version, extra) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET label = excluded.label, subtype = excluded.subtype, "
+            "name = excluded.name, version = excluded.version, extra = excluded.extra",
+            (key, label, subtype, record.get("name", key), version,
+             json.dumps(extra, ensure_ascii=False) if extra else None),
+        )
+        (pid,) = self.conn.execute("SELECT id FROM products WHERE key = ?", (key,)).fetchone()
+        self.conn.execute("DELETE FROM offers WHERE product_id = ?", (pid,))
+        self.conn.executemany(
+            "INSERT INTO offers VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(pid, pos, v["vendor_name"], float(v["price"]), int(v["delivery_time"]),
+              float(v["rating"]), v.get("url", "#"), v.get("source"))
+             for pos, v in enumerate(record.get("vendors", []))],
+        )
+        self.conn.execute(
+            "INSERT OR REPLACE INTO scrape_meta VALUES (?, ?, ?)",
+            (pid, record.get("scraped_at"),
+             json.dumps(record["sources_used"]) if "sources_used" in record else None),
+        )
+        self.conn.execute(
+            "INSERT INTO meta VALUES ('version', ?) ON CONFLICT(name) "
+            "DO UPDATE SET value = MAX(CAST(value AS INTEGER), CAST(excluded.value AS INTEGER))", (version,))
+
+    def upsert(self, key: str, record: Dict[str, Any]) -> int:
+        """Replace product *key* with *record* (one transaction); returns its version."""
+        with self.conn:
+            version = self.version + 1
+            self._write(key, record, version)
+        return version
+
+    def import_json(self, path: str = "inventory.json") -> int:
+        """
+        Load an inventory.json (with its update journal) into the database,
+        keeping record versions. Returns the number of products imported.
+        """
+        snapshot = read_inventory(path)
+        with self.conn:
+            for key, record in snapshot.db.items():
+                self._write(key, record, record.get("version", 0))
+        return len(snapshot.db)
+
+    # ── Reads ─────────────────────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def __contains__(self, key: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM products WHERE key = ?", (key,)).fetchone() is not None
+
+    def keys(self) -> List[str]:
+        return [k for (k,) in self.conn.execute("SELECT key FROM products ORDER BY id")]
+
+    def _record(self, row: Tuple) -> Dict[str, Any]:
+        pid, name, version, extra, scraped_at, sources_used = row[:6]
+        vendors = []
+        for vendor_name, price, delivery_time, rating, url, source in self.conn.execute(
+                "SELECT vendor_name, price, delivery_time, rating, url, source FROM offers "
+                "WHERE product_id = ? ORDER BY position", (pid,)):
+            entry = {"vendor_name": vendor_name, "price": price, "delivery_time": delivery_time,
+                     "rating": rating, "url": url}
+            if source is not None:
+                entry["source"] = source
+            vendors.append(entry)
+        record: Dict[str, Any] = {"name": name, "vendors": vendors}
+        if extra:
+            record.update(json.loads(extra))
+        if scraped_at is not None:
+            record["scraped_at"] = scraped_at
+        if sources_used is not None:
+            record["sources_used"] = json.loads(sources_used)
+        if version:
+            record["version"] = version
+        return record
+
+    _SELECT = ("SELECT p.id, p.name, p.version, p.extra, m.scraped_at, m.sources_used, p.label, p.subtype "
+               "FROM products p LEFT JOIN scrape_meta m ON m.product_id = p.id ")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The inventory.json-style record for *key*, or None."""
+        row = self.conn.execute(self._SELECT + "WHERE p.key = ?", (key,)).fetchone()
+        return self._record(row) if row else None
+
+    def lookup(self, label: str, subtype: str) -> Optional[Dict[str, Any]]:
+        """Record for a detected (label, subtype), like catalog.lookup_product."""
+        row = self.conn.execute(self._SELECT + "WHERE p.label = ? AND p.subtype = ? ORDER BY p.id LIMIT 1",
+                                (normalise_label(label), subtype.lower())).fetchone()
+        return self._record(row) if row else None
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Every (key, record), in insertion order (a full scan)."""
+        for key in self.keys():
+            yield key, self.get(key)
+
+    def offers_by_vendor(self, vendor_name: str) -> List[Tuple[str, float]]:
+        """(product key, price) of every offer from *vendor_name*."""
+        return self.conn.execute(
+            "SELECT p.key, o.price FROM offers o JOIN products p ON p.id = o.product_id "
+            "WHERE o.vendor_name = ? ORDER BY p.id", (vendor_name,)).fetchall()
+
+    def freshness(self) -> Tuple[Optional[str], Optional[str]]:
+        """(oldest, newest) scraped_at across all products."""
+        return self.conn.execute("SELECT MIN(scraped_at), MAX(scraped_at) FROM scrape_meta").fetchone()
+
+    def export_json(self, path: str = "inventory.json") -> int:
+        """Write every product as an inventory.json snapshot (write-then-rename)."""
+        db = dict(self.items())
+        write_snapshot(db, path)
+        return len(db)
+
+    def product_index(self, maxsize: int = 4096,
+                      check_interval: float = DATA_VERSION_INTERVAL) -> "DBProductIndex":
+        return DBProductIndex(self, maxsize, check_interval)
+
+
+class DBProductIndex:
+    """
+    Lazy replacement for the dict built by catalog.build_product_index:
+    `get((label, subtype))` queries the database on first use and memoises
+    up to *maxsize* records. The memo is dropped when another process has
+    committed to the database; get() checks for that at most once every
+    *check_interval* seconds, so memoised lookups (one per detected box)
+    stay query-free. Call refresh() to check right away.
+    """
+
+    def __init__(self, db: InventoryDB, maxsize: int = 4096,
+                 check_interval: float = DATA_VERSION_INTERVAL):
+        self.db             = db
+        self.maxsize        = maxsize
+        self.check_interval = check_interval
+        self._memo: "OrderedDict[IndexKey, Optional[Dict[str, Any]]]" = OrderedDict()
+        self._data_version = db.data_version
+        self._checked_at   = time.monotonic()
+
+    def refresh(self) -> bool:
+        """Drop the memo if the database changed since the last check; True if it did."""
+        self._checked_at = time.monotonic()
+        data_version = self.db.data_version
+        if data_version == self._data_version:
+            return False
+        self._memo.clear()
+        self._data_version = data_version
+        return True
+
+    def get(self, key: IndexKey, default=None) -> Optional[Dict[str, Any]]:
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self.refresh()
+        if key in self._memo:
+            self._memo.move_to_end(key)
+            record = self._memo[key]
+        else:
+            record = self._memo[key] = self.db.lookup(*key)
+            if len(self._memo) > self.maxsize:
+                self._memo.popitem(last=False)
+        return record if record is not None else default
+
+    def __contains__(self, key: IndexKey) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self.db)
+
+    def values(self) -> Iterator[Dict[str, Any]]:
+        """Every indexed record (a full scan; first product per (label, subtype))."""
+        seen = set()
+        for row in self.db.conn.execute(
+                self.db._SELECT + "WHERE p.label IS NOT NULL ORDER BY p.id").fetchall():
+            if row[6:8] not in seen:
+                seen.add(row[6:8])
+                yield self.db._record(row)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ShopVision Pro SQLite inventory tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_import = sub.add_parser("import", help="Load inventory.json into a database")
+    p_import.add_argument("json_path")
+    p_import.add_argument("db_path", nargs="?", default=DEFAULT_DB)
+    p_export = sub.add_parser("export", help="Write a database out as inventory.json")
+    p_export.add_argument("db_path")
+    p_export.add_argument("json_path", nargs="?", default="inventory.json")
+    p_info = sub.add_parser("info", help="Summarise a database")
+    p_info.add_argument("db_path", nargs="?", default=DEFAULT_DB)
+    args = parser.parse_args()
+
+    with InventoryDB(args.db_path) as inventory:
+        if args.command == "import":
+            count = inventory.import_json(args.json_path)
+            print(f"  ✅ Imported {count} products  {args.json_path}  →  {args.db_path}")
+        elif args.command == "export":
+            count = inventory.export_json(args.json_path)
+            print(f"  ✅ Exported {count} products  {args.db_path}  →  {args.json_path}")
+        else:
+            offers = inventory.conn.execute("SELECT COUNT(*) FROM offers").fetchone()[0]
+            oldest, newest = inventory.freshness()
+            print(f"  Products : {len(inventory)}")
+            print(f"  Offers   : {offers}")
+            print(f"  Version  : {inventory.version}")
+            print(f"  Scraped  : {oldest or '—'}  …  {newest or '—'}")
@@ -0,0 +1,379 @@
+"""
+inventory_mmap.py — Memory-Mapped Binary Inventory Snapshot
+ShopVision Pro v4.0
+
+Compiles inventory.json into a read-only binary file that processes open
+with mmap instead of parsing. Opening costs a header read, whatever the
+catalogue size, and every process on a host shares the same page-cache
+copy, so N analysis workers do not hold N private dict trees.
+
+Layout (all sections 8-byte aligned, native byte order, little-endian
+hosts only):
+
+    header        magic, inventory version, sha1 digest of the source,
+                  counts, section offsets
+    offsets       int64[P + 1]  — product p owns offers offsets[p]:offsets[p+1]
+    price         float64[N]    ┐
+    delivery_time int32[N]      │ fixed-width offer columns, the same
+    rating        float64[N]    │ layout vendor_store.VendorStore keeps
+    name_id       uint32[N]     │ in memory
+    url_id        uint32[N]     │
+    source_id     uint32[N]     ┘ (NO_STRING = no source)
+    products      uint32[P, 3]  — key, name and extra-fields-JSON string ids
+    strings       uint64[S + 1] offsets + UTF-8 blob (interned)
+    key_index     uint32[B]     — open-addressing hash (crc32, linear
+    label_index   uint32[B]       probing) over product keys and over the
+                                  normalised detector (label, subtype);
+                                  slot = product + 1, 0 = empty
+
+`MappedInventory.view(key)` returns a vendor_store.VendorColumns view over
+the mapped columns, so optimizer.rank_vendors ranks it in place exactly as
+it ranks a VendorStore view; vendor dicts are built only for the entries
+returned. `MappedInventory.product_index()` stands in for
+catalog.build_product_index.
+
+The compiler publishes with write-then-rename. A process that already has
+the old file mapped keeps reading the old snapshot until it reopens.
+
+USAGE:
+    python inventory_mmap.py compile                     # inventory.json → inventory.bin
+    python inventory_mmap.py compile inventory.json /dev/shm/inventory.bin
+    python inventory_mmap.py info inventory.bin
+
+Built on mmap, struct and array from the standard library; no NumPy needed.
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from catalog import IndexKey, _split_key, normalise_label
+from inventory_store import read_inventory
+from vendor_store import VendorColumns
+
+DEFAULT_SNAPSHOT = "inventory.bin"
+MAGIC            = b"SVPINV01"
+NO_STRING        = 0xFFFFFFFF
+
+_SECTIONS = ("offsets", "price", "delivery_time", "rating", "name_id", "url_id",
+             "source_id", "products", "string_offsets", "strings", "key_index", "label_index")
+# magic, version, digest, products, offers, strings, buckets, section offsets
+_HEADER = struct.Struct("<8sq20sIIII" + "Q" * len(_SECTIONS))
+
+assert array("i").itemsize == 4 and array("I").itemsize == 4
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def _hash(text: str) -> int:
+    return zlib.crc32(text.encode("utf-8"))
+
+
+def _label_key(label: str, subtype: str) -> str:
+    return f"{label}\x1f{subtype}"
+
+
+def _build_hash(keys: List[Optional[str]], buckets: int) -> array:
+    """Slot table for *keys* (None entries and repeats are skipped: first wins)."""
+    table = array("I", [0]) * buckets
+    seen  = set()
+    for idx, key in enumerate(keys):
+        if key is None or key in seen:
+            continue
+        seen.add(key)
+        slot = _hash(key) & (buckets - 1)
+        while table[slot]:
+            slot = (slot + 1) & (buckets - 1)
+        table[slot] = idx + 1
+    return table
+
+
+# ── Compiler ──────────────────────────────────────────────────────────────────
+
+def compile_snapshot(inventory_path: str = "inventory.json", out: str = DEFAULT_SNAPSHOT) -> Tuple[int, int]:
+    """Compile an inventory (snapshot + journal) into *out*; returns (products, offers)."""
+    if sys.byteorder != "little":
+        raise OSError("inventory snapshots are written for little-endian hosts only")
+    snapshot = read_inventory(inventory_path)
+
+    strings: List[str]     = []
+    ids:     Dict[str, int] = {}
+
+    def intern(text: Optional[str]) -> int:
+        if text is None:
+            return NO_STRING
+        idx = ids.get(text)
+        if idx is None:
+            idx = ids[text] = len(strings)
+            strings.append(text)
+        return idx
+
+    cols = {name: array(code) for name, code in (
+        ("price", "d"), ("delivery_time", "i"), ("rating", "d"),
+        ("name_id", "I"), ("url_id", "I"), ("source_id", "I"))}
+    offsets  = array("q", [0])
+    products = array("I")
+    labels: List[Optional[str]] = []
+    for key, record in snapshot.db.items():
+        for v in record.get("vendors", []):
+            cols["price"].append(float(v["price"]))
+            cols["delivery_time"].append(int(v["delivery_time"]))
+            cols["rating"].append(float(v["rating"]))
+            cols["name_id"].append(intern(v["vendor_name"]))
+            cols["url_id"].append(intern(v.get("url", "#")))
+            cols["source_id"].append(intern(v.get("source")))
+        offsets.append(len(cols["price"]))
+        extra = {k: val for k, val in record.items() if k not in ("name", "vendors")}
+        products.extend((intern(key), intern(record.get("name", key)),
+                         intern(json.dumps(extra, ensure_ascii=False))))
+        split = _split_key(key)
+        labels.append(_label_key(*split) if split is not None else None)
+
+    n_products = len(snapshot.db)
+    buckets = 2
+    while buckets < 2 * n_products:
+        buckets *= 2
+    blob = array("Q", [0])
+    encoded = [s.encode("utf-8") for s in strings]
+    for data in encoded:
+        blob.append(blob[-1] + len(data))
+
+    payload = {
+        **cols,
+        "offsets":        offsets,
+        "products":       products,
+        "string_offsets": blob,
+        "strings":        b"".join(encoded),
+        "key_index":      _build_hash(list(snapshot.db), buckets),
+        "label_index":    _build_hash(labels, buckets),
+    }
+
+    position = _align(_HEADER.size)
+    section_offsets = []
+    for name in _SECTIONS:
+        section_offsets.append(position)
+        data = payload[name]
+        position = _align(position + (len(data) * data.itemsize if isinstance(data, array) else len(data)))
+
+    target = Path(out)
+    tmp    = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, snapshot.version, bytes.fromhex(snapshot.digest), n_products,
+                             len(cols["price"]), len(strings), buckets, *section_offsets))
+        for name, start in zip(_SECTIONS, section_offsets):
+            f.write(b"\0" * (start - f.tell()))
+            data = payload[name]
+            f.write(data.tobytes() if isinstance(data, array) else data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, target)
+    return n_products, len(cols["price"])
+
+
+# ── Reader ────────────────────────────────────────────────────────────────────
+
+class MappedInventory:
+    """
+    Read-only, memory-mapped inventory snapshot (see module docstring).
+
+    Provides the column attributes and `vendor(i)` that
+    vendor_store.VendorColumns reads, so views over it rank like views
+    over a VendorStore.
+    """
+
+    def __init__(self, path: str = DEFAULT_SNAPSHOT):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+        (magic, self.version, digest, self.n_products, self.n_offers,
+         n_strings, self.buckets, *starts) = _HEADER.unpack_from(buf)
+        if magic != MAGIC:
+            buf.release()
+            self._mmap.close()
+            raise ValueError(f"'{path}' is not a ShopVision inventory snapshot")
+        self.digest = digest.hex()
+
+        sizes = {
+            "offsets":        (self.n_products + 1) * 8,
+            "price":          self.n_offers * 8,
+            "delivery_time":  self.n_offers * 4,
+            "rating":         self.n_offers * 8,
+            "name_id":        self.n_offers * 4,
+            "url_id":         self.n_offers * 4,
+            "source_id":      self.n_offers * 4,
+            "products":       self.n_products * 12,
+            "string_offsets": (n_strings + 1) * 8,
+            "key_index":      self.buckets * 4,
+            "label_index":    self.buckets * 4,
+        }
+        section = dict(zip(_SECTIONS, starts))
+
+        def column(name: str, code: str) -> memoryview:
+            return buf[section[name]:section[name] + sizes[name]].cast(code)
+
+        self.offsets        = column("offsets", "q")
+        self._price_mv      = column("price", "d")
+        self._delivery_mv   = column("delivery_time", "i")
+        self._rating_mv     = column("rating", "d")
+        self._name_id       = column("name_id", "I")
+        self._url_id        = column("url_id", "I")
+        self._source_id     = column("source_id", "I")
+        self._products      = column("products", "I")
+        self._string_offs   = column("string_offsets", "Q")
+        self._key_index     = column("key_index", "I")
+        self._label_index   = column("label_index", "I")
+        self._strings       = buf[section["strings"]:section["strings"] + self._string_offs[n_strings]]
+
+    def close(self) -> None:
+        """Release the mapping (views handed out must no longer be used)."""
+        for name in ("offsets", "_price_mv", "_delivery_mv", "_rating_mv", "_name_id", "_url_id",
+                     "_source_id", "_products", "_string_offs", "_key_index", "_label_index", "_strings"):
+            getattr(self, name).release()
+        self._mmap.close()
+
+    def __enter__(self) -> "MappedInventory":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ── Strings and hashing ───────────────────────────────────────────────────
+
+    def _string(self, idx: int) -> Optional[str]:
+        if idx == NO_STRING:
+            return None
+        return str(self._strings[self._string_offs[idx]:self._string_offs[idx + 1]], "utf-8")
+
+    def _probe(self, table: memoryview, text: str, matches) -> int:
+        """Product index for *text* in a hash *table*, or -1."""
+        mask = self.buckets - 1
+        slot = _hash(text) & mask
+        while True:
+            entry = table[slot]
+            if not entry:
+                return -1
+            if matches(entry - 1):
+                return entry - 1
+            slot = (slot + 1) & mask
+
+    def _find(self, key: str) -> int:
+        return self._probe(self._key_index, key, lambda p: self._string(self._products[3 * p]) == key)
+
+    # ── Access ────────────────────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return self.n_products
+
+    def __contains__(self, key: str) -> bool:
+        return self._find(key) >= 0
+
+    def keys(self) -> Iterator[str]:
+        for p in range(self.n_products):
+            yield self._string(self._products[3 * p])
+
+    def vendor(self, i: int) -> Dict[str, Any]:
+        """The inventory.json-style vendor dict for global offer index *i*."""
+        entry = {
+            "vendor_name":   self._string(self._name_id[i]),
+            "price":         self._price_mv[i],
+            "delivery_time": self._delivery_mv[i],
+            "rating":        self._rating_mv[i],
+            "url":           self._string(self._url_id[i]),
+        }
+        source = self._string(self._source_id[i])
+        if source is not None:
+            entry["source"] = source
+        return entry
+
+    def _view(self, p: int) -> VendorColumns:
+        return VendorColumns(self, self.offsets[p], self.offsets[p + 1])
+
+    def view(self, key: str) -> VendorColumns:
+        """Zero-copy view over the offers of product *key* (KeyError if unknown)."""
+        p = self._find(key)
+        if p < 0:
+            raise KeyError(key)
+        return self._view(p)
+
+    def _record(self, p: int) -> Dict[str, Any]:
+        record = {"name": self._string(self._products[3 * p + 1]), "vendors": self._view(p)}
+        record.update(json.loads(self._string(self._products[3 * p + 2])))
+        return record
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Record for *key* whose "vendors" is a VendorColumns view, or None."""
+        p = self._find(key)
+        return self._record(p) if p >= 0 else None
+
+    def lookup(self, label: str, subtype: str) -> Optional[Dict[str, Any]]:
+        """Record for a detected (label, subtype), like catalog.lookup_product."""
+        return self.product_index().get((normalise_label(label), subtype.lower()))
+
+    def product_index(self) -> "MappedProductIndex":
+        return MappedProductIndex(self)
+
+
+class MappedProductIndex:
+    """
+    Stand-in for the dict built by catalog.build_product_index, answering
+    `get((label, subtype))` from the snapshot's label hash index.
+    """
+
+    def __init__(self, inventory: MappedInventory):
+        self.inventory = inventory
+
+    def _find(self, key: IndexKey) -> int:
+        inv = self.inventory
+
+        def matches(p: int) -> bool:
+            split = _split_key(inv._string(inv._products[3 * p]))
+            return split == key
+
+        return inv._probe(inv._label_index, _label_key(*key), matches)
+
+    def get(self, key: IndexKey, default=None) -> Optional[Dict[str, Any]]:
+        p = self._find(key)
+        return self.inventory._record(p) if p >= 0 else default
+
+    def __contains__(self, key: IndexKey) -> bool:
+        return self._find(key) >= 0
+
+    def __len__(self) -> int:
+        return sum(1 for slot in self.inventory._label_index if slot)
+
+    def values(self) -> Iterator[Dict[str, Any]]:
+        """Every indexed record (first product per (label, subtype)), in product order."""
+        for p in sorted(slot - 1 for slot in self.inventory._label_index if slot):
+            yield self.inventory._record(p)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ShopVision Pro binary inventory snapshots")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_compile = sub.add_parser("compile", help="Compile inventory.json into a snapshot")
+    p_compile.add_argument("json_path", nargs="?", default="inventory.json")
+    p_compile.add_argument("out", nargs="?", default=DEFAULT_SNAPSHOT)
+    p_info = sub.add_parser("info", help="Summarise a snapshot")
+    p_info.add_argument("path", nargs="?", default=DEFAULT_SNAPSHOT)
+    args = parser.parse_args()
+
+    if args.command == "compile":
+        n_products, n_offers = compile_snapshot(args.json_path, args.out)
+        print(f"  ✅ Compiled {n_products} products / {n_offers} offers  "
+              f"{args.json_path}  →  {args.out}  ({os.path.getsize(args.out) / 1e3:.1f} kB)")
+    else:
+        with MappedInventory(args.path) as inventory:
+            print(f"  Products : {inventory.n_products}")
+            print(f"  Offers   : {inventory.n_offers}")
+            print(f"  Version  : {inventory.version}")
+            print(f"  Digest   : {inventory.digest}")
@@ -0,0 +1,207 @@
+"""
+inventory_store.py — Crash-Safe Incremental Inventory Persistence
+ShopVision Pro v4.0
+
+inventory.json stays the canonical snapshot (same format every reader
+already understands); changes are appended to a journal next to it and
+folded into the snapshot periodically:
+
+    inventory.json            snapshot — product key → record, published
+                              with write-then-rename (never half-written)
+    inventory.json.journal    JSON lines {"seq": n, "key": ..., "record": {...}},
+                              one per product update, fsync'ed on append
+
+Every update gets the next sequence number, stored in the record itself
+as "version". The inventory version is the highest sequence number seen,
+so a snapshot and its journal always describe one consistent version:
+
+    read_inventory()   snapshot + journal entries in order → (db, version)
+    InventoryWriter    upsert() appends one journal line (cost ∝ the
+                       changed record, not the catalogue); every
+                       `compact_every` updates, compact() rewrites the
+                       snapshot and empties the journal; close() only
+                       releases the journal, whatever is still in it is
+                       replayed by read_inventory()
+
+Crash safety:
+  * a crash mid-append leaves a torn last journal line; readers ignore it
+    and the next writer truncates it away
+  * a crash mid-compaction leaves the old snapshot (the temp file is never
+    renamed) plus the full journal
+  * a crash between publishing the snapshot and emptying the journal
+    leaves entries the snapshot already contains; a journal entry is only
+    applied if it is newer than the record's "version", so they are skipped
+
+One writer at a time; any number of concurrent readers.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+DEFAULT_INVENTORY = "inventory.json"
+COMPACT_EVERY     = 64          # journal entries before the snapshot is rewritten
+
+
+class InventoryError(ValueError):
+    """The inventory snapshot exists but cannot be parsed."""
+
+
+class InventorySnapshot(NamedTuple):
+    db:      Dict[str, Dict[str, Any]]
+    version: int                # highest applied update sequence number (0: none)
+    digest:  str                # sha1 of the bytes the snapshot was built from
+
+
+def journal_path(path: str = DEFAULT_INVENTORY) -> Path:
+    return Path(f"{path}.journal")
+
+
+def _scan_journal(path: Path) -> Tuple[List[Dict[str, Any]], bytes]:
+    """Complete journal entries and their raw bytes; a torn tail is dropped."""
+    try:
+        raw = path.read_bytes()
+    except FileNotFoundError:
+        return [], b""
+    entries: List[Dict[str, Any]] = []
+    good = 0
+    for line in raw.splitlines(keepends=True):
+        if not line.endswith(b"\n"):
+            break
+        try:
+            entry = json.loads(line)
+            entry["seq"], entry["key"], entry["record"]
+        except (ValueError, KeyError, TypeError):
+            break
+        entries.append(entry)
+        good += len(line)
+    return entries, raw[:good]
+
+
+def read_inventory(path: str = DEFAULT_INVENTORY) -> InventorySnapshot:
+    """
+    The current inventory: the snapshot at *path* with the journal applied.
+    A missing snapshot is an empty inventory; an unreadable one raises
+    InventoryError rather than silently losing every product.
+    """
+    # Journal first: a compaction between the two reads can only make the
+    # snapshot newer than the journal, and the per-record version check
+    # below then skips the entries it already contains.
+    entries, journal_raw = _scan_journal(journal_path(path))
+    digest = hashlib.sha1()
+    db: Dict[str, Dict[str, Any]] = {}
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except FileNotFoundError:
+        raw = b""
+    if raw:
+        try:
+            db = json.loads(raw)
+        except ValueError as exc:
+            raise InventoryError(f"Corrupt inventory snapshot '{path}': {exc}") from exc
+        digest.update(raw)
+
+    version = max((r.get("version", 0) for r in db.values()), default=0)
+    for entry in entries:
+        if entry["seq"] > db.get(entry["key"], {}).get("version", 0):
+            db[entry["key"]] = entry["record"]
+        version = max(version, entry["seq"])
+    digest.update(journal_raw)
+    return InventorySnapshot(db, version, digest.hexdigest())
+
+
+def _fsync_dir(directory: Path) -> None:
+    """Persist a rename (POSIX); directories cannot be opened on Windows."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_snapshot(db: Dict[str, Dict[str, Any]], path: str = DEFAULT_INVENTORY) -> None:
+    """Publish *db* at *path* with write-then-rename."""
+    target = Path(path)
+    tmp    = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(db, f, indent=4, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, target)
+    _fsync_dir(target.parent)
+
+
+class InventoryWriter:
+    """
+    Parameters
+    ----------
+    path : str
+        Snapshot path; the journal lives at `<path>.journal`.
+    compact_every : int
+        Journal entries after which upsert() compacts automatically.
+    """
+
+    def __init__(self, path: str = DEFAULT_INVENTORY, compact_every: int = COMPACT_EVERY):
+        self.path          = Path(path)
+        self.journal       = journal_path(path)
+        self.compact_every = compact_every
+        self._file         = None               # journal, opened for appending on first upsert
+
+        snapshot     = read_inventory(path)
+        self.version = snapshot.version
+        entries, good = _scan_journal(self.journal)
+        self.pending = len(entries)
+        if self.journal.exists() and self.journal.stat().st_size != len(good):
+            with open(self.journal, "r+b") as f:     # drop a torn tail before appending
+                f.truncate(len(good))
+
+    def upsert(self, key: str, record: Dict[str, Any]) -> int:
+        """Durably record the new *record* for *key*; returns its version."""
+        seq   = self.version + 1
+        entry = {"seq": seq, "key": key, "record": {**record, "version": seq}}
+        line  = json.dumps(entry, ensure_ascii=False) + "\n"
+        if self._file is None:
+            self._file = open(self.journal, "ab")
+        self._file.write(line.encode("utf-8"))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.version  = seq
+        self.pending += 1
+        if self.pending >= self.compact_every:
+            self.compact()
+        return seq
+
+    def compact(self) -> None:
+        """Fold the journal into a new snapshot, then empty the journal."""
+        if not self.pending and self.path.exists():
+            return
+        snapshot = read_inventory(str(self.path))
+        write_snapshot(snapshot.db, str(self.path))
+        self.close()
+        with open(self.journal, "wb") as f:
+            f.flush()
+            os.fsync(f.fileno())
+        self.pending = 0
+
+    def close(self) -> None:
+        """
+        Sync and close the journal. Pending updates stay in it (compaction
+        remains periodic, so a small run never rewrites the snapshot).
+        """
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "InventoryWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
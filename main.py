@@ -6,21 +6,29 @@ import cv2
 import torch
 import webbrowser
 import time
-import json
 import os
 from ultralytics import YOLO
+from vision import postprocess, SceneGate, SUBTYPES
+from inventory_store import InventoryError, read_inventory
 
 # --- SYSTEM CONFIGURATION ---
 CONF_THRESHOLD = 0.70       
 RATIO_THRESHOLD = 2.7       
 MIN_ASPECT_RATIO = 1.50     
+SUBTYPE_RULES = {}                                  # v2 model: no per-label rules...
+SUBTYPE_FALLBACK = (RATIO_THRESHOLD, "Bottle", "Can")  # ...every class is Bottle/Can
+GATE_THRESHOLD = 4.0        # mean abs diff (0-255) on a 64x36 thumbnail to re-run YOLO
+GATE_REFRESH = 30           # force inference after this many reused frames
 JSON_FILE = "inventory.json"
 
 def load_inventory():
-    if not os.path.exists(JSON_FILE): return {}
-    with open(JSON_FILE, 'r') as f:
-        try: return json.load(f)
-        except: return {}
+    # Snapshot + update journal (inventory_store.py); a corrupt snapshot is
+    # reported instead of silently dropping every product
+    try:
+        return read_inventory(JSON_FILE).db
+    except InventoryError as e:
+        print(f"❌ Error: {e}")
+        return {}
 
 def draw_smart_label(img, text, x, y, bg_color=(0, 0, 0), txt_color=(255, 255, 255)):
     font = cv2.FONT_HERSHEY_SIMPLEX
@@ -44,6 +52,8 @@ def main():
         
     model = YOLO(model_path) 
     cap = cv2.VideoCapture(0)
+    gate = SceneGate(GATE_THRESHOLD, max_reuse=GATE_REFRESH)
+    results = None
     
     print("🎥 Stream Started. Controls: [SPACE] to Buy | [Q] to Quit")
 
@@ -51,23 +61,27 @@ def main():
         success, frame = cap.read()
         if not success: break
 
-        results = model.predict(frame, conf=CONF_THRESHOLD, device=device, verbose=False)
+        # Static webcam shots reuse the previous detections instead of re-running YOLO
+        if gate.should_infer(frame) or results is None:
+            results = model.predict(frame, conf=CONF_THRESHOLD, device=device, verbose=False)
         annotated_frame = frame.copy()
         current_product_link = None 
 
-        if results[0].boxes:
-            for box in results[0].boxes:
-                x, y, w, h = box.xywh[0].cpu().numpy()
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                aspect_ratio = h / w
-                
-                if aspect_ratio < MIN_ASPECT_RATIO: continue 
+        # One host transfer per frame; boxes under MIN_ASPECT_RATIO are dropped
+        # and Bottle/Can subtypes assigned as array ops before the draw loop.
+        detections = postprocess(results[0], model.names, min_aspect_ratio=MIN_ASPECT_RATIO,
+                                 rules=SUBTYPE_RULES, fallback=SUBTYPE_FALLBACK)
+        if len(detections):
+            for (x1, y1, x2, y2), class_id, aspect_ratio, subtype_idx in zip(
+                detections.xyxy.tolist(), detections.cls.tolist(),
+                detections.aspect.tolist(), detections.subtype.tolist()
+            ):
+                x = (x1 + x2) / 2
                 
                 cv2.rectangle(annotated_frame, (int(x1), int(y1)), (int(x2), int(y2)), (255, 255, 0), 3)
 
-                class_id = int(box.cls[0])
                 class_name = model.names[class_id]
-                subtype = "Bottle" if aspect_ratio > RATIO_THRESHOLD else "Can"
+                subtype = SUBTYPES[subtype_idx]
                 ratio_color = (0, 0, 255) if subtype == "Bottle" else (0, 255, 0)
 
                 lookup_key = f"{class_name}_{subtype}"
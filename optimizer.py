@@ -16,8 +16,21 @@ This module is framework-agnostic (no Streamlit dependency) and can be
 imported standalone or cited as an independent algorithm component.
 """
 
+import bisect
+import heapq
 import math
-from typing import Any, Dict, List
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from vendor_store import VendorColumns
+
+# NumPy is only needed for the batch API — the scalar ranker stays dependency-free
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
 
 # ── Default Hyperparameters ───────────────────────────────────────────────────
 DEFAULT_WP    = 0.40   # Weight: price       (primary consumer driver)
@@ -40,15 +53,17 @@ def _min_max_norm(value: float, v_min: float, v_max: float) -> float:
     return (value - v_min) / (v_max - v_min)
 
 
-def _generate_why(winner: Dict[str, Any], all_vendors: List[Dict[str, Any]]) -> str:
+def _generate_why(
+    winner:  Dict[str, Any],
+    prices:  Sequence[float],
+    times:   Sequence[int],
+    ratings: Sequence[float],
+) -> str:
     """
     Build a concise human-readable explanation of why *winner* ranked first.
-    Compares winner's raw attributes against the full competitor pool.
+    Compares winner's raw attributes against the full competitor pool
+    (raw, uncapped attribute columns of every vendor).
     """
-    prices  = [v["price"]         for v in all_vendors]
-    times   = [v["delivery_time"] for v in all_vendors]
-    ratings = [v["rating"]        for v in all_vendors]
-
     reasons = []
 
     # Price — winner is cheapest or significantly below average
@@ -73,13 +88,15 @@ def _generate_why(winner: Dict[str, Any], all_vendors: List[Dict[str, Any]]) ->
 # ── Public API ────────────────────────────────────────────────────────────────
 
 def rank_vendors(
-    vendors:      List[Dict[str, Any]],
+    vendors:      Union[List[Dict[str, Any]], VendorColumns],
     wp:           float = DEFAULT_WP,
     wt:           float = DEFAULT_WT,
     wr:           float = DEFAULT_WR,
     gamma:        float = DEFAULT_GAMMA,
     delta:        float = DEFAULT_DELTA,
     delivery_cap: int   = 480,
+    k:            Optional[int] = None,
+    explain:      bool  = True,
 ) -> List[Dict[str, Any]]:
     """
     Rank a list of vendor dicts using the NDU objective function.
@@ -92,6 +109,8 @@ def rank_vendors(
         delivery_time  (int)   — estimated delivery in minutes (lower → better)
         rating         (float) — platform rating 1–5   (higher → better)
         url            (str)   — purchase link
+        or a `vendor_store.VendorColumns` view, ranked in place without
+        extracting per-vendor dicts.
     wp, wt, wr : float
         Importance weights for price, time, and rating respectively.
     gamma, delta : float
@@ -103,60 +122,919 @@ def rank_vendors(
         looks almost as fast as a 12-min one. Default: 480 min (8 hours).
         Vendors above the cap are treated equally as ‘slow’ — the algorithm
         distinguishes quick-commerce tiers, not slow-commerce granularity.
+    k : int, optional
+        Return only the best *k* vendors. Selection uses a heap (O(n log k))
+        instead of a full sort, and only the returned vendors are copied.
+        The entries and their order are identical to the first *k* of the
+        full ranking. Default: rank everything.
+    explain : bool
+        Build the `why` explanation for the winner. Pass False when the
+        caller does not display it.
 
     Returns
     -------
     list of dicts
-        Same vendor list, sorted descending by `utility_score`.
+        Same vendor list (or its top *k*), sorted descending by `utility_score`.
         - `utility_score` (float) is added to every dict.
-        - `why`           (str)   is added only to the rank-1 vendor.
+        - `why`           (str)   is added only to the rank-1 vendor (if *explain*).
     """
+    if k is not None and k < 1:
+        raise ValueError(f"k must be >= 1 (got {k})")
     if not vendors:
         return []
 
     # ── Extract raw attribute vectors ─────────────────────────────────────────
+    # A VendorColumns view (vendor_store.py) already holds contiguous columns:
+    # read them in place and build dicts only for the returned entries.
+    if isinstance(vendors, VendorColumns):
+        prices, raw_times, ratings = vendors.prices, vendors.delivery_times, vendors.ratings
+        materialise = vendors.vendor
+    else:
+        prices    = [v["price"]         for v in vendors]
+        raw_times = [v["delivery_time"] for v in vendors]
+        ratings   = [v["rating"]        for v in vendors]
+        materialise = lambda i: dict(vendors[i])   # shallow copy — never mutate input
+
     # ── Clamp delivery times at cap before computing statistics ──────────────
     # Platform SLA constants span [12, 1440] min — a 120× range.
     # Without capping, Amazon's 1440-min value dominates the normalisation
     # denominator, making JioMart's 240 min look nearly as fast as Blinkit's
     # 12 min. Capping at 480 min means anything slower than 8 hours is treated
     # equally as 'slow'; quick-commerce tiers are then separated by price/rating.
-    capped_times = [min(v["delivery_time"], delivery_cap) for v in vendors]
-
-    # ── Extract raw attribute vectors ─────────────────────────────────────────
-    prices  = [v["price"]  for v in vendors]
-    ratings = [v["rating"] for v in vendors]
-
-    p_min, p_max = min(prices),       max(prices)
-    t_min, t_max = min(capped_times), max(capped_times)
-    r_min, r_max = min(ratings),      max(ratings)
+    # (min/max commute with the clamp, so the capped range needs no extra list.)
+    p_min, p_max = min(prices),  max(prices)
+    t_min, t_max = min(min(raw_times), delivery_cap), min(max(raw_times), delivery_cap)
+    r_min, r_max = min(ratings), max(ratings)
 
     # ── Compute U_i for each vendor ───────────────────────────────────────────
-    scored: List[Dict[str, Any]] = []
-    for v, t_capped in zip(vendors, capped_times):
-        p_hat = _min_max_norm(v["price"],  p_min, p_max)
-        t_hat = _min_max_norm(t_capped,   t_min, t_max)  # uses capped delivery time
-        r_hat = _min_max_norm(v["rating"], r_min, r_max)
+    utilities: List[float] = []
+    for price, raw_t, rating in zip(prices, raw_times, ratings):
+        t_capped = min(raw_t, delivery_cap)
+        p_hat = _min_max_norm(price,    p_min, p_max)
+        t_hat = _min_max_norm(t_capped, t_min, t_max)  # uses capped delivery time
+        r_hat = _min_max_norm(rating,   r_min, r_max)
 
         u_i = (
             wp * math.exp(-gamma * p_hat) +   # price component
             wt * math.exp(-delta * t_hat) +   # speed component
             wr * math.log(1.0 + r_hat)        # rating component
         )
+        utilities.append(round(u_i, 6))
 
-        entry = dict(v)                       # shallow copy — never mutate input
-        entry["utility_score"] = round(u_i, 6)
-        scored.append(entry)
+    # ── Order descending by utility score (ties keep input order) ────────────
+    if k is None or k >= len(vendors):
+        order = sorted(range(len(vendors)), key=utilities.__getitem__, reverse=True)
+    else:
+        order = heapq.nsmallest(k, range(len(vendors)), key=lambda i: (-utilities[i], i))
 
-    # ── Sort descending by utility score ─────────────────────────────────────
-    scored.sort(key=lambda x: x["utility_score"], reverse=True)
+    scored: List[Dict[str, Any]] = []
+    for i in order:
+        entry = materialise(i)
+        entry["utility_score"] = utilities[i]
+        scored.append(entry)
 
     # ── Annotate winner with human-readable explanation ───────────────────────
-    scored[0]["why"] = _generate_why(scored[0], vendors)
+    if explain:
+        scored[0]["why"] = _generate_why(scored[0], prices, raw_times, ratings)
 
     return scored
 
 
+# ── Vectorised batch ranking ──────────────────────────────────────────────────
+
+class BatchRanking(NamedTuple):
+    """
+    Result of `rank_vendors_batch` for P products over N stacked offers.
+
+    utility : (N,) or (W, N) float64 — U_i rounded to 6 dp, like `utility_score`
+    order   : (N,) or (W, N) int64   — offer indices sorted by product segment,
+              then utility descending, then input order (same tie-break as
+              the stable sort in `rank_vendors`). Segment p occupies
+              order[offsets[p]:offsets[p + 1]].
+    winners : (P,) or (W, P) int64   — index of the rank-1 offer per product,
+              -1 for products without offers.
+    """
+    utility: Any
+    order:   Any
+    winners: Any
+
+
+def stack_vendor_lists(vendor_lists: Sequence[List[Dict[str, Any]]]) -> Tuple[Any, Any, Any, Any]:
+    """
+    Flatten per-product vendor dict lists into the array layout used by
+    `rank_vendors_batch`: (prices, delivery_times, ratings, offsets).
+    """
+    if not NUMPY_AVAILABLE:
+        raise ImportError("rank_vendors_batch requires numpy (`pip install numpy`)")
+    lengths = np.fromiter((len(v) for v in vendor_lists), dtype=np.int64, count=len(vendor_lists))
+    offsets = np.zeros(len(vendor_lists) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    flat = [v for vendors in vendor_lists for v in vendors]
+    prices  = np.fromiter((v["price"]         for v in flat), dtype=np.float64, count=len(flat))
+    times   = np.fromiter((v["delivery_time"] for v in flat), dtype=np.float64, count=len(flat))
+    ratings = np.fromiter((v["rating"]        for v in flat), dtype=np.float64, count=len(flat))
+    return prices, times, ratings, offsets
+
+
+def _segment_norm(x, starts, seg_ids, nonempty, n_segments):
+    """Per-segment Min-Max normalisation; 0.0 for zero-range segments (as `_min_max_norm`)."""
+    seg_min = np.zeros(n_segments)
+    seg_max = np.zeros(n_segments)
+    seg_min[nonempty] = np.minimum.reduceat(x, starts[nonempty])
+    seg_max[nonempty] = np.maximum.reduceat(x, starts[nonempty])
+    lo  = seg_min[seg_ids]
+    rng = seg_max[seg_ids] - lo
+    out = np.zeros_like(x)
+    np.divide(x - lo, rng, out=out, where=rng != 0)
+    return out
+
+
+def rank_vendors_batch(
+    prices:         Any,
+    delivery_times: Any,
+    ratings:        Any,
+    offsets:        Any,
+    wp:             Any   = DEFAULT_WP,
+    wt:             Any   = DEFAULT_WT,
+    wr:             Any   = DEFAULT_WR,
+    gamma:          float = DEFAULT_GAMMA,
+    delta:          float = DEFAULT_DELTA,
+    delivery_cap:   int   = 480,
+) -> BatchRanking:
+    """
+    Rank the offers of many products at once with array operations.
+
+    Offers are stacked into flat arrays and grouped into products by CSR-style
+    segment *offsets*: product p owns offers offsets[p]:offsets[p + 1]
+    (len(offsets) == P + 1, offsets[0] == 0, offsets[-1] == N). See
+    `stack_vendor_lists` to build them from vendor dicts; a
+    `vendor_store.VendorStore` already has this layout (price,
+    delivery_time, rating, offsets) and can be passed as-is.
+
+    The maths is identical to `rank_vendors`: delivery times are clamped at
+    *delivery_cap*, attributes are Min-Max normalised within each product,
+    zero-range attributes contribute 0.0, utilities are rounded to 6 dp and
+    ties keep input order.
+
+    Weights may be scalars or equal-length 1-D arrays of W weight profiles;
+    the normalised attributes are computed once and every profile is scored
+    against them, giving (W, N) utilities and (W, P) winners.
+    """
+    if not NUMPY_AVAILABLE:
+        raise ImportError("rank_vendors_batch requires numpy (`pip install numpy`)")
+
+    prices  = np.asarray(prices,  dtype=np.float64)
+    times   = np.minimum(np.asarray(delivery_times, dtype=np.float64), delivery_cap)
+    ratings = np.asarray(ratings, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+
+    n_products = len(offsets) - 1
+    starts     = offsets[:-1]
+    lengths    = np.diff(offsets)
+    nonempty   = lengths > 0
+    seg_ids    = np.repeat(np.arange(n_products), lengths)
+
+    # ── Per-offer NDU components (weight-independent) ─────────────────────────
+    price_term  = np.exp(-gamma * _segment_norm(prices,  starts, seg_ids, nonempty, n_products))
+    time_term   = np.exp(-delta * _segment_norm(times,   starts, seg_ids, nonempty, n_products))
+    rating_term = np.log(1.0 + _segment_norm(ratings, starts, seg_ids, nonempty, n_products))
+
+    multi = np.ndim(wp) > 0 or np.ndim(wt) > 0 or np.ndim(wr) > 0
+    w_p, w_t, w_r = (np.atleast_1d(np.asarray(w, dtype=np.float64)) for w in (wp, wt, wr))
+    w_p, w_t, w_r = np.broadcast_arrays(w_p, w_t, w_r)
+
+    utility = np.round(
+        w_p[:, None] * price_term + w_t[:, None] * time_term + w_r[:, None] * rating_term, 6
+    )
+
+    # ── Order: segment asc → utility desc → input position asc ────────────────
+    position = np.arange(len(prices))
+    order    = np.empty(utility.shape, dtype=np.int64)
+    for i, row in enumerate(utility):
+        order[i] = np.lexsort((position, -row, seg_ids))
+
+    winners = np.full((len(utility), n_products), -1, dtype=np.int64)
+    winners[:, nonempty] = order[:, starts[nonempty]]
+
+    if not multi:
+        return BatchRanking(utility[0], order[0], winners[0])
+    return BatchRanking(utility, order, winners)
+
+
+# ── Incremental ranking ───────────────────────────────────────────────────────
+
+class IncrementalRanker:
+    """
+    Stateful NDU ranker for one product's offers under a streaming price feed.
+
+    Keeps the min/max of price, capped delivery time and rating, every offer's
+    utility, and the ranked order (a bisect-maintained sorted list). Offers
+    are inserted, updated and deleted one at a time:
+
+    - if the change leaves all six extremes where they were, only that offer
+      is re-scored and moved to its new position — O(log n) search plus one
+      list shift;
+    - if it moves an extreme (a new min/max, or the last offer holding the
+      current min/max changes or leaves), the normalisation of every offer
+      changes, so all utilities are recomputed and re-sorted.
+
+    Per-attribute value counts tell whether an extreme is still held by
+    another offer, so duplicates at the extreme do not force a rebuild.
+
+    `ranked()` returns exactly what `rank_vendors` would return for the
+    current offers listed in first-insertion order (updates keep an offer's
+    original position for tie-breaking). Its result is cached until the
+    next upsert/remove, so repeated reads are free; treat it as read-only.
+    """
+
+    def __init__(
+        self,
+        wp:           float = DEFAULT_WP,
+        wt:           float = DEFAULT_WT,
+        wr:           float = DEFAULT_WR,
+        gamma:        float = DEFAULT_GAMMA,
+        delta:        float = DEFAULT_DELTA,
+        delivery_cap: int   = 480,
+    ):
+        self.wp, self.wt, self.wr = wp, wt, wr
+        self.gamma, self.delta    = gamma, delta
+        self.delivery_cap         = delivery_cap
+
+        self.full_rebuilds       = 0
+        self.incremental_updates = 0
+
+        self._offers:  Dict[Hashable, Dict[str, Any]]             = {}
+        self._attrs:   Dict[Hashable, Tuple[float, float, float]] = {}   # (price, capped t, rating)
+        self._seq:     Dict[Hashable, int]                        = {}   # first-insertion position
+        self._by_seq:  Dict[int, Hashable]                        = {}
+        self._utility: Dict[Hashable, float]                      = {}
+        self._order:   List[Tuple[float, int]]                    = []   # sorted (-utility, seq)
+        self._counts:  Tuple[Dict[float, int], ...]               = ({}, {}, {})
+        self._bounds:  List[Optional[Tuple[float, float]]]        = [None, None, None]
+        self._ranked:  Dict[Tuple[Optional[int], bool], List[Dict[str, Any]]] = {}
+        self._next_seq = 0
+
+    @classmethod
+    def from_vendors(cls, vendors: List[Dict[str, Any]], key: str = "vendor_name", **params) -> "IncrementalRanker":
+        """Build a ranker from a vendor list, using `vendor[key]` as the offer id."""
+        ranker = cls(**params)
+        for v in vendors:
+            ranker._store(v[key], v)
+        ranker._rebuild()
+        return ranker
+
+    def __len__(self) -> int:
+        return len(self._offers)
+
+    def __contains__(self, offer_id: Hashable) -> bool:
+        return offer_id in self._offers
+
+    # ── Internals ─────────────────────────────────────────────────────────────
+
+    def _attributes(self, vendor: Dict[str, Any]) -> Tuple[float, float, float]:
+        return vendor["price"], min(vendor["delivery_time"], self.delivery_cap), vendor["rating"]
+
+    def _score(self, attrs: Tuple[float, float, float]) -> float:
+        (p_min, p_max), (t_min, t_max), (r_min, r_max) = self._bounds
+        p, t, r = attrs
+        return round(
+            self.wp * math.exp(-self.gamma * _min_max_norm(p, p_min, p_max)) +
+            self.wt * math.exp(-self.delta * _min_max_norm(t, t_min, t_max)) +
+            self.wr * math.log(1.0 + _min_max_norm(r, r_min, r_max)),
+            6,
+        )
+
+    def _count(self, attrs: Tuple[float, float, float], step: int) -> None:
+        for counts, value in zip(self._counts, attrs):
+            n = counts.get(value, 0) + step
+            if n:
+                counts[value] = n
+            else:
+                del counts[value]
+
+    def _store(self, offer_id: Hashable, vendor: Dict[str, Any]) -> None:
+        if offer_id not in self._seq:
+            self._seq[offer_id] = self._next_seq
+            self._by_seq[self._next_seq] = offer_id
+            self._next_seq += 1
+        attrs = self._attributes(vendor)
+        self._offers[offer_id] = vendor
+        self._attrs[offer_id]  = attrs
+        self._count(attrs, +1)
+
+    def _moves_extreme(self, old: Optional[Tuple], new: Optional[Tuple]) -> bool:
+        """
+        Would replacing *old* attrs by *new* move any min/max? (Either may be
+        None; *old* must already be removed from the value counts.)
+        """
+        for i, counts in enumerate(self._counts):
+            if self._bounds[i] is None:
+                return True
+            lo, hi = self._bounds[i]
+            if new is not None and not lo <= new[i] <= hi:
+                return True
+            if old is not None and old[i] in (lo, hi) and old[i] not in counts \
+                    and (new is None or new[i] != old[i]):
+                return True
+        return False
+
+    def _rebuild(self) -> None:
+        """Recompute extremes, every utility and the full order."""
+        self.full_rebuilds += 1
+        self._bounds  = [(min(c), max(c)) if c else None for c in self._counts]
+        self._utility = {oid: self._score(a) for oid, a in self._attrs.items()}
+        self._order   = sorted((-u, self._seq[oid]) for oid, u in self._utility.items())
+
+    def _unplace(self, offer_id: Hashable) -> None:
+        key = (-self._utility.pop(offer_id), self._seq[offer_id])
+        del self._order[bisect.bisect_left(self._order, key)]
+
+    def _place(self, offer_id: Hashable) -> None:
+        u = self._utility[offer_id] = self._score(self._attrs[offer_id])
+        bisect.insort(self._order, (-u, self._seq[offer_id]))
+
+    # ── Public API ────────────────────────────────────────────────────────────
+
+    def upsert(self, offer_id: Hashable, vendor: Dict[str, Any]) -> None:
+        """Insert a new offer or replace an existing one (keeps its tie-break position)."""
+        self._ranked.clear()
+        old = self._attrs.get(offer_id)
+        if old is not None:
+            self._count(old, -1)
+        if self._moves_extreme(old, self._attributes(vendor)):
+            self._store(offer_id, vendor)
+            self._rebuild()
+            return
+        if old is not None:
+            self._unplace(offer_id)
+        self._store(offer_id, vendor)
+        self._place(offer_id)
+        self.incremental_updates += 1
+
+    def remove(self, offer_id: Hashable) -> None:
+        """Delete an offer (KeyError if unknown)."""
+        old = self._attrs.pop(offer_id)
+        self._ranked.clear()
+        del self._offers[offer_id]
+        self._count(old, -1)
+        if self._moves_extreme(old, None):
+            self._utility.pop(offer_id)
+            self._by_seq.pop(self._seq.pop(offer_id))
+            self._rebuild()
+            return
+        self._unplace(offer_id)
+        self._by_seq.pop(self._seq.pop(offer_id))
+        self.incremental_updates += 1
+
+    def ranked(self, k: Optional[int] = None, explain: bool = True) -> List[Dict[str, Any]]:
+        """
+        Current ranking in `rank_vendors` format (optionally only the top *k*,
+        read straight off the maintained order). Cached per (k, explain)
+        until the offers change.
+        """
+        cached = self._ranked.get((k, explain))
+        if cached is not None:
+            return cached
+        if not self._order:
+            return []
+        entries = self._order if k is None else self._order[:k]
+        scored: List[Dict[str, Any]] = []
+        for neg_u, seq in entries:
+            entry = dict(self._offers[self._by_seq[seq]])
+            entry["utility_score"] = -neg_u
+            scored.append(entry)
+        if explain:
+            # _by_seq is filled in sequence order: this is first-insertion order
+            offers = [self._offers[oid] for oid in self._by_seq.values()]
+            scored[0]["why"] = _generate_why(
+                scored[0],
+                [v["price"]         for v in offers],
+                [v["delivery_time"] for v in offers],
+                [v["rating"]        for v in offers],
+            )
+        self._ranked[(k, explain)] = scored
+        return scored
+
+
+# ── Weight-simplex winner map ─────────────────────────────────────────────────
+
+class SimplexRegion(NamedTuple):
+    """Convex region of the weight simplex where one (winner, runner-up) pair holds."""
+    winner:    int                                   # index into the vendor list
+    runner_up: Optional[int]
+    vertices:  List[Tuple[float, float, float]]      # (wp, wt, wr) polygon, CCW
+    area:      float                                 # fraction of the simplex
+
+
+def _clip(polygon: List[Tuple[float, float]], c0: float, cx: float, cy: float) -> List[Tuple[float, float]]:
+    """Sutherland–Hodgman: keep the part of *polygon* where c0 + cx·x + cy·y >= 0."""
+    out: List[Tuple[float, float]] = []
+    n = len(polygon)
+    for i in range(n):
+        (x1, y1), (x2, y2) = polygon[i], polygon[(i + 1) % n]
+        d1, d2 = c0 + cx * x1 + cy * y1, c0 + cx * x2 + cy * y2
+        if d1 >= 0:
+            out.append((x1, y1))
+        if (d1 >= 0) != (d2 >= 0):
+            t = d1 / (d1 - d2)
+            out.append((x1 + t * (x2 - x1), y1 + t * (y2 - y1)))
+    return out
+
+
+def _polygon_area(polygon: List[Tuple[float, float]]) -> float:
+    return 0.5 * abs(sum(x1 * y2 - x2 * y1
+                         for (x1, y1), (x2, y2) in zip(polygon, polygon[1:] + polygon[:1])))
+
+
+class WinnerMap:
+    """
+    Precomputed partition of the weight simplex (wp + wt + wr = 1) by
+    (winner, runner-up) for one fixed vendor set.
+
+    The normalised attributes do not depend on the weights, so each vendor's
+    utility U_i = wp·A_i + wt·B_i + wr·C_i is linear in the weights; with
+    wr = 1 − wp − wt the simplex becomes the triangle wp, wt ≥ 0,
+    wp + wt ≤ 1, and every (winner, runner-up) region is a convex polygon
+    cut out by the half-planes U_i ≥ U_j ≥ U_k. `regions` lists those
+    polygons — enough to draw "what-if" maps for any slider position.
+
+    Point location uses a `resolution`² grid over (wp, wt). A cell is labelled
+    with a pair only if that pair wins at all four corners with every utility
+    gap above the 6-dp rounding of `rank_vendors`; since the gaps are linear
+    they are then larger still everywhere inside the cell, so the label is
+    exact there. Cells crossed by a boundary fall back to scoring the vendors
+    at that point, with `rank_vendors`'s rounding and tie-break. `lookup()`
+    therefore always agrees with `rank_vendors(...)[:2]`.
+
+    Rebuild only when the vendor set (i.e. the inventory) changes.
+    """
+
+    _MARGIN = 2e-6   # > 1e-6, the largest gap 6-dp rounding can close
+
+    def __init__(
+        self,
+        vendors:      Union[List[Dict[str, Any]], VendorColumns],
+        gamma:        float = DEFAULT_GAMMA,
+        delta:        float = DEFAULT_DELTA,
+        delivery_cap: int   = 480,
+        resolution:   int   = 64,
+    ):
+        if not NUMPY_AVAILABLE:
+            raise ImportError("WinnerMap requires numpy (`pip install numpy`)")
+        self.vendors    = list(vendors)
+        self.resolution = max(1, int(resolution))
+
+        n = len(self.vendors)
+        if n:
+            prices  = [v["price"] for v in self.vendors]
+            times   = [min(v["delivery_time"], delivery_cap) for v in self.vendors]
+            ratings = [v["rating"] for v in self.vendors]
+            p_min, p_max = min(prices), max(prices)
+            t_min, t_max = min(times),  max(times)
+            r_min, r_max = min(ratings), max(ratings)
+            # Weight-independent NDU terms, same floats as rank_vendors computes
+            self.terms = [
+                (math.exp(-gamma * _min_max_norm(p, p_min, p_max)),
+                 math.exp(-delta * _min_max_norm(t, t_min, t_max)),
+                 math.log(1.0 + _min_max_norm(r, r_min, r_max)))
+                for p, t, r in zip(prices, times, ratings)
+            ]
+        else:
+            self.terms = []
+
+        self.regions = self._build_regions()
+        self.grid    = self._build_grid()
+
+    # ── Construction ──────────────────────────────────────────────────────────
+
+    def _line(self, i: int, j: int) -> Tuple[float, float, float]:
+        """U_i − U_j as c0 + cx·wp + cy·wt on the simplex."""
+        (ai, bi, ci), (aj, bj, cj) = self.terms[i], self.terms[j]
+        return ci - cj, (ai - ci) - (aj - cj), (bi - ci) - (bj - cj)
+
+    def _build_regions(self) -> List[SimplexRegion]:
+        n = len(self.terms)
+        triangle = [(0.0, 0.0), (1.0, 0.0), (0.0, 1.0)]
+        if n == 0:
+            return []
+        if n == 1:
+            return [SimplexRegion(0, None, [(x, y, 1.0 - x - y) for x, y in triangle], 1.0)]
+
+        regions: List[SimplexRegion] = []
+        for i in range(n):
+            for j in range(n):
+                if i == j:
+                    continue
+                poly = _clip(triangle, *self._line(i, j))
+                for k in range(n):
+                    if not poly:
+                        break
+                    if k not in (i, j):
+                        poly = _clip(poly, *self._line(j, k))
+                area = _polygon_area(poly) / 0.5 if len(poly) >= 3 else 0.0
+                if area > 1e-12:
+                    regions.append(SimplexRegion(i, j, [(x, y, 1.0 - x - y) for x, y in poly], area))
+        return regions
+
+    def _build_grid(self):
+        n, res = len(self.terms), self.resolution
+        grid = np.full((res, res), -1, dtype=np.int64)
+        if n <= 1:
+            grid[:] = 0 if n else -1
+            return grid
+
+        terms  = np.array(self.terms)                            # (n, 3)
+        axis   = np.linspace(0.0, 1.0, res + 1)
+        wp, wt = np.meshgrid(axis, axis, indexing="ij")          # corner weights
+        util   = (wp[..., None] * terms[:, 0] + wt[..., None] * terms[:, 1]
+                  + (1.0 - wp - wt)[..., None] * terms[:, 2])    # (res+1, res+1, n)
+
+        top   = np.argsort(-util, axis=-1, kind="stable")
+        first = top[..., 0]
+        second = top[..., 1]
+        u_sorted = np.take_along_axis(util, top, axis=-1)
+        gap = u_sorted[..., 0] - u_sorted[..., 1]
+        if n > 2:
+            gap = np.minimum(gap, u_sorted[..., 1] - u_sorted[..., 2])
+        pair = first * n + second
+
+        # A cell is exact iff all four corners share the pair with a safe gap
+        corners_pair = [pair[:-1, :-1], pair[1:, :-1], pair[:-1, 1:], pair[1:, 1:]]
+        corners_gap  = [gap[:-1, :-1],  gap[1:, :-1],  gap[:-1, 1:],  gap[1:, 1:]]
+        same = np.logical_and.reduce([p == corners_pair[0] for p in corners_pair[1:]])
+        safe = np.logical_and.reduce([g > self._MARGIN for g in corners_gap])
+        grid[same & safe] = corners_pair[0][same & safe]
+        return grid
+
+    # ── Point location ────────────────────────────────────────────────────────
+
+    def _exact(self, wp: float, wt: float, wr: float) -> Tuple[int, Optional[int]]:
+        utilities = [round(wp * a + wt * b + wr * c, 6) for a, b, c in self.terms]
+        top = heapq.nsmallest(2, range(len(utilities)), key=lambda i: (-utilities[i], i))
+        return top[0], (top[1] if len(top) > 1 else None)
+
+    def lookup(self, wp: float, wt: float, wr: float) -> Tuple[int, Optional[int]]:
+        """
+        (winner, runner-up) vendor indices for the given weights (normalised
+        to sum 1 first). Raises ValueError for an empty vendor set.
+        """
+        n = len(self.terms)
+        if n == 0:
+            raise ValueError("WinnerMap has no vendors")
+        if n == 1:
+            return 0, None
+        total = (wp + wt + wr) or 1.0
+        wp, wt, wr = wp / total, wt / total, wr / total
+        res = self.resolution
+        cell = self.grid[min(max(int(wp * res), 0), res - 1), min(max(int(wt * res), 0), res - 1)]
+        if cell >= 0:
+            return int(cell) // n, int(cell) % n
+        return self._exact(wp, wt, wr)
+
+    def winners(self, wp: float, wt: float, wr: float) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """Vendor dicts of the winner and runner-up at the given weights."""
+        first, second = self.lookup(wp, wt, wr)
+        return self.vendors[first], (self.vendors[second] if second is not None else None)
+
+
+def build_winner_maps(products: Dict[Hashable, Any], **params) -> Dict[Hashable, WinnerMap]:
+    """WinnerMap per product for a {key: vendor list / VendorColumns} mapping (skips empty sets)."""
+    return {key: WinnerMap(vendors, **params) for key, vendors in products.items() if len(vendors)}
+
+
+class WinnerMapCache:
+    """
+    WinnerMaps built lazily, on the first lookup of each product, and kept
+    until that product's `version` changes. An inventory update then only
+    rebuilds the maps of the products it touched. Safe to share across
+    threads; *params* are passed to every WinnerMap.
+    """
+
+    def __init__(self, **params):
+        self.params = params
+        self.builds = 0
+        self._maps: Dict[Hashable, Tuple[Hashable, WinnerMap]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._maps)
+
+    def get(
+        self,
+        product_key: Hashable,
+        vendors:     Union[List[Dict[str, Any]], VendorColumns],
+        version:     Hashable = None,
+    ) -> WinnerMap:
+        """The map for *product_key*, rebuilt from *vendors* if *version* differs."""
+        with self._lock:
+            entry = self._maps.get(product_key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        wmap = WinnerMap(vendors, **self.params)     # outside the lock: O(n³) build
+        with self._lock:
+            self._maps[product_key] = (version, wmap)
+            self.builds += 1
+        return wmap
+
+
+# ── Basket optimisation ───────────────────────────────────────────────────────
+
+DEFAULT_SHIPMENT_COST = 0.10   # utility charged per separate delivery in a basket
+
+
+class BasketPlan(NamedTuple):
+    """Vendor assignment for a whole basket (see `optimize_basket`)."""
+    assignment:    Dict[str, Dict[str, Any]]   # item → chosen vendor dict (+ utility_score)
+    shipments:     Dict[str, Dict[str, Any]]   # vendor → {items, delivery_time, total_price}
+    total_utility: float                       # Σ item utilities − shipment_cost · shipments
+    nodes:         int                         # branch-and-bound nodes visited
+
+
+def _speed_norm(t: float, t_min: float, t_max: float) -> float:
+    """`_min_max_norm` for a consolidated delivery time, which may exceed *t_max*."""
+    if t <= t_min:
+        return 0.0
+    if t_max <= t_min:
+        return 1.0
+    return min((t - t_min) / (t_max - t_min), 1.0)
+
+
+def optimize_basket(
+    basket:        Dict[str, Union[List[Dict[str, Any]], VendorColumns]],
+    quantities:    Optional[Dict[str, int]] = None,
+    wp:            float = DEFAULT_WP,
+    wt:            float = DEFAULT_WT,
+    wr:            float = DEFAULT_WR,
+    gamma:         float = DEFAULT_GAMMA,
+    delta:         float = DEFAULT_DELTA,
+    delivery_cap:  int   = 480,
+    shipment_cost: float = DEFAULT_SHIPMENT_COST,
+    max_shipments: Optional[int] = None,
+) -> BasketPlan:
+    """
+    Choose one vendor per basket item to maximise the basket's total NDU
+    utility when items ordered from the same vendor travel together.
+
+    Each item keeps its own NDU terms (price and rating Min-Max normalised
+    over that item's offers, as in `rank_vendors`), but its speed term uses
+    the *consolidated* delivery time of its shipment — the slowest offer
+    among the items assigned to that vendor. Every shipment costs
+    *shipment_cost* utility, so consolidating onto fewer vendors pays off
+    when the per-item gains of splitting are small.
+
+    Search is branch-and-bound over vendor subsets: vendors are tried in
+    order of standalone value, a subset is extended only if the new vendor
+    improves some item, and a branch is cut once its optimistic bound (each
+    item at its best remaining offer, own delivery time) cannot beat the
+    best basket found. For a fixed subset the assignment is a per-item
+    argmax, re-run until the consolidated times settle. The result is exact
+    when each vendor quotes one delivery time for all items (the platform
+    SLA model in scraper.py); otherwise it is a local optimum.
+
+    Parameters
+    ----------
+    basket : dict
+        item name → vendor list (or `VendorColumns` view), as in inventory.json.
+        Items without vendors are skipped.
+    quantities : dict, optional
+        item name → units; an item's utility is scaled by its quantity.
+    wp, wt, wr, gamma, delta, delivery_cap
+        As in `rank_vendors`.
+    shipment_cost : float
+        Utility charged per vendor used. 0 reduces to per-item winners.
+    max_shipments : int, optional
+        Upper bound on the number of vendors used.
+
+    Returns
+    -------
+    BasketPlan
+        Raises ValueError if *max_shipments* makes the basket infeasible.
+    """
+    quantities = quantities or {}
+    items = [(name, list(vendors)) for name, vendors in basket.items() if len(vendors)]
+    if not items:
+        return BasketPlan({}, {}, 0.0, 0)
+
+    # ── Per-item offer tables ─────────────────────────────────────────────────
+    vendor_ids: Dict[str, int] = {}
+    offers: List[Dict[int, Tuple[float, float, int]]] = []   # vendor → (base, own time, offer idx)
+    t_ranges: List[Tuple[float, float, float]] = []          # (t_min, t_max, qty · wt)
+    for name, vendors in items:
+        qty     = quantities.get(name, 1)
+        prices  = [v["price"] for v in vendors]
+        times   = [min(v["delivery_time"], delivery_cap) for v in vendors]
+        ratings = [v["rating"] for v in vendors]
+        p_min, p_max = min(prices),  max(prices)
+        t_min, t_max = min(times),   max(times)
+        r_min, r_max = min(ratings), max(ratings)
+        t_ranges.append((t_min, t_max, qty * wt))
+
+        table:    Dict[int, Tuple[float, float, int]] = {}
+        best_own: Dict[int, float] = {}      # several offers from one vendor: keep the best
+        for j, v in enumerate(vendors):
+            vid  = vendor_ids.setdefault(v["vendor_name"], len(vendor_ids))
+            base = qty * (wp * math.exp(-gamma * _min_max_norm(prices[j], p_min, p_max))
+                          + wr * math.log(1.0 + _min_max_norm(ratings[j], r_min, r_max)))
+            own  = base + qty * wt * math.exp(-delta * _min_max_norm(times[j], t_min, t_max))
+            if vid not in best_own or own > best_own[vid]:
+                best_own[vid] = own
+                table[vid]    = (base, times[j], j)
+        offers.append(table)
+
+    def speed(i: int, t: float) -> float:
+        t_min, t_max, scale = t_ranges[i]
+        return scale * math.exp(-delta * _speed_norm(t, t_min, t_max))
+
+    n_items, n_vendors = len(items), len(vendor_ids)
+    NEG = float("-inf")
+    # Optimistic utility: offer at its own delivery time (consolidation only slows it)
+    upper = [[NEG] * n_vendors for _ in range(n_items)]
+    for i, table in enumerate(offers):
+        for vid, (base, own_t, _) in table.items():
+            upper[i][vid] = base + speed(i, own_t)
+
+    order = sorted(range(n_vendors),
+                   key=lambda v: -sum(upper[i][v] for i in range(n_items) if upper[i][v] > NEG))
+    # suffix[k][i] — best optimistic utility of item i among vendors order[k:]
+    suffix = [[NEG] * n_items for _ in range(n_vendors + 1)]
+    for k in range(n_vendors - 1, -1, -1):
+        v = order[k]
+        suffix[k] = [max(a, upper[i][v]) for i, a in enumerate(suffix[k + 1])]
+
+    # ── Exact value of one vendor subset ──────────────────────────────────────
+    def evaluate(chosen: List[int]) -> Tuple[float, List[int]]:
+        assign = [max((v for v in chosen if v in offers[i]), key=lambda v: upper[i][v])
+                  for i in range(n_items)]
+        for _ in range(n_items + 1):
+            ship_t: Dict[int, float] = {}
+            for i, v in enumerate(assign):
+                ship_t[v] = max(ship_t.get(v, 0.0), offers[i][v][1])
+            new_assign = []
+            for i in range(n_items):
+                def joined(v: int) -> float:
+                    own_t = offers[i][v][1]
+                    return offers[i][v][0] + speed(i, max(ship_t.get(v, own_t), own_t))
+                new_assign.append(max((v for v in chosen if v in offers[i]), key=joined))
+            if new_assign == assign:
+                break
+            assign = new_assign
+        ship_t = {}
+        for i, v in enumerate(assign):
+            ship_t[v] = max(ship_t.get(v, 0.0), offers[i][v][1])
+        value = sum(offers[i][v][0] + speed(i, ship_t[v]) for i, v in enumerate(assign))
+        return value - shipment_cost * len(ship_t), assign
+
+    # ── Branch and bound over vendor subsets ──────────────────────────────────
+    best_value  = NEG
+    best_assign: Optional[List[int]] = None
+    nodes = 0
+
+    def search(k: int, chosen: List[int], current: List[float]) -> None:
+        nonlocal best_value, best_assign, nodes
+        nodes += 1
+        bound = 0.0
+        for a, b in zip(current, suffix[k]):
+            top = a if a > b else b
+            if top == NEG:
+                return                       # some item can no longer be bought
+            bound += top
+        if bound - shipment_cost * len(chosen) <= best_value + 1e-12:
+            return
+        if k == n_vendors:
+            value, assign = evaluate(chosen)
+            if value > best_value + 1e-12:
+                best_value, best_assign = value, assign
+            return
+        v = order[k]
+        improved = [max(a, upper[i][v]) for i, a in enumerate(current)]
+        if improved != current and (max_shipments is None or len(chosen) < max_shipments):
+            search(k + 1, chosen + [v], improved)
+        search(k + 1, chosen, current)
+
+    search(0, [], [NEG] * n_items)
+    if best_assign is None:
+        raise ValueError(f"No vendor assignment covers the basket with at most {max_shipments} shipments")
+
+    # ── Materialise the plan ──────────────────────────────────────────────────
+    names = list(vendor_ids)
+    ship_t = {}
+    for i, v in enumerate(best_assign):
+        ship_t[v] = max(ship_t.get(v, 0.0), offers[i][v][1])
+
+    assignment: Dict[str, Dict[str, Any]] = {}
+    shipments:  Dict[str, Dict[str, Any]] = {}
+    for i, v in enumerate(best_assign):
+        name, vendors = items[i]
+        base, _, j = offers[i][v]
+        entry = dict(vendors[j])
+        entry["utility_score"] = round(base + speed(i, ship_t[v]), 6)
+        assignment[name] = entry
+        ship = shipments.setdefault(names[v], {"items": [], "delivery_time": 0, "total_price": 0.0})
+        ship["items"].append(name)
+        ship["delivery_time"] = max(ship["delivery_time"], entry["delivery_time"])   # uncapped
+        ship["total_price"] += entry["price"] * quantities.get(name, 1)
+
+    return BasketPlan(assignment, shipments, round(best_value, 6), nodes)
+
+
+# ── Memoised ranking ──────────────────────────────────────────────────────────
+
+class RankingCache:
+    """
+    Bounded LRU cache in front of `rank_vendors`.
+
+    In the detection loop the inputs to `rank_vendors` are almost always the
+    same: one product's vendor list and the current slider weights. Entries
+    are keyed on
+
+        (product_key, (wp, wt, wr) normalised to sum 1, gamma, delta, delivery_cap, k, explain)
+
+    and tagged with the inventory version they were computed from. Passing a
+    different `inventory_version` (e.g. a content hash of inventory.json after
+    the scraper rewrote it) drops every cached ranking, so stale prices are
+    never served.
+
+    The returned lists are shared between callers — treat them as read-only.
+    Safe to share across threads (one lock around the dict operations).
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = max(1, int(maxsize))
+        self.hits    = 0
+        self.misses  = 0
+        self._version: Optional[Hashable] = None
+        self._entries: "OrderedDict[Tuple, List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(
+        product_key:  Hashable,
+        wp:           float,
+        wt:           float,
+        wr:           float,
+        gamma:        float,
+        delta:        float,
+        delivery_cap: int,
+        k:            Optional[int] = None,
+        explain:      bool = True,
+    ) -> Tuple:
+        """Cache key with weights normalised to the simplex (and rounded for float noise)."""
+        total = (wp + wt + wr) or 1.0
+        weights = (round(wp / total, 9), round(wt / total, 9), round(wr / total, 9))
+        return (product_key, weights, float(gamma), float(delta), int(delivery_cap), k, explain)
+
+    def invalidate(self, inventory_version: Optional[Hashable] = None) -> None:
+        """Drop every entry and adopt *inventory_version* as the current one."""
+        with self._lock:
+            self._entries.clear()
+            self._version = inventory_version
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def rank(
+        self,
+        product_key:       Hashable,
+        vendors:           List[Dict[str, Any]],
+        wp:                float = DEFAULT_WP,
+        wt:                float = DEFAULT_WT,
+        wr:                float = DEFAULT_WR,
+        gamma:             float = DEFAULT_GAMMA,
+        delta:             float = DEFAULT_DELTA,
+        delivery_cap:      int   = 480,
+        inventory_version: Optional[Hashable] = None,
+        k:                 Optional[int] = None,
+        explain:           bool  = True,
+    ) -> List[Dict[str, Any]]:
+        """
+        `rank_vendors` with memoisation. Weights are normalised to sum 1
+        before ranking, so (0.8, 0.7, 0.5) and (0.4, 0.35, 0.25) share an entry.
+        """
+        key = self.make_key(product_key, wp, wt, wr, gamma, delta, delivery_cap, k, explain)
+        with self._lock:
+            if inventory_version != self._version:
+                self._entries.clear()
+                self._version = inventory_version
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        n_wp, n_wt, n_wr = key[1]
+        ranked = rank_vendors(vendors, wp=n_wp, wt=n_wt, wr=n_wr, gamma=gamma, delta=delta,
+                              delivery_cap=delivery_cap, k=k, explain=explain)
+
+        with self._lock:
+            if inventory_version == self._version:
+                self._entries[key] = ranked
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return ranked
+
+
 # ── Self-test — run: python optimizer.py ─────────────────────────────────────
 if __name__ == "__main__":
     import json
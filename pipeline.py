@@ -0,0 +1,181 @@
+"""
+pipeline.py — Threaded Decode → Inference → Render Pipeline
+ShopVision Pro v4.0
+
+Splits the analysis loop into three concurrent stages joined by bounded
+queues, so throughput is set by the slowest stage instead of the sum of all:
+
+    decoder thread   — pulls sampled frames from the source  → frame queue
+    inference thread — drains the frame queue through YOLO   → result queue
+    render stage     — the caller's thread iterating `results()`
+
+OpenCV decoding and PyTorch inference both release the GIL, so plain threads
+give real overlap. The render stage stays on the caller's thread because
+Streamlit elements may only be updated from the script thread.
+
+Backpressure:
+    frame queue  — when inference falls behind, the OLDEST queued frame is
+                   dropped (counted in `dropped_frames`); the queue never grows
+                   beyond `queue_size`.
+    result queue — the inference thread blocks when the renderer falls behind.
+                   Results carry detection events, so they are never dropped;
+                   the renderer instead skips painting frames that already
+                   have a newer result waiting (see `backlog`).
+"""
+
+import queue
+import threading
+from typing import Any, Iterable, Iterator, Optional, Tuple
+
+from vision import Frame, SceneGate, predict_batched
+
+_SENTINEL = object()
+
+
+class StreamPipeline:
+    """
+    Producer/consumer wrapper around `predict_batched`.
+
+    Usage
+    -----
+        with StreamPipeline(model, frames, batch_size=4, conf=0.5, verbose=False) as pipe:
+            for frame_idx, frame, result, backlog in pipe.results():
+                ...   # draw / rank / publish; skip painting when backlog > 0
+    """
+
+    def __init__(
+        self,
+        model,
+        frames:      Iterable[Frame],
+        batch_size:  int  = 1,
+        queue_size:  int  = 8,
+        drop_frames: bool = True,
+        gate:        Optional[SceneGate] = None,
+        **predict_kwargs,
+    ):
+        self.model          = model
+        self.frames         = frames
+        self.batch_size     = batch_size
+        self.gate           = gate
+        self.drop_frames    = drop_frames
+        self.predict_kwargs = predict_kwargs
+
+        self.dropped_frames = 0
+        self._frame_q:  "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+        self._result_q: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+        self._stop    = threading.Event()
+        self._error:  Optional[BaseException] = None
+        self._threads = [
+            threading.Thread(target=self._decode_worker,    name="pipeline-decode",    daemon=True),
+            threading.Thread(target=self._inference_worker, name="pipeline-inference", daemon=True),
+        ]
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────────
+
+    def start(self) -> "StreamPipeline":
+        for t in self._threads:
+            t.start()
+        return self
+
+    def close(self) -> None:
+        """Signal both workers to stop and wait for them to exit."""
+        self._stop.set()
+        # Unblock any worker waiting on a full queue
+        for q in (self._frame_q, self._result_q):
+            try:
+                while True:
+                    q.get_nowait()
+            except queue.Empty:
+                pass
+        for t in self._threads:
+            if t.is_alive():
+                t.join(timeout=5.0)
+
+    def __enter__(self) -> "StreamPipeline":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ── Queue helpers ─────────────────────────────────────────────────────────
+
+    def _put(self, q: "queue.Queue", item: Any) -> bool:
+        """Blocking put that gives up once the pipeline is stopping."""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _put_dropping(self, item: Frame) -> None:
+        """Non-blocking put that evicts the oldest queued frame when full."""
+        while not self._stop.is_set():
+            try:
+                self._frame_q.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._frame_q.get_nowait()
+                    self.dropped_frames += 1
+                except queue.Empty:
+                    pass
+
+    # ── Stage 1: decode ───────────────────────────────────────────────────────
+
+    def _decode_worker(self) -> None:
+        try:
+            for item in self.frames:
+                if self._stop.is_set():
+                    break
+                if self.drop_frames:
+                    self._put_dropping(item)
+                else:
+                    self._put(self._frame_q, item)
+        except BaseException as exc:   # surfaced to the caller in results()
+            self._error = exc
+        finally:
+            self._put(self._frame_q, _SENTINEL)
+
+    # ── Stage 2: inference ────────────────────────────────────────────────────
+
+    def _queued_frames(self) -> Iterator[Frame]:
+        while not self._stop.is_set():
+            try:
+                item = self._frame_q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _SENTINEL:
+                return
+            yield item
+
+    def _inference_worker(self) -> None:
+        try:
+            for out in predict_batched(self.model, self._queued_frames(), self.batch_size,
+                                       gate=self.gate, **self.predict_kwargs):
+                if not self._put(self._result_q, out):
+                    break
+        except BaseException as exc:
+            self._error = exc
+        finally:
+            self._put(self._result_q, _SENTINEL)
+
+    # ── Stage 3: render (caller's thread) ─────────────────────────────────────
+
+    def results(self) -> Iterator[Tuple[int, Any, Any, int]]:
+        """
+        Yield (frame_idx, frame, result, backlog) in frame order.
+
+        `backlog` is the number of results already waiting behind this one;
+        a renderer can skip publishing the image when it is > 0 and still
+        process the detection events of every frame.
+        """
+        while True:
+            item = self._result_q.get()
+            if item is _SENTINEL:
+                break
+            frame_idx, frame, result = item
+            yield frame_idx, frame, result, self._result_q.qsize()
+        if self._error is not None:
+            raise self._error
@@ -0,0 +1,144 @@
+"""
+price_refresh.py — Background Price Refresh
+ShopVision Pro v4.0
+
+Runs the price scraper in a separate process so the dashboard never blocks
+on it, and lets the app notice new price data without reloading anything
+else:
+
+    BackgroundRefresher.start()   launches `python scraper.py` (or any other
+                                  command) detached from the calling thread;
+                                  returns immediately
+    BackgroundRefresher.status()  idle / running / done / failed, with the
+                                  last line of the scraper's output
+    inventory_stamp(path)         cheap (mtime, size) snapshot identifier
+
+The scraper appends each updated product to the inventory journal and
+publishes compacted snapshots with write-then-rename (inventory_store.py),
+so readers never see a partial file. Keying
+the inventory cache on `inventory_stamp` makes the app pick the new
+snapshot up on its next rerun while the model, and any analysis already
+holding the old product index, are untouched.
+
+One refresher is meant to be shared by every session of a server process
+(e.g. via st.cache_resource), so concurrent clicks start a single scrape.
+"""
+
+import atexit
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+from inventory_store import journal_path
+
+SCRAPER_SCRIPT = Path(__file__).parent / "scraper.py"
+
+
+class RefreshStatus(NamedTuple):
+    state:       str                 # "idle" | "running" | "done" | "failed"
+    started_at:  Optional[float]     # time.time() of the last start
+    finished_at: Optional[float]
+    message:     str                 # last non-empty output line of the last run
+
+    @property
+    def running(self) -> bool:
+        return self.state == "running"
+
+
+def inventory_stamp(path: str = "inventory.json") -> Tuple[Optional[Tuple[int, int]], ...]:
+    """
+    (mtime_ns, size) of the snapshot *path* and of its update journal (None
+    for a missing file). Changes on every journal append and compaction.
+    """
+    stamps = []
+    for file in (path, journal_path(path)):
+        try:
+            st = os.stat(file)
+        except OSError:
+            stamps.append(None)
+        else:
+            stamps.append((st.st_mtime_ns, st.st_size))
+    return tuple(stamps)
+
+
+class BackgroundRefresher:
+    """
+    Parameters
+    ----------
+    command : list of str, optional
+        Process to run; default is this interpreter running scraper.py.
+    cwd : str, optional
+        Working directory of the process (default: the scraper's directory).
+    """
+
+    def __init__(self, command: Optional[List[str]] = None, cwd: Optional[str] = None):
+        self.command = command or [sys.executable, str(SCRAPER_SCRIPT)]
+        self.cwd     = cwd or str(SCRAPER_SCRIPT.parent)
+
+        self._lock        = threading.Lock()
+        self._proc:  Optional[subprocess.Popen] = None
+        self._log:   Optional[str]              = None
+        self._message      = ""                 # last output line of a finished run
+        self._started_at:  Optional[float] = None
+        self._finished_at: Optional[float] = None
+        atexit.register(self._discard_log)      # a run still going at interpreter exit
+
+    def start(self) -> bool:
+        """Launch a refresh; False (and no-op) if one is already running."""
+        with self._lock:
+            if self._proc is not None and self._proc.poll() is None:
+                return False
+            self._discard_log()
+            fd, self._log = tempfile.mkstemp(prefix="shopvision_refresh_", suffix=".log")
+            with os.fdopen(fd, "wb") as log:
+                # The child inherits the descriptor; ours can close right away
+                self._proc = subprocess.Popen(
+                    self.command, cwd=self.cwd, stdout=log, stderr=subprocess.STDOUT,
+                    stdin=subprocess.DEVNULL, env={**os.environ, "PYTHONIOENCODING": "utf-8", "PYTHONUNBUFFERED": "1"},
+                )
+            self._started_at  = time.time()
+            self._finished_at = None
+            return True
+
+    def _discard_log(self) -> None:
+        if self._log is not None:
+            try:
+                Path(self._log).unlink(missing_ok=True)
+            except OSError:                     # still open by the child (Windows)
+                return
+            self._log = None
+
+    def _last_line(self) -> str:
+        try:
+            with open(self._log, encoding="utf-8", errors="replace") as f:
+                lines = [line.strip() for line in f if line.strip() and set(line.strip()) != {"="}]
+        except (OSError, TypeError):
+            return ""
+        return lines[-1] if lines else ""
+
+    def status(self) -> RefreshStatus:
+        with self._lock:
+            if self._proc is None:
+                return RefreshStatus("idle", None, None, "")
+            code = self._proc.poll()
+            if code is None:
+                return RefreshStatus("running", self._started_at, None, self._last_line())
+            if self._finished_at is None:
+                # The output is complete: keep its last line, drop the log file
+                self._finished_at = time.time()
+                self._message     = self._last_line()
+                self._discard_log()
+            return RefreshStatus("done" if code == 0 else "failed",
+                                 self._started_at, self._finished_at, self._message)
+
+    def wait(self, timeout: Optional[float] = None) -> RefreshStatus:
+        """Block until the current refresh exits (for scripts and tests)."""
+        proc = self._proc
+        if proc is not None:
+            proc.wait(timeout)
+        return self.status()
@@ -0,0 +1,144 @@
+"""
+recommend.py — Detection → Recommendation Events
+ShopVision Pro v4.0
+
+Turns a stream of (label, subtype, timestamp) detections into shopping
+recommendations, exactly as the Streamlit dashboard does:
+
+    inventory lookup (catalog.py) → per-product cooldown → NDU ranking
+    (optimizer.py) → one history row per recommendation
+
+Shared by app.py and the headless batch analyser (batch_analyze.py) so both
+produce identical `history` rows.
+"""
+
+from typing import Any, Dict, Hashable, List, Optional
+
+from catalog import lookup_product
+from optimizer import DEFAULT_WP, DEFAULT_WT, DEFAULT_WR, RankingCache, rank_vendors
+
+# Vendors ranked per recommendation: the winner and the runner-up ("Alt. Vendor")
+TOP_K = 2
+
+# Column order of a history row (st.session_state.history / batch timelines)
+HISTORY_COLUMNS = ["Time", "Product", "Vendor", "Price", "U_Score",
+                   "Why", "Alt. Vendor", "Alt. Price", "Link"]
+
+
+def history_row(
+    time_sec:     float,
+    product_name: str,
+    winner:       Dict[str, Any],
+    runner_up:    Optional[Dict[str, Any]],
+) -> Dict[str, str]:
+    """Format one recommendation as a shopping-list / timeline row."""
+    return {
+        "Time":        f"{time_sec:.1f}s",
+        "Product":     product_name,
+        "Vendor":      winner['vendor_name'],
+        "Price":       f"₹{winner['price']:.0f}",
+        "U_Score":     f"{winner['utility_score']:.4f}",
+        "Why":         winner.get('why', 'Best weighted balance'),
+        "Alt. Vendor": runner_up['vendor_name'] if runner_up else "—",
+        "Alt. Price":  f"₹{runner_up['price']:.0f}" if runner_up else "—",
+        "Link":        winner.get('url', '#'),
+    }
+
+
+class Recommender:
+    """
+    Stateful detection → recommendation step.
+
+    Parameters
+    ----------
+    index : dict
+        Product lookup index from `catalog.build_product_index`.
+    cooldown : float
+        Seconds of video before the same product may be recommended again.
+    last_seen : dict, optional
+        product name → last recommendation time (seconds). Pass
+        `st.session_state.last_seen` to keep cooldowns across reruns.
+    ranking_cache : RankingCache, optional
+        Memoises rankings; `inventory_version` is forwarded to it. Records
+        carrying a "version" (journal / SQLite inventories) are also keyed
+        on it, so a product updated under a live index is re-ranked.
+    wp, wt, wr : float
+        NDU weights.
+    """
+
+    def __init__(
+        self,
+        index:             Dict,
+        cooldown:          float = 5.0,
+        last_seen:         Optional[Dict[str, float]] = None,
+        ranking_cache:     Optional[RankingCache] = None,
+        inventory_version: Optional[Hashable] = None,
+        wp:                float = DEFAULT_WP,
+        wt:                float = DEFAULT_WT,
+        wr:                float = DEFAULT_WR,
+    ):
+        self.index             = index
+        self.cooldown          = cooldown
+        self.last_seen         = last_seen if last_seen is not None else {}
+        self.ranking_cache     = ranking_cache
+        self.inventory_version = inventory_version
+        self.wp, self.wt, self.wr = wp, wt, wr
+
+    def _rank(self, product_name: str, vendors: List[Dict[str, Any]],
+              record_version: Optional[int] = None) -> List[Dict[str, Any]]:
+        # Only the winner and runner-up are shown, so rank the top 2 only
+        if self.ranking_cache is not None:
+            key = product_name if record_version is None else (product_name, record_version)
+            return self.ranking_cache.rank(
+                key, vendors, wp=self.wp, wt=self.wt, wr=self.wr,
+                inventory_version=self.inventory_version, k=TOP_K,
+            )
+        return rank_vendors(vendors, wp=self.wp, wt=self.wt, wr=self.wr, k=TOP_K)
+
+    def observe(
+        self,
+        label:    str,
+        subtype:  str,
+        time_sec: float,
+        memo:     Optional[Dict[str, Any]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Process one detection. Returns None when the product is unknown, has
+        no vendors, or is still in cooldown; otherwise an event dict with
+        `product_name`, `subtype`, `time_sec`, `ranked` (top TOP_K), `winner`,
+        `runner_up` and the formatted history `row`.
+
+        *memo* is an optional per-object cache (e.g. `Track.memo` from
+        vision.IoUTracker); the product lookup is then done once per tracked
+        object and (label, subtype) instead of once per frame.
+        """
+        if memo is not None and memo.get("product_key") == (label, subtype):
+            product = memo["product"]
+        else:
+            product = lookup_product(self.index, label, subtype)
+            if memo is not None:
+                memo["product_key"] = (label, subtype)
+                memo["product"]     = product
+        if not product:
+            return None
+
+        product_name = product.get('name', f"Unknown {label}")
+        vendors      = product.get('vendors', [])
+        last_time    = self.last_seen.get(product_name, -100)
+        if not vendors or (time_sec - last_time) <= self.cooldown:
+            return None
+
+        ranked    = self._rank(product_name, vendors, product.get("version"))
+        winner    = ranked[0]
+        runner_up = ranked[1] if len(ranked) > 1 else None
+        self.last_seen[product_name] = time_sec
+
+        return {
+            "product_name": product_name,
+            "subtype":      subtype,
+            "time_sec":     time_sec,
+            "ranked":       ranked,
+            "winner":       winner,
+            "runner_up":    runner_up,
+            "row":          history_row(time_sec, product_name, winner, runner_up),
+        }
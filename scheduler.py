@@ -0,0 +1,281 @@
+"""
+scheduler.py — Staleness-Driven Incremental Scrape Scheduler
+ShopVision Pro v4.0
+
+Re-scrapes only the products whose prices are due instead of the whole
+catalogue. A product is due once the age of its inventory record exceeds
+its effective TTL:
+
+    effective_ttl = ttl_hours / ((1 + ln(1 + detections)) · (1 + VOLATILITY_WEIGHT · cv))
+
+    ttl_hours   "ttl_hours" of the product in scraper.PRODUCTS, else --ttl-hours
+    detections  recommendation rows for the product in the saved timelines
+                (batch_analyze.py output and the app's analysed sessions)
+    cv          coefficient of variation of the product's recent cheapest
+                prices, recorded in scrape_state.json after every run
+
+so frequently detected and volatile products are refreshed more often.
+Due products are scraped most-overdue first (priority = age / effective
+TTL; never-scraped products lead), within a request budget (--max-requests,
+REQUESTS_PER_PRODUCT each) and/or a wall-clock budget (--time-budget).
+Whatever does not fit stays due and is picked up by the next run.
+
+A product whose scrape fails is backed off for one effective TTL, so a
+dead listing cannot starve the rest of the queue.
+
+USAGE:
+    python scheduler.py --plan                   # show the ranking, scrape nothing
+    python scheduler.py                          # scrape everything that is due
+    python scheduler.py --max-requests 40 --time-budget 300 --concurrent
+    python scheduler.py --history timelines/ archive/ --ttl-hours 12
+    python scheduler.py --db inventory.db        # SQLite inventory (inventory_db.py)
+"""
+
+import argparse
+import json
+import math
+import os
+import statistics
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+import scraper
+from http_cache import DEFAULT_CACHE_DIR
+from inventory_store import read_inventory
+
+DEFAULT_TTL_HOURS    = 24.0
+DEFAULT_HISTORY_DIR  = "timelines"
+DEFAULT_STATE_FILE   = "scrape_state.json"
+REQUESTS_PER_PRODUCT = 2        # one Amazon + one Bing search page
+VOLATILITY_WEIGHT    = 4.0      # cv of 0.25 halves the TTL
+PRICE_HISTORY        = 10       # cheapest-price observations kept per product
+
+
+# ── Detection frequency ───────────────────────────────────────────────────────
+
+def _timeline_files(paths: Iterable[str]) -> Iterator[Path]:
+    for item in paths:
+        path = Path(item)
+        if path.is_dir():
+            yield from sorted(p for p in path.rglob("*") if p.suffix in (".json", ".parquet"))
+        elif path.is_file():
+            yield path
+
+
+def load_detection_counts(paths: Iterable[str]) -> Dict[str, int]:
+    """
+    Count recommendation rows per product name across timeline files and
+    directories (JSON or Parquet, schema recommend.HISTORY_COLUMNS).
+    """
+    counts: Dict[str, int] = {}
+    for path in _timeline_files(paths):
+        try:
+            if path.suffix == ".parquet":
+                import pandas as pd
+                names = pd.read_parquet(path, columns=["Product"])["Product"].tolist()
+            else:
+                with open(path, encoding="utf-8") as f:
+                    names = [row.get("Product") for row in json.load(f)]
+        except (ImportError, OSError, ValueError, KeyError, AttributeError, TypeError) as exc:
+            print(f"  ⚠  Skipping timeline '{path}': {exc}")
+            continue
+        for name in names:
+            if name:
+                counts[name] = counts.get(name, 0) + 1
+    return counts
+
+
+# ── Scrape state ──────────────────────────────────────────────────────────────
+
+class ScrapeState:
+    """
+    Per-product scrape history kept between scheduler runs: the cheapest
+    price of each recent successful scrape (for volatility) and the time of
+    the last attempt (for back-off after failures).
+    """
+
+    def __init__(self, path: str = DEFAULT_STATE_FILE):
+        self.path = Path(path)
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.prices:   Dict[str, List[float]] = data.get("prices", {})
+        self.attempts: Dict[str, str]         = data.get("attempts", {})
+
+    def record(self, key: str, record: Optional[Dict[str, Any]], when: datetime) -> None:
+        """Note a scrape attempt of *key*; *record* is the new inventory record or None."""
+        self.attempts[key] = when.isoformat(timespec="seconds")
+        prices = [v["price"] for v in (record or {}).get("vendors", [])]
+        if prices:
+            history = self.prices.setdefault(key, [])
+            history.append(min(prices))
+            del history[:-PRICE_HISTORY]
+
+    def volatility(self, key: str) -> float:
+        """Coefficient of variation of the recorded cheapest prices (0 with < 2 points)."""
+        prices = self.prices.get(key, [])
+        if len(prices) < 2:
+            return 0.0
+        mean = statistics.fmean(prices)
+        return statistics.pstdev(prices) / mean if mean > 0 else 0.0
+
+    def save(self) -> None:
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"prices": self.prices, "attempts": self.attempts}, f, indent=4)
+        os.replace(tmp, self.path)
+
+
+# ── Planning ──────────────────────────────────────────────────────────────────
+
+class Candidate(NamedTuple):
+    key:        str
+    name:       str
+    age_hours:  float       # inf when never scraped
+    ttl_hours:  float       # effective TTL
+    detections: int
+    volatility: float
+    priority:   float       # age / effective TTL; due at >= 1
+
+    @property
+    def due(self) -> bool:
+        return self.priority >= 1.0
+
+
+def _hours_since(stamp: Optional[str], now: datetime) -> float:
+    try:
+        return max(0.0, (now - datetime.fromisoformat(stamp)).total_seconds() / 3600)
+    except (TypeError, ValueError):
+        return math.inf
+
+
+def plan(
+    products:   Dict[str, Dict[str, Any]],
+    inventory:  Dict[str, Dict[str, Any]],
+    detections: Dict[str, int],
+    state:      ScrapeState,
+    ttl_hours:  float = DEFAULT_TTL_HOURS,
+    now:        Optional[datetime] = None,
+) -> List[Candidate]:
+    """Every product with its staleness priority, most urgent first."""
+    now = now or datetime.now()
+    candidates = []
+    for key, product in products.items():
+        record = inventory.get(key, {})
+        names  = {product["name"], record.get("name", product["name"])}
+        hits   = sum(detections.get(name, 0) for name in names)
+        vol    = state.volatility(key)
+        ttl    = product.get("ttl_hours", ttl_hours) / ((1 + math.log1p(hits)) * (1 + VOLATILITY_WEIGHT * vol))
+        age    = min(_hours_since(record.get("scraped_at"), now),
+                     _hours_since(state.attempts.get(key), now))
+        priority = age / ttl if ttl > 0 else math.inf
+        candidates.append(Candidate(key, product["name"], age, ttl, hits, vol, priority))
+    candidates.sort(key=lambda c: (-c.priority, -c.detections, c.key))
+    return candidates
+
+
+def select(candidates: List[Candidate], max_requests: Optional[int] = None) -> List[Candidate]:
+    """The due candidates that fit in *max_requests* search requests, in priority order."""
+    due = [c for c in candidates if c.due]
+    if max_requests is None:
+        return due
+    return due[:max(0, max_requests) // REQUESTS_PER_PRODUCT]
+
+
+# ── Entry point ───────────────────────────────────────────────────────────────
+
+def run(
+    history:      Iterable[str] = (DEFAULT_HISTORY_DIR,),
+    ttl_hours:    float = DEFAULT_TTL_HOURS,
+    max_requests: Optional[int] = None,
+    time_budget:  Optional[float] = None,
+    state_file:   str = DEFAULT_STATE_FILE,
+    plan_only:    bool = False,
+    dry_run:      bool = False,
+    inventory_db: Optional[str] = None,
+    **scrape_kwargs,
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Scrape the due products (scraper.run with a product subset) and record
+    the outcome in *state_file*. Returns key → new record (None on failure)
+    for the products attempted, like scraper.run.
+    *inventory_db* plans against, and updates, that SQLite inventory
+    instead of inventory.json. *scrape_kwargs* are forwarded to scraper.run
+    (concurrent, cache, ...).
+    """
+    if inventory_db is not None:
+        from inventory_db import InventoryDB
+        with InventoryDB(inventory_db) as db:
+            inventory = dict(db.items())
+    else:
+        inventory = read_inventory(str(Path(scraper.__file__).parent / "inventory.json")).db
+
+    state      = ScrapeState(state_file)
+    candidates = plan(scraper.PRODUCTS, inventory, load_detection_counts(history), state, ttl_hours)
+    selected   = select(candidates, max_requests)
+    chosen     = {c.key for c in selected}
+
+    print("=" * 65)
+    print("  ShopVision Pro v4.0 — Incremental Scrape Scheduler")
+    print(f"  Products : {len(candidates)}  ({sum(c.due for c in candidates)} due, {len(selected)} selected)")
+    print(f"  Budget   : {'∞' if max_requests is None else max_requests} requests, "
+          f"{'∞' if time_budget is None else f'{time_budget:.0f}s'}")
+    print(f"  Time     : {datetime.now().strftime('%Y-%m-%d  %H:%M:%S')}")
+    print("=" * 65)
+    print(f"  {'product':<22} {'age h':>8} {'ttl h':>7} {'seen':>5} {'cv':>6} {'priority':>9}")
+    for c in candidates:
+        mark = "▶" if c.key in chosen else ("…" if c.due else " ")
+        age  = "never" if math.isinf(c.age_hours) else f"{c.age_hours:.1f}"
+        print(f"{mark} {c.key:<22} {age:>8} {c.ttl_hours:>7.1f} {c.detections:>5} "
+              f"{c.volatility:>6.3f} {c.priority:>9.2f}")
+    print("  ▶ scrape this run   … due, over budget")
+
+    if plan_only or not selected:
+        print("  Nothing to scrape." if not selected else "  (Plan only — nothing scraped)")
+        return {}
+
+    started = datetime.now()
+    attempts = scraper.run(dry_run=dry_run, products={c.key: scraper.PRODUCTS[c.key] for c in selected},
+                           time_budget=time_budget, inventory_db=inventory_db, **scrape_kwargs)
+    if not dry_run:
+        # Products deferred by the time budget are absent, so they stay due
+        for key, record in attempts.items():
+            state.record(key, record, started)
+        state.save()
+    return attempts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ShopVision Pro incremental scrape scheduler")
+    parser.add_argument("--plan", action="store_true", help="Print the ranking only; scrape nothing")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Scrape but do not modify inventory.json or the scheduler state")
+    parser.add_argument("--history", nargs="+", default=[DEFAULT_HISTORY_DIR],
+                        help="Timeline files/directories used for detection frequency")
+    parser.add_argument("--ttl-hours", type=float, default=DEFAULT_TTL_HOURS,
+                        help="Base TTL for products without their own 'ttl_hours'")
+    parser.add_argument("--max-requests", type=int, default=None,
+                        help=f"Search requests per run ({REQUESTS_PER_PRODUCT} per product)")
+    parser.add_argument("--time-budget", type=float, default=None,
+                        help="Seconds per run; products not started in time stay due")
+    parser.add_argument("--state", default=DEFAULT_STATE_FILE, help="Scheduler state file")
+    parser.add_argument("--db", default=None, metavar="PATH",
+                        help="Plan against and update this SQLite inventory (inventory_db.py) "
+                             "instead of inventory.json")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="Overlap requests with the asyncio engine (per-host rate limited)")
+    parser.add_argument("--cache", action="store_true",
+                        help="Reuse recently fetched pages from the HTTP response cache (default: always fetch)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="HTTP response cache directory")
+    parser.add_argument("--amazon-url", default=scraper.AMAZON_BASE_URL, help="Amazon search base URL")
+    parser.add_argument("--bing-url", default=scraper.BING_BASE_URL, help="Bing Shopping base URL")
+    args = parser.parse_args()
+
+    run(history=args.history, ttl_hours=args.ttl_hours, max_requests=args.max_requests,
+        time_budget=args.time_budget, state_file=args.state, plan_only=args.plan,
+        dry_run=args.dry_run, inventory_db=args.db, concurrent=args.concurrent,
+        base_urls={"amazon": args.amazon_url, "bing": args.bing_url},
+        cache_dir=args.cache_dir if args.cache else None)
@@ -15,6 +15,10 @@ ARCHITECTURE:
 USAGE:
     python scraper.py              # scrape and save to inventory.json
     python scraper.py --dry-run   # print results without saving
+    python scraper.py --concurrent  # overlap requests (see async_scraper.py)
+    python scraper.py --cache     # reuse recently fetched pages (see http_cache.py)
+    python scraper.py --replay    # rebuild from recorded responses, offline
+    python scheduler.py           # re-scrape only stale products (see scheduler.py)
 
 METHODOLOGY NOTE (for paper):
     Amazon India returns multiple marketplace sellers at different price points
@@ -26,13 +30,23 @@ METHODOLOGY NOTE (for paper):
 """
 
 import requests
-from bs4 import BeautifulSoup
-import json
+from bs4 import BeautifulSoup, SoupStrainer, Tag
 import time
 import re
 import argparse
 from datetime import datetime
 from pathlib import Path
+from typing import Iterator
+
+from http_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, DEFAULT_TTL, ResponseCache
+from inventory_store import InventoryWriter, read_inventory
+
+# C-accelerated parsing when available (pip install lxml)
+try:
+    import lxml.html
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
 
 # ── HTTP Session ──────────────────────────────────────────────────────────────
 SESSION = requests.Session()
@@ -49,6 +63,18 @@ SESSION.headers.update({
     "DNT":             "1",
 })
 
+# On-disk response cache (http_cache.py); set by run(), None = always fetch
+HTTP_CACHE: ResponseCache | None = None
+FETCH_STATS = {"network": 0, "cache": 0}
+
+# Search endpoints — override (e.g. with a local stub server) via the
+# base_url arguments or --amazon-url / --bing-url. Product links written to
+# inventory.json always point at the real sites.
+AMAZON_BASE_URL = "https://www.amazon.in"
+BING_BASE_URL   = "https://www.bing.com"
+REQUEST_TIMEOUT = 15
+REQUEST_PAUSE   = 2.0           # seconds after each sequential request (politeness)
+
 # ── Platform delivery constants (minutes) — from published platform SLAs ─────
 DELIVERY = {
     "amazon":           1440,   # Amazon standard (next-day for Prime)
@@ -128,8 +154,84 @@ PRODUCTS = {
 }
 
 
+# ── Parse scope ───────────────────────────────────────────────────────────────
+# Only the result containers (and everything inside them) are handed to
+# BeautifulSoup; navigation, scripts and the rest of the page never become
+# Python objects. With lxml the page is parsed in C and the outermost
+# containers are cut out by XPath; without it, html.parser runs with a
+# SoupStrainer, which still tokenises the page but builds only the containers.
+
+def _is_bing_container(css_class) -> bool:
+    # Union of the .br-item / .pu-prodCard / [class*='prodCard'] selectors in parse_bing.
+    # bs4 passes either the whole class string or one value, depending on version.
+    if not css_class:
+        return False
+    classes = css_class.split() if isinstance(css_class, str) else css_class
+    return any(c == "br-item" or "prodCard" in c for c in classes)
+
+
+_STRAINERS = {
+    "amazon": SoupStrainer(attrs={"data-component-type": "s-search-result"}),
+    "bing":   SoupStrainer(class_=_is_bing_container),
+}
+_CONTAINER_XPATH = {
+    "amazon": '//*[@data-component-type="s-search-result"]',
+    "bing":   '//*[contains(concat(" ", normalize-space(@class), " "), " br-item ")'
+              ' or contains(@class, "prodCard")]',
+}
+
+PARSE_STATS = {"pages": 0, "seconds": 0.0}
+
+
+def _container_fragments(html: str, xpath: str) -> Iterator[str]:
+    """Serialised outermost elements matching *xpath*, in document order (nested matches stay inside)."""
+    root  = lxml.html.fromstring(html.encode("utf-8"), parser=lxml.html.HTMLParser(encoding="utf-8"))
+    nodes = root.xpath(xpath)
+    found = set(nodes)
+    for n in nodes:
+        if not any(a in found for a in n.iterancestors()):
+            yield lxml.html.tostring(n, encoding="unicode", with_tail=False)
+
+
+def _soup(html: str, site: str, parser: str | None = None, restrict: bool = True) -> BeautifulSoup:
+    """Parse a search page of *site* ("amazon" / "bing"); see Parse scope above."""
+    parser = parser or HTML_PARSER
+    if not restrict:
+        return BeautifulSoup(html, parser)
+    if parser == "lxml" and html.strip():
+        return BeautifulSoup("".join(_container_fragments(html, _CONTAINER_XPATH[site])), "lxml")
+    return BeautifulSoup(html, parser, parse_only=_STRAINERS[site])
+
+
+def _amazon_containers(html: str, parser: str | None = None, restrict: bool = True) -> Iterator[Tag]:
+    """
+    Amazon result containers in document order. On the lxml path each
+    container is built only when the caller reaches it, so stopping after
+    three listings skips the rest of the results.
+    """
+    selector = '[data-component-type="s-search-result"]'
+    if restrict and (parser or HTML_PARSER) == "lxml" and html.strip():
+        for markup in _container_fragments(html, _CONTAINER_XPATH["amazon"]):
+            yield from BeautifulSoup(markup, "lxml").select(selector)
+    else:
+        yield from _soup(html, "amazon", parser, restrict).select(selector)
+
+
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
+def _fetch(url: str) -> str:
+    """GET *url* through SESSION (via HTTP_CACHE when enabled); raises on HTTP errors."""
+    if HTTP_CACHE is not None:
+        resp = HTTP_CACHE.get(SESSION, url, timeout=REQUEST_TIMEOUT)
+        # A 304 revalidation still made a request: it counts for pacing
+        FETCH_STATS["cache" if resp.from_cache and not resp.revalidated else "network"] += 1
+        return resp.text
+    resp = SESSION.get(url, timeout=REQUEST_TIMEOUT)
+    FETCH_STATS["network"] += 1
+    resp.raise_for_status()
+    return resp.text
+
+
 def _parse_price(text: str) -> float | None:
     text = text.replace(",", "").strip()
     for pat in [r'(?:₹|Rs\.?\s*)(\d+(?:\.\d+)?)', r'^(\d+(?:\.\d{1,2})?)$']:
@@ -167,81 +269,97 @@ def _deduplicate(vendors: list) -> list:
 
 # ── Scraper 1: Amazon India ───────────────────────────────────────────────────
 
+def amazon_search_url(query: str, amazon_cat: str = "grocery", base_url: str = AMAZON_BASE_URL) -> str:
+    return f"{base_url}/s?k={requests.utils.quote(query)}&i={amazon_cat}"
+
+
+def parse_amazon(html: str, query: str, price_floor: float, price_ceil: float,
+                 parser: str | None = None, restrict: bool = True) -> list:
+    """
+    Extract up to three distinct price-tier listings from an Amazon India
+    search results page. *parser* overrides HTML_PARSER; restrict=False
+    builds the whole page instead of the result containers only.
+    """
+    started = time.perf_counter()
+    vendors = []
+    containers = _amazon_containers(html, parser, restrict)
+
+    prices_seen: set[float] = set()
+    for container in containers:
+        # Price
+        pw = container.select_one(".a-price-whole")
+        pf = container.select_one(".a-price-fraction")
+        if not pw:
+            continue
+        try:
+            p_str = pw.get_text().replace(",", "").strip().rstrip(".")
+            if pf:
+                p_str += "." + pf.get_text().strip()
+            price = round(float(p_str), 2)
+        except ValueError:
+            continue
+
+        if not (price_floor <= price <= price_ceil):
+            continue
+        if price in prices_seen:
+            continue
+        prices_seen.add(price)
+
+        # Title for context
+        title_el = container.select_one("h2 span")
+        title = title_el.get_text().strip() if title_el else ""
+
+        # Rating
+        rating_el = container.select_one(".a-icon-alt")
+        rating = 4.2
+        if rating_el:
+            m = re.search(r"(\d+\.?\d*)", rating_el.get_text())
+            if m:
+                rating = round(min(float(m.group(1)), 5.0), 1)
+
+        # Link
+        link_el = container.select_one("h2 a")
+        href = ""
+        if link_el:
+            href = "https://www.amazon.in" + link_el.get("href", "").split("?")[0]
+
+        # Classify delivery tier from title keywords
+        title_lower = title.lower()
+        if any(k in title_lower for k in ["fresh", "pantry", "now", "today"]):
+            vendor_name = "Amazon Fresh"
+            delivery_t  = DELIVERY["amazon fresh"]
+        else:
+            vendor_name = "Amazon"
+            delivery_t  = DELIVERY["amazon"]
+
+        vendors.append({
+            "vendor_name":   vendor_name,
+            "price":         price,
+            "delivery_time": delivery_t,
+            "rating":        rating,
+            "url":           href or f"https://www.amazon.in/s?k={requests.utils.quote(query)}",
+            "source":        "amazon_in",
+        })
+
+        if len(vendors) >= 3:   # Take up to 3 distinct price-tier listings
+            break
+
+    PARSE_STATS["pages"]   += 1
+    PARSE_STATS["seconds"] += time.perf_counter() - started
+    return vendors
+
+
 def scrape_amazon(query: str, price_floor: float, price_ceil: float,
-                  amazon_cat: str = "grocery") -> list:
+                  amazon_cat: str = "grocery", base_url: str = AMAZON_BASE_URL) -> list:
     """
     Scrape Amazon India search results for the given product query.
     Extracts multiple listings (different sellers/price-tiers) from the
     Amazon India marketplace.
     """
-    url = f"https://www.amazon.in/s?k={requests.utils.quote(query)}&i={amazon_cat}"
     vendors = []
     try:
-        resp = SESSION.get(url, timeout=15)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
-        containers = soup.select('[data-component-type="s-search-result"]')
-
-        prices_seen: set[float] = set()
-        for container in containers:
-            # Price
-            pw = container.select_one(".a-price-whole")
-            pf = container.select_one(".a-price-fraction")
-            if not pw:
-                continue
-            try:
-                p_str = pw.get_text().replace(",", "").strip().rstrip(".")
-                if pf:
-                    p_str += "." + pf.get_text().strip()
-                price = round(float(p_str), 2)
-            except ValueError:
-                continue
-
-            if not (price_floor <= price <= price_ceil):
-                continue
-            if price in prices_seen:
-                continue
-            prices_seen.add(price)
-
-            # Title for context
-            title_el = container.select_one("h2 span")
-            title = title_el.get_text().strip() if title_el else ""
-
-            # Rating
-            rating_el = container.select_one(".a-icon-alt")
-            rating = 4.2
-            if rating_el:
-                m = re.search(r"(\d+\.?\d*)", rating_el.get_text())
-                if m:
-                    rating = round(min(float(m.group(1)), 5.0), 1)
-
-            # Link
-            link_el = container.select_one("h2 a")
-            href = ""
-            if link_el:
-                href = "https://www.amazon.in" + link_el.get("href", "").split("?")[0]
-
-            # Classify delivery tier from title keywords
-            title_lower = title.lower()
-            if any(k in title_lower for k in ["fresh", "pantry", "now", "today"]):
-                vendor_name = "Amazon Fresh"
-                delivery_t  = DELIVERY["amazon fresh"]
-            else:
-                vendor_name = "Amazon"
-                delivery_t  = DELIVERY["amazon"]
-
-            vendors.append({
-                "vendor_name":   vendor_name,
-                "price":         price,
-                "delivery_time": delivery_t,
-                "rating":        rating,
-                "url":           href or f"https://www.amazon.in/s?k={requests.utils.quote(query)}",
-                "source":        "amazon_in",
-            })
-
-            if len(vendors) >= 3:   # Take up to 3 distinct price-tier listings
-                break
-
+        vendors = parse_amazon(_fetch(amazon_search_url(query, amazon_cat, base_url)),
+                               query, price_floor, price_ceil)
     except Exception as exc:
         print(f"    ⚠  Amazon: {exc}")
     return vendors
@@ -249,58 +367,71 @@ def scrape_amazon(query: str, price_floor: float, price_ceil: float,
 
 # ── Scraper 2: Bing Shopping ──────────────────────────────────────────────────
 
-def scrape_bing(query: str, price_floor: float, price_ceil: float) -> list:
-    """
-    Bing Shopping is more permissive than Google Shopping for automated access.
-    Returns vendor + price pairs from the shopping tab.
-    """
-    url = f"https://www.bing.com/shop?q={requests.utils.quote(query)}&mkt=en-IN&setlang=en-IN"
+def bing_search_url(query: str, base_url: str = BING_BASE_URL) -> str:
+    return f"{base_url}/shop?q={requests.utils.quote(query)}&mkt=en-IN&setlang=en-IN"
+
+
+def parse_bing(html: str, query: str, price_floor: float, price_ceil: float,
+               parser: str | None = None, restrict: bool = True) -> list:
+    """Extract vendor + price pairs from a Bing Shopping results page (options as parse_amazon)."""
+    started = time.perf_counter()
     vendors = []
-    try:
-        resp = SESSION.get(url, timeout=15)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
-
-        # Bing shopping results live in div.br-item or div.pu-prod-card.
-        # Note: the broad [class*='item'] fallback is intentionally excluded —
-        # it matches nav/header/footer elements and produces garbage vendor data.
-        containers = (
-            soup.select(".br-item")
-            or soup.select(".pu-prodCard")
-            or soup.select("[class*='prodCard']")
+    soup = _soup(html, "bing", parser, restrict)
+
+    # Bing shopping results live in div.br-item or div.pu-prod-card.
+    # Note: the broad [class*='item'] fallback is intentionally excluded —
+    # it matches nav/header/footer elements and produces garbage vendor data.
+    containers = (
+        soup.select(".br-item")
+        or soup.select(".pu-prodCard")
+        or soup.select("[class*='prodCard']")
+    )
+
+    for con in containers[:15]:
+        price_el = (
+            con.select_one(".pu-finalPrice")
+            or con.select_one(".b_price")
+            or con.select_one("[class*='price']")
+        )
+        seller_el = (
+            con.select_one(".pu-seller")
+            or con.select_one("[class*='seller']")
+            or con.select_one("[class*='merchant']")
         )
 
-        for con in containers[:15]:
-            price_el = (
-                con.select_one(".pu-finalPrice")
-                or con.select_one(".b_price")
-                or con.select_one("[class*='price']")
-            )
-            seller_el = (
-                con.select_one(".pu-seller")
-                or con.select_one("[class*='seller']")
-                or con.select_one("[class*='merchant']")
-            )
-
-            if not price_el:
-                continue
-            price = _parse_price(price_el.get_text())
-            if not price or not (price_floor <= price <= price_ceil):
-                continue
+        if not price_el:
+            continue
+        price = _parse_price(price_el.get_text())
+        if not price or not (price_floor <= price <= price_ceil):
+            continue
 
-            seller = seller_el.get_text().strip() if seller_el else "Online Store"
-            link = con.find("a", href=True)
-            href = link["href"] if link else f"https://www.bing.com/shop?q={requests.utils.quote(query)}"
+        seller = seller_el.get_text().strip() if seller_el else "Online Store"
+        link = con.find("a", href=True)
+        href = link["href"] if link else f"https://www.bing.com/shop?q={requests.utils.quote(query)}"
 
-            vendors.append({
-                "vendor_name":   seller[:30].title(),
-                "price":         price,
-                "delivery_time": _delivery(seller),
-                "rating":        _rating(seller),
-                "url":           href,
-                "source":        "bing_shopping",
-            })
+        vendors.append({
+            "vendor_name":   seller[:30].title(),
+            "price":         price,
+            "delivery_time": _delivery(seller),
+            "rating":        _rating(seller),
+            "url":           href,
+            "source":        "bing_shopping",
+        })
+
+    PARSE_STATS["pages"]   += 1
+    PARSE_STATS["seconds"] += time.perf_counter() - started
+    return vendors
 
+
+def scrape_bing(query: str, price_floor: float, price_ceil: float,
+                base_url: str = BING_BASE_URL) -> list:
+    """
+    Bing Shopping is more permissive than Google Shopping for automated access.
+    Returns vendor + price pairs from the shopping tab.
+    """
+    vendors = []
+    try:
+        vendors = parse_bing(_fetch(bing_search_url(query, base_url)), query, price_floor, price_ceil)
     except Exception as exc:
         print(f"    ⚠  Bing Shopping: {exc}")
     return vendors
@@ -336,7 +467,8 @@ def _derive_platform_vendors(base_price: float, query: str, existing_names: set)
 
 # ── Main pipeline ─────────────────────────────────────────────────────────────
 
-def scrape_product(key: str, product: dict) -> dict | None:
+def scrape_product(key: str, product: dict, base_urls: dict | None = None) -> dict | None:
+    base_urls = base_urls or {}
     name  = product["name"]
     query = product["query"]
     pf    = product["price_floor"]
@@ -346,21 +478,35 @@ def scrape_product(key: str, product: dict) -> dict | None:
 
     all_vendors: list = []
 
-    # Source 1: Amazon India
+    # Source 1: Amazon India (the politeness pause is skipped for pages served
+    # from the cache without a request)
     print("    → Amazon India...", end=" ", flush=True)
-    amz = scrape_amazon(query, pf, pc, amazon_cat=acat)
+    requests_before = FETCH_STATS["network"]
+    amz = scrape_amazon(query, pf, pc, amazon_cat=acat, base_url=base_urls.get("amazon", AMAZON_BASE_URL))
     print(f"{len(amz)} listings")
     all_vendors.extend(amz)
-    time.sleep(2.0)
+    if FETCH_STATS["network"] > requests_before:
+        time.sleep(REQUEST_PAUSE)
 
     # Source 2: Bing Shopping
     print("    → Bing Shopping...", end=" ", flush=True)
-    bing = scrape_bing(query, pf, pc)
+    requests_before = FETCH_STATS["network"]
+    bing = scrape_bing(query, pf, pc, base_url=base_urls.get("bing", BING_BASE_URL))
     print(f"{len(bing)} listings")
     all_vendors.extend(bing)
-    time.sleep(2.0)
+    if FETCH_STATS["network"] > requests_before:
+        time.sleep(REQUEST_PAUSE)
+
+    return build_record(name, query, all_vendors)
 
-    deduped = _deduplicate(all_vendors)
+
+def build_record(name: str, query: str, scraped: list) -> dict | None:
+    """
+    Turn the scraped Amazon + Bing listings of one product into its
+    inventory.json record: deduplicate, fill missing platforms from the
+    platform model, and log the result. None when nothing was found.
+    """
+    deduped = _deduplicate(scraped)
     scraped_names = {v["vendor_name"].lower() for v in deduped}
 
     # Source 3: Platform model (transparent fill for missing quick-commerce vendors)
@@ -390,49 +536,149 @@ def scrape_product(key: str, product: dict) -> dict | None:
     }
 
 
-def run(dry_run: bool = False):
-    inventory_path = Path(__file__).parent / "inventory.json"
-
-    existing = {}
-    if inventory_path.exists():
-        try:
-            with open(inventory_path, encoding="utf-8") as f:
-                existing = json.load(f)
-        except (json.JSONDecodeError, OSError) as exc:
-            print(f"  ⚠  Warning: Could not read existing inventory.json ({exc}).")
-            print("     Starting fresh — existing data will be overwritten on save.")
+def run(dry_run: bool = False, concurrent: bool = False, base_urls: dict | None = None,
+        cache_dir: str | None = None, cache_ttl: float = DEFAULT_TTL,
+        cache_max_bytes: int = DEFAULT_MAX_BYTES, replay: bool = False,
+        products: dict | None = None, time_budget: float | None = None,
+        inventory_db: str | None = None, inventory: str | None = None, **limits) -> dict:
+    """
+    Scrape every product in PRODUCTS (or the *products* subset, in its
+    order) and merge the results into inventory.json. Returns key → new
+    record (None when nothing was found) for every product attempted.
+
+    concurrent=True uses the asyncio engine in async_scraper.py (same output,
+    requests overlapped under per-host rate limits; *limits* are forwarded to
+    it). *base_urls* ({"amazon": ..., "bing": ...}) redirects the search
+    requests, e.g. to a local stub server.
+
+    With *cache_dir* set, search pages are cached there (http_cache.py) and
+    reused for *cache_ttl* seconds; cache_ttl=0 revalidates every page.
+    replay=True serves every page from the cache (*cache_dir*, default
+    DEFAULT_CACHE_DIR) and makes no requests at all.
+
+    *time_budget* (seconds) stops starting new products once spent
+    (concurrent: products still in flight are cancelled); skipped products
+    keep their existing records.
+
+    *inventory_db* writes to that SQLite inventory (inventory_db.py)
+    instead of inventory.json; *inventory* names another JSON snapshot.
+    """
+    global HTTP_CACHE
+    products = PRODUCTS if products is None else products
+    HTTP_CACHE = None
+    if cache_dir is not None or replay:
+        HTTP_CACHE = ResponseCache(cache_dir or DEFAULT_CACHE_DIR, ttl=cache_ttl,
+                                   max_bytes=cache_max_bytes, replay=replay)
+    inventory_path = Path(inventory) if inventory else Path(__file__).parent / "inventory.json"
+
+    # Each updated product is appended to the inventory journal as soon as
+    # it is scraped (inventory_store.py): a crash keeps everything done so
+    # far, and the write cost is the changed records, not the catalogue.
+    if inventory_db is not None:
+        from inventory_db import InventoryDB
+        inventory_path = Path(inventory_db)
+        db       = InventoryDB(inventory_db)
+        existing = set(db.keys())
+        writer   = None if dry_run else db
+    else:
+        existing = read_inventory(str(inventory_path)).db.keys()
+        writer   = None if dry_run else InventoryWriter(str(inventory_path))
 
     print("=" * 65)
     print("  ShopVision Pro v4.0 — Offline Price Scraper")
-    print(f"  Mode : {'DRY RUN — inventory.json will NOT be modified' if dry_run else 'LIVE — will update inventory.json'}")
-    print(f"  Time : {datetime.now().strftime('%Y-%m-%d  %H:%M:%S')}")
+    print(f"  Mode   : {f'DRY RUN — {inventory_path.name} will NOT be modified' if dry_run else f'LIVE — will update {inventory_path.name}'}")
+    print(f"  Engine : {'concurrent (asyncio)' if concurrent else 'sequential'}")
+    if HTTP_CACHE is not None:
+        print(f"  Cache  : {HTTP_CACHE.directory}  "
+              f"({'REPLAY — no network' if replay else f'ttl {cache_ttl:.0f}s'})")
+    print(f"  Time   : {datetime.now().strftime('%Y-%m-%d  %H:%M:%S')}")
     print("=" * 65)
 
-    updated       = dict(existing)
-    success_count = 0
-
-    for key, product in PRODUCTS.items():
-        result = scrape_product(key, product)
+    results = None
+    if concurrent:
+        import asyncio
+        from async_scraper import scrape_products_async   # imports this module
+        results = asyncio.run(scrape_products_async(products, base_urls=base_urls,
+                                                    time_budget=time_budget, **limits))
+
+    attempts = {}
+    deferred = 0
+    started  = time.monotonic()
+
+    for key, product in products.items():
+        if results is not None:
+            if key not in results:
+                deferred += 1
+                continue
+            result = results[key]
+        else:
+            if time_budget is not None and time.monotonic() - started >= time_budget:
+                deferred += 1
+                continue
+            result = scrape_product(key, product, base_urls)
+        attempts[key] = result
         if result:
-            updated[key] = result
-            success_count += 1
+            if writer is not None:
+                writer.upsert(key, result)
         elif key in existing:
             print(f"    ↩  Retaining curated data for '{key}'")
 
     print(f"\n{'=' * 65}")
-    print(f"  Scrape summary: {success_count}/{len(PRODUCTS)} products updated")
-    if not dry_run:
-        with open(inventory_path, "w", encoding="utf-8") as f:
-            json.dump(updated, f, indent=4, ensure_ascii=False)
-        print(f"  💾 Saved  →  {inventory_path}")
+    print(f"  Scrape summary: {sum(map(bool, attempts.values()))}/{len(products)} products updated")
+    if deferred:
+        print(f"  ⏱  Time budget reached — {deferred} product(s) deferred to the next run")
+    if PARSE_STATS["pages"]:
+        print(f"  Parsing: {PARSE_STATS['pages']} pages, "
+              f"{PARSE_STATS['seconds'] / PARSE_STATS['pages'] * 1e3:.1f} ms/page  ({HTML_PARSER})")
+    if HTTP_CACHE is not None:
+        HTTP_CACHE.flush()
+        stats = HTTP_CACHE.stats()
+        print(f"  Cache: {stats['hits']} hits, {stats['revalidated']} revalidated, "
+              f"{stats['misses']} fetched  ({stats['entries']} entries, {stats['bytes'] / 1e6:.1f} MB)")
+    if writer is not None:
+        print(f"  💾 Saved  →  {inventory_path}  (version {writer.version})")
+        writer.close()
     else:
         print("  (Dry run — no file changes)")
+    if inventory_db is not None and writer is None:
+        db.close()
     print("=" * 65)
+    return attempts
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="ShopVision Pro offline price scraper")
     parser.add_argument("--dry-run", action="store_true",
                         help="Preview results without modifying inventory.json")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="Overlap requests with the asyncio engine (per-host rate limited)")
+    parser.add_argument("--rate", type=float, default=0.5,
+                        help="--concurrent: requests per second per host")
+    parser.add_argument("--burst", type=int, default=1,
+                        help="--concurrent: requests a host may receive back-to-back")
+    parser.add_argument("--per-host", type=int, default=2,
+                        help="--concurrent: max in-flight requests per host")
+    parser.add_argument("--cache", action="store_true",
+                        help="Reuse recently fetched pages from the HTTP response cache (default: always fetch)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="HTTP response cache directory")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL,
+                        help="Seconds a cached page is reused without contacting the site")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_MAX_BYTES / 2**20,
+                        help="Cache size bound; least-recently-used pages are evicted beyond it")
+    parser.add_argument("--replay", action="store_true",
+                        help="Serve every page from the cache (offline); unrecorded pages count as failures")
+    parser.add_argument("--amazon-url", default=AMAZON_BASE_URL, help="Amazon search base URL")
+    parser.add_argument("--bing-url", default=BING_BASE_URL, help="Bing Shopping base URL")
+    parser.add_argument("--db", default=None, metavar="PATH",
+                        help="Update this SQLite inventory (inventory_db.py) instead of inventory.json")
     args = parser.parse_args()
-    run(dry_run=args.dry_run)
+
+    limits = {}
+    if args.concurrent:
+        from async_scraper import HostLimit
+        limits["default"] = HostLimit(rate=args.rate, burst=args.burst, concurrency=args.per_host)
+    run(dry_run=args.dry_run, concurrent=args.concurrent,
+        base_urls={"amazon": args.amazon_url, "bing": args.bing_url},
+        cache_dir=args.cache_dir if args.cache or args.replay else None, cache_ttl=args.cache_ttl,
+        cache_max_bytes=int(args.cache_max_mb * 2**20), replay=args.replay,
+        inventory_db=args.db, **limits)
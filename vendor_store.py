@@ -0,0 +1,170 @@
+"""
+vendor_store.py — Columnar Vendor Offer Store
+ShopVision Pro v4.0
+
+Compact, read-only representation of every vendor offer in the inventory:
+
+    price          array('d')   — one slot per offer, contiguous
+    delivery_time  array('i')   — minutes
+    rating         array('d')
+    name_id        array('I')   — index into the interned `names` table
+    source_id      array('B')   — index into the interned `sources` table
+    urls           list[str]    — one per offer, stored by index
+
+Offers of one product are contiguous; `offsets` (CSR style) maps product p
+to offers offsets[p]:offsets[p + 1]. A per-product `VendorColumns` view
+exposes zero-copy memoryview slices that `optimizer.rank_vendors` ranks
+directly, materialising vendor dicts only for the entries it returns.
+
+Built once per inventory load; roughly 30 bytes + the URL per offer,
+against several hundred bytes for a vendor dict.
+
+The columns are plain `array.array`s, so NumPy is not required.
+"""
+
+from array import array
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class VendorColumns:
+    """
+    Read-only view of one product's offers inside a `VendorStore`.
+
+    Behaves like a sequence of vendor dicts for `len()`, truthiness,
+    iteration and indexing (dicts are built on access), and additionally
+    exposes the raw columns as zero-copy memoryviews.
+    """
+
+    __slots__ = ("store", "start", "stop")
+
+    def __init__(self, store: "VendorStore", start: int, stop: int):
+        self.store = store
+        self.start = start
+        self.stop  = stop
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    def __bool__(self) -> bool:
+        return self.stop > self.start
+
+    # ── Columns (no copies) ───────────────────────────────────────────────────
+
+    @property
+    def prices(self) -> memoryview:
+        return self.store._price_mv[self.start:self.stop]
+
+    @property
+    def delivery_times(self) -> memoryview:
+        return self.store._delivery_mv[self.start:self.stop]
+
+    @property
+    def ratings(self) -> memoryview:
+        return self.store._rating_mv[self.start:self.stop]
+
+    # ── Row access (materialises a dict) ──────────────────────────────────────
+
+    def vendor(self, i: int) -> Dict[str, Any]:
+        """Build the inventory.json-style vendor dict for offer *i* of this product."""
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.store.vendor(self.start + i)
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        return self.vendor(i if i >= 0 else len(self) + i)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(self.start, self.stop):
+            yield self.store.vendor(i)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return list(self)
+
+
+class VendorStore:
+    """Columnar store of all offers in an inventory dict (see module docstring)."""
+
+    def __init__(self):
+        self.keys:      List[str]      = []
+        self.key_index: Dict[str, int] = {}
+        self.offsets       = array("q", [0])
+        self.price         = array("d")
+        self.delivery_time = array("i")
+        self.rating        = array("d")
+        self.name_id       = array("I")
+        self.source_id     = array("B")
+        self.urls:    List[str]           = []
+        self.names:   List[str]           = []
+        self.sources: List[Optional[str]] = []
+        self._name_ids:   Dict[str, int]           = {}
+        self._source_ids: Dict[Optional[str], int] = {}
+        self._frozen = False
+
+    # ── Construction ──────────────────────────────────────────────────────────
+
+    def _intern(self, table: list, ids: dict, value) -> int:
+        idx = ids.get(value)
+        if idx is None:
+            idx = ids[value] = len(table)
+            table.append(value)
+        return idx
+
+    def add_product(self, key: str, vendors: List[Dict[str, Any]]) -> None:
+        """Append one product's offers. Not allowed once views have been handed out."""
+        if self._frozen:
+            raise RuntimeError("VendorStore is frozen; build a new store to change offers")
+        for v in vendors:
+            self.price.append(float(v["price"]))
+            self.delivery_time.append(int(v["delivery_time"]))
+            self.rating.append(float(v["rating"]))
+            self.name_id.append(self._intern(self.names, self._name_ids, v["vendor_name"]))
+            self.source_id.append(self._intern(self.sources, self._source_ids, v.get("source")))
+            self.urls.append(v.get("url", "#"))
+        self.key_index[key] = len(self.keys)
+        self.keys.append(key)
+        self.offsets.append(len(self.price))
+
+    def freeze(self) -> "VendorStore":
+        """Pin the column buffers; views may be taken from here on."""
+        if not self._frozen:
+            self._price_mv    = memoryview(self.price)
+            self._delivery_mv = memoryview(self.delivery_time)
+            self._rating_mv   = memoryview(self.rating)
+            self._frozen = True
+        return self
+
+    @classmethod
+    def from_inventory(cls, db: Dict[str, Dict[str, Any]]) -> "VendorStore":
+        """Build a frozen store from an inventory dict (as loaded from inventory.json)."""
+        store = cls()
+        for key, record in db.items():
+            store.add_product(key, record.get("vendors", []))
+        return store.freeze()
+
+    # ── Access ────────────────────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.key_index
+
+    def view(self, key: str) -> VendorColumns:
+        """Zero-copy view over the offers of product *key* (KeyError if unknown)."""
+        self.freeze()
+        p = self.key_index[key]
+        return VendorColumns(self, self.offsets[p], self.offsets[p + 1])
+
+    def vendor(self, i: int) -> Dict[str, Any]:
+        """Build the vendor dict for global offer index *i*."""
+        entry = {
+            "vendor_name":   self.names[self.name_id[i]],
+            "price":         self.price[i],
+            "delivery_time": self.delivery_time[i],
+            "rating":        self.rating[i],
+            "url":           self.urls[i],
+        }
+        source = self.sources[self.source_id[i]]
+        if source is not None:
+            entry["source"] = source
+        return entry
@@ -0,0 +1,550 @@
+"""
+vision.py — Perception Helpers for the Detection Loop
+ShopVision Pro v4.0
+
+Utilities shared by the video analysis loops (app.py, main.py):
+
+    sample_frames   — read a cv2.VideoCapture keeping every Nth frame, without
+                      converting (grab) or decoding (seek) the skipped ones
+    predict_batched — run YOLO on groups of sampled frames with a single
+                      predict call per group, yielding results in frame order
+    postprocess     — move one frame's boxes to host in a single transfer and
+                      compute aspect ratios / geometric subtypes as array ops
+    PreviewRenderer — draw overlays on a downscaled copy and rate-limit UI
+                      pushes independently of the analysis rate
+    IoUTracker      — stable track ids across frames, with per-track subtype
+                      voting and a memo for cached product resolution
+    SceneGate       — cheap scene-change test that lets static frames reuse
+                      the previous detections instead of running YOLO
+"""
+
+import itertools
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# A sampled frame: (1-based frame index in the source video, BGR image)
+Frame = Tuple[int, Any]
+
+
+# ── Frame sampling ────────────────────────────────────────────────────────────
+
+SAMPLING_MODES = ("decode", "grab", "seek")
+
+
+def sampling_step(video_fps: float, sample_fps: float) -> int:
+    """
+    Convert a time-based rate ("analyse N frames per second of video") into
+    a frame step for `sample_frames`. Never returns less than 1.
+    """
+    if not video_fps or not sample_fps or sample_fps <= 0:
+        return 1
+    return max(1, int(round(video_fps / sample_fps)))
+
+
+def sample_frames(cap, frame_skip: int = 1, mode: str = "grab") -> Iterator[Frame]:
+    """
+    Yield (frame_idx, frame) for every *frame_skip*-th frame of *cap*.
+    Frame indices are 1-based, matching the original app.py counter.
+
+    Modes
+    -----
+    decode — `cap.read()` every frame and discard the skipped ones
+             (original behaviour; kept for comparison).
+    grab   — `cap.grab()` skipped frames and `cap.retrieve()` only the kept
+             ones, so skipped frames never go through BGR conversion / copy.
+    seek   — jump straight to each kept frame with CAP_PROP_POS_FRAMES.
+             The backend decodes from the nearest keyframe, so this only
+             wins for large steps (well beyond the GOP length, e.g. one
+             sample every few seconds); for small steps use 'grab'.
+    """
+    if mode not in SAMPLING_MODES:
+        raise ValueError(f"Unknown sampling mode '{mode}' (expected one of {SAMPLING_MODES})")
+    frame_skip = max(1, int(frame_skip))
+
+    if mode == "seek":
+        frame_idx = frame_skip
+        while cap.isOpened():
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx - 1)
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame_idx, frame
+            frame_idx += frame_skip
+        return
+
+    frame_count = 0
+    while cap.isOpened():
+        if mode == "grab":
+            # Every frame is demuxed/decoded by grab(); retrieve() (BGR
+            # conversion + copy) runs for the kept ones only
+            if not cap.grab():
+                break
+            frame_count += 1
+            if frame_count % frame_skip != 0:
+                continue
+            ret, frame = cap.retrieve()
+        else:
+            ret, frame = cap.read()
+            frame_count += 1
+        if not ret:
+            break
+        if frame_count % frame_skip != 0:
+            continue
+        yield frame_count, frame
+
+
+# ── Scene-change gating ───────────────────────────────────────────────────────
+
+class SceneGate:
+    """
+    Decide whether a frame differs enough from the last *inferred* frame to
+    be worth running the detector on.
+
+    Frames are reduced to a small grayscale thumbnail (default 64×36) and
+    compared against the thumbnail of the last frame that was actually sent
+    to YOLO — not the previous frame — so slow pans still trigger once the
+    accumulated change crosses the threshold.
+
+    Methods
+    -------
+    diff — mean absolute pixel difference of the thumbnails (0–255 scale)
+    hist — Bhattacharyya distance between 32-bin gray histograms (0–1 scale);
+           robust to small camera shake, blind to objects that move without
+           changing the overall tone
+
+    A refresh is forced every *max_reuse* consecutive reused frames so a
+    static-looking scene is still re-checked periodically.
+    """
+
+    METHODS = ("diff", "hist")
+
+    def __init__(self, threshold: float = 4.0, max_reuse: int = 30,
+                 method: str = "diff", size: Tuple[int, int] = (64, 36)):
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown gate method '{method}' (expected one of {self.METHODS})")
+        self.threshold = threshold
+        self.max_reuse = max(0, int(max_reuse))
+        self.method    = method
+        self.size      = size
+        self.inferred  = 0
+        self.reused    = 0
+        self._ref      = None
+        self._streak   = 0
+
+    def reset(self) -> None:
+        self._ref    = None
+        self._streak = 0
+
+    def _signature(self, frame) -> np.ndarray:
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        gray  = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        if self.method == "hist":
+            hist = cv2.calcHist([gray], [0], None, [32], [0, 256])
+            return cv2.normalize(hist, hist).flatten()
+        return gray.astype(np.int16)
+
+    def _distance(self, a: np.ndarray, b: np.ndarray) -> float:
+        if self.method == "hist":
+            return float(cv2.compareHist(a, b, cv2.HISTCMP_BHATTACHARYYA))
+        return float(np.mean(np.abs(a - b)))
+
+    def should_infer(self, frame) -> bool:
+        """True if *frame* needs fresh detections (and becomes the new reference)."""
+        sig = self._signature(frame)
+        if (self._ref is None
+                or self._streak >= self.max_reuse
+                or self._distance(sig, self._ref) > self.threshold):
+            self._ref    = sig
+            self._streak = 0
+            self.inferred += 1
+            return True
+        self._streak += 1
+        self.reused  += 1
+        return False
+
+
+# ── Batched inference ─────────────────────────────────────────────────────────
+
+def _predict_batch(model, batch: List[Tuple[int, Any, bool]], predict_kwargs: dict,
+                   last: List[Any]) -> Iterator[Tuple[int, Any, Any]]:
+    """
+    Run one predict call over the frames of *batch* that need inference and
+    pair every frame with its result. Gated-out frames reuse the most recent
+    result before them; `last[0]` carries that result across batches.
+    """
+    to_infer = [frame for _, frame, infer in batch if infer]
+    results = iter(model.predict(to_infer, **predict_kwargs)) if to_infer else iter(())
+    for frame_idx, frame, infer in batch:
+        if infer or last[0] is None:
+            last[0] = next(results)
+        yield frame_idx, frame, last[0]
+
+
+def predict_batched(
+    model,
+    frames:     Iterable[Frame],
+    batch_size: int = 1,
+    gate:       Optional[SceneGate] = None,
+    **predict_kwargs,
+) -> Iterator[Tuple[int, Any, Any]]:
+    """
+    Run YOLO inference over a stream of sampled frames, *batch_size* at a time.
+
+    Ultralytics accepts a list of images in a single `predict` call, so the
+    per-call overhead (letterbox, tensor setup, NMS dispatch) is paid once per
+    batch instead of once per frame. Results are yielded one frame at a time
+    and strictly in input order, so downstream cooldown / history logic sees
+    exactly the same sequence as the unbatched loop.
+
+    Parameters
+    ----------
+    model : ultralytics.YOLO
+        Loaded detector.
+    frames : iterable of (frame_idx, frame)
+        Sampled frames in playback order.
+    batch_size : int
+        Maximum number of frames per predict call. 1 reproduces the
+        original frame-by-frame behaviour. A trailing partial batch is
+        flushed when *frames* is exhausted.
+    gate : SceneGate, optional
+        Frames the gate considers unchanged are not sent to the model; they
+        are yielded with the previous frame's result object instead. Only
+        frames that need inference count towards *batch_size*.
+    **predict_kwargs
+        Forwarded to `model.predict` (e.g. conf, device, verbose).
+
+    Yields
+    ------
+    (frame_idx, frame, result) for every input frame.
+    """
+    batch_size = max(1, int(batch_size))
+    batch: List[Tuple[int, Any, bool]] = []
+    pending = 0
+    last: List[Any] = [None]
+    for frame_idx, frame in frames:
+        infer = gate is None or gate.should_infer(frame)
+        batch.append((frame_idx, frame, infer))
+        pending += infer
+        # Flush on a full batch, or straight away when nothing in the batch
+        # needs inference (gated frames then don't wait for the next batch)
+        if pending >= batch_size or (pending == 0 and last[0] is not None):
+            yield from _predict_batch(model, batch, predict_kwargs, last)
+            batch, pending = [], 0
+    if batch:
+        yield from _predict_batch(model, batch, predict_kwargs, last)
+
+
+# ── Vectorised post-processing ────────────────────────────────────────────────
+
+# Geometric sub-typing rules: label → (aspect-ratio threshold, tall subtype, short subtype).
+# A box whose height/width ratio is strictly above the threshold gets the tall subtype.
+SUBTYPE_RULES: Dict[str, Tuple[float, str, str]] = {
+    "dove":      (1.5, "Shampoo", "Soap"),    # Soap is wide/square, Shampoo is tall
+    "pepsi":     (2.7, "Bottle",  "Can"),     # Bottles are tall, Cans are short
+    "cocacola":  (2.7, "Bottle",  "Can"),
+    "coca-cola": (2.7, "Bottle",  "Can"),
+}
+# Rule for any label not listed above
+FALLBACK_RULE: Tuple[float, str, str] = (float("inf"), "Product", "Product")
+
+SUBTYPES = ("Shampoo", "Soap", "Bottle", "Can", "Product")
+SUBTYPE_COLORS = {                            # BGR
+    "Shampoo": (203, 192, 255),
+    "Soap":    (255, 255, 255),
+    "Bottle":  (255, 0, 0),                   # Blue
+    "Can":     (0, 255, 0),                   # Green
+    "Product": (0, 165, 255),                 # Orange
+}
+
+_rule_tables: Dict[Any, Tuple[Any, Any, Tuple[np.ndarray, np.ndarray, np.ndarray]]] = {}
+
+
+class Detections(NamedTuple):
+    """Host-side detections for one frame; all fields share the leading N axis."""
+    xyxy:    np.ndarray   # (N, 4) float32 — x1, y1, x2, y2
+    conf:    np.ndarray   # (N,)   float32
+    cls:     np.ndarray   # (N,)   int64 class ids
+    aspect:  np.ndarray   # (N,)   float32 height / width
+    subtype: np.ndarray   # (N,)   int64 index into SUBTYPES
+
+    def __len__(self) -> int:
+        return len(self.cls)
+
+
+def _subtype_tables(names, rules, fallback) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Per-class-id lookup tables (threshold, tall idx, short idx), built once per
+    (class names, rules) combination so the per-frame path is pure indexing.
+    """
+    key = (id(names), id(rules), fallback)
+    cached = _rule_tables.get(key)
+    if cached is not None and cached[0] is names and cached[1] is rules:
+        return cached[2]
+
+    ids = list(names.keys()) if isinstance(names, dict) else list(range(len(names)))
+    size = (max(ids) + 1) if ids else 0
+    thr   = np.full(size, fallback[0], dtype=np.float32)
+    tall  = np.full(size, SUBTYPES.index(fallback[1]), dtype=np.int64)
+    short = np.full(size, SUBTYPES.index(fallback[2]), dtype=np.int64)
+    for cls_id in ids:
+        rule = rules.get(names[cls_id])
+        if rule:
+            thr[cls_id]   = rule[0]
+            tall[cls_id]  = SUBTYPES.index(rule[1])
+            short[cls_id] = SUBTYPES.index(rule[2])
+
+    # Keep references to names/rules so their ids cannot be recycled
+    _rule_tables[key] = (names, rules, (thr, tall, short))
+    return thr, tall, short
+
+
+def postprocess(
+    result,
+    names,
+    min_aspect_ratio: Optional[float] = None,
+    rules:            Dict[str, Tuple[float, str, str]] = SUBTYPE_RULES,
+    fallback:         Tuple[float, str, str]            = FALLBACK_RULE,
+) -> Detections:
+    """
+    Convert one ultralytics `Results` object into host-side `Detections`.
+
+    All boxes, confidences and class ids are moved to host with a single
+    `boxes.data.cpu()` transfer (instead of one `.cpu().numpy()` per box).
+    Aspect ratios and subtypes are computed with array operations, and
+    boxes below *min_aspect_ratio* are dropped before any per-box Python
+    code runs in the caller.
+
+    Parameters
+    ----------
+    result : ultralytics Results
+    names : dict or list
+        `model.names` — class id → label.
+    min_aspect_ratio : float, optional
+        Drop boxes whose height/width ratio is below this value.
+    rules, fallback
+        Geometric sub-typing rules (see SUBTYPE_RULES / FALLBACK_RULE).
+    """
+    boxes = getattr(result, "boxes", None)
+    if boxes is None or len(boxes) == 0:
+        empty = np.empty(0, dtype=np.float32)
+        return Detections(np.empty((0, 4), dtype=np.float32), empty, np.empty(0, dtype=np.int64),
+                          empty, np.empty(0, dtype=np.int64))
+
+    data = boxes.data
+    data = data.cpu().numpy() if hasattr(data, "cpu") else np.asarray(data)   # (N, 6|7)
+    xyxy = data[:, :4].astype(np.float32, copy=False)
+    conf = data[:, -2].astype(np.float32, copy=False)
+    cls  = data[:, -1].astype(np.int64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        aspect = (xyxy[:, 3] - xyxy[:, 1]) / (xyxy[:, 2] - xyxy[:, 0])
+
+    if min_aspect_ratio is not None:
+        keep = aspect >= min_aspect_ratio
+        xyxy, conf, cls, aspect = xyxy[keep], conf[keep], cls[keep], aspect[keep]
+
+    thr, tall, short = _subtype_tables(names, rules, fallback)
+    subtype = np.where(aspect > thr[cls], tall[cls], short[cls])
+
+    return Detections(xyxy, conf, cls, aspect, subtype)
+
+
+# ── Preview rendering ─────────────────────────────────────────────────────────
+
+class PreviewRenderer:
+    """
+    Cheap preview path for the UI, decoupled from the analysis rate.
+
+    Only frames that will actually be shown pay for rendering: `begin()`
+    decides whether a frame is due (FPS cap) and, if so, makes a downscaled
+    copy to draw on; overlays are drawn in preview coordinates; `publish()`
+    converts the small canvas to RGB and hands it to the UI.
+
+    The push interval adapts: if a publish takes longer than the target
+    interval (e.g. Streamlit is still encoding/shipping the previous image),
+    the next push is deferred by that cost, so frames are skipped instead of
+    queueing up behind the browser.
+
+    Usage
+    -----
+        preview = PreviewRenderer(max_width=960, max_fps=10)
+        if preview.begin(frame):
+            preview.rectangle((x1, y1), (x2, y2), color, 3)
+            preview.publish(lambda rgb: video_window.image(rgb))
+    """
+
+    def __init__(self, max_width: int = 960, max_fps: float = 10.0):
+        self.max_width   = max(1, int(max_width))
+        self.interval    = 1.0 / max_fps if max_fps and max_fps > 0 else 0.0
+        self.canvas      = None
+        self.scale       = 1.0
+        self.published   = 0
+        self.skipped     = 0
+        self._next_due   = 0.0
+        self._last_cost  = 0.0
+
+    @property
+    def active(self) -> bool:
+        """True between a successful `begin()` and the matching `publish()`."""
+        return self.canvas is not None
+
+    def begin(self, frame, now: Optional[float] = None) -> bool:
+        """Start a preview of *frame* if one is due; returns whether it is."""
+        now = time.monotonic() if now is None else now
+        if now < self._next_due:
+            self.skipped += 1
+            self.canvas = None
+            return False
+
+        h, w = frame.shape[:2]
+        self.scale = min(1.0, self.max_width / float(w))
+        if self.scale < 1.0:
+            size = (max(1, int(w * self.scale)), max(1, int(h * self.scale)))
+            self.canvas = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        else:
+            self.canvas = frame.copy()
+        return True
+
+    def rectangle(self, pt1, pt2, color, thickness: int = 3) -> None:
+        """Draw a full-resolution box on the preview canvas (no-op if inactive)."""
+        if self.canvas is None:
+            return
+        s = self.scale
+        cv2.rectangle(self.canvas,
+                      (int(pt1[0] * s), int(pt1[1] * s)),
+                      (int(pt2[0] * s), int(pt2[1] * s)),
+                      color, max(1, int(round(thickness * s))))
+
+    def publish(self, push: Callable[[Any], Any]) -> None:
+        """Convert the canvas to RGB, pass it to *push*, and schedule the next slot."""
+        if self.canvas is None:
+            return
+        start = time.monotonic()
+        push(cv2.cvtColor(self.canvas, cv2.COLOR_BGR2RGB))
+        end = time.monotonic()
+        self._last_cost = end - start
+        self._next_due  = start + max(self.interval, self._last_cost)
+        self.canvas = None
+        self.published += 1
+
+
+# ── Multi-object tracking ─────────────────────────────────────────────────────
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy boxes → (N, M)."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter  = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union  = area_a[:, None] + area_b[None, :] - inter
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(union > 0, inter / union, 0.0).astype(np.float32)
+
+
+class Track:
+    """One tracked object. `memo` is free-form per-track cache space for callers."""
+
+    __slots__ = ("track_id", "box", "cls", "missed", "votes", "memo")
+
+    def __init__(self, track_id: int, box: np.ndarray, cls: int):
+        self.track_id = track_id
+        self.box      = box
+        self.cls      = cls
+        self.missed   = 0
+        self.votes: Dict[int, int] = {}
+        self.memo:  Dict[str, Any] = {}
+
+    def vote(self, subtype_idx: int) -> int:
+        """Record an observed subtype and return the majority so far (ties → first seen)."""
+        self.votes[subtype_idx] = self.votes.get(subtype_idx, 0) + 1
+        return max(self.votes, key=self.votes.get)
+
+
+class IoUTracker:
+    """
+    Greedy IoU tracker over `Detections`.
+
+    Each `update()` matches the frame's boxes to live tracks of the same class
+    by descending IoU (vectorised IoU matrix, greedy assignment); unmatched
+    boxes start new tracks and tracks unmatched for more than *max_missed*
+    updates are retired.
+
+    Because the subtype of a box is decided by an aspect-ratio threshold,
+    a bottle near the threshold can flip between Can and Bottle from frame to
+    frame. `update()` therefore returns each track's majority-vote subtype
+    instead of the per-frame one, and callers can cache product resolution
+    in `track.memo` so it is done once per track, not once per frame.
+
+    Usage
+    -----
+        track_ids, subtypes = tracker.update(detections)
+        memo = tracker.tracks[track_ids[i]].memo
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_missed: int = 5):
+        self.iou_threshold = iou_threshold
+        self.max_missed    = max_missed
+        self.tracks: Dict[int, Track] = {}
+        self._ids = itertools.count(1)
+
+    def reset(self) -> None:
+        self.tracks.clear()
+
+    def update(self, det: "Detections") -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Associate *det* with existing tracks.
+
+        Returns
+        -------
+        (track_ids, subtypes) — both (N,) int64 arrays aligned with *det*;
+        `subtypes` holds the per-track majority vote (index into SUBTYPES).
+        """
+        n = len(det)
+        track_ids = np.zeros(n, dtype=np.int64)
+        subtypes  = det.subtype.copy()
+        live = list(self.tracks.values())
+
+        matched_tracks = set()
+        if live and n:
+            t_boxes = np.stack([t.box for t in live])
+            t_cls   = np.array([t.cls for t in live], dtype=np.int64)
+            ious = iou_matrix(t_boxes, det.xyxy)
+            ious[t_cls[:, None] != det.cls[None, :]] = 0.0
+
+            order = np.argsort(ious, axis=None)[::-1]
+            used_dets = set()
+            for flat in order.tolist():
+                ti, di = divmod(flat, n)
+                if ious[ti, di] < self.iou_threshold:
+                    break
+                if ti in matched_tracks or di in used_dets:
+                    continue
+                matched_tracks.add(ti)
+                used_dets.add(di)
+                track_ids[di] = live[ti].track_id
+
+        for ti, track in enumerate(live):
+            if ti not in matched_tracks:
+                track.missed += 1
+                if track.missed > self.max_missed:
+                    del self.tracks[track.track_id]
+
+        for di in range(n):
+            if track_ids[di] == 0:
+                tid = next(self._ids)
+                self.tracks[tid] = Track(tid, det.xyxy[di], int(det.cls[di]))
+                track_ids[di] = tid
+            track = self.tracks[int(track_ids[di])]
+            track.box    = det.xyxy[di]
+            track.missed = 0
+            subtypes[di] = track.vote(int(det.subtype[di]))
+
+        return track_ids, subtypes